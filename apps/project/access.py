@@ -0,0 +1,156 @@
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.db.models import CharField, Value
+from django.http import Http404
+
+from .models import AccessRoles, Project, ProjectAccess, ProjectMember
+
+# Highest role wins when a user holds several memberships on one project
+ROLE_RANK: dict[str, int] = {
+    AccessRoles.LEAD: 3,
+    AccessRoles.REVIEWER: 2,
+    AccessRoles.MEMBER: 1,
+    AccessRoles.GUEST: 0,
+}
+
+
+def _effective_roles(rows) -> dict:
+    """Reduce ``(project_id, user_id, role)`` rows to the best role per pair."""
+    roles: dict = {}
+    for project_id, user_id, role in rows:
+        key = (project_id, user_id)
+        if key not in roles or ROLE_RANK[role] > ROLE_RANK[roles[key]]:
+            roles[key] = role
+    return roles
+
+
+def sync_project_access(project_id, user_ids) -> None:
+    """Recompute the access rows of ``user_ids`` on a single project."""
+    user_ids = {pk for pk in user_ids if pk is not None}
+    if not user_ids:
+        return
+    lead_id = (
+        Project.objects.filter(pk=project_id).values_list("lead_id", flat=True).first()
+    )
+    rows = list(
+        ProjectMember.objects.filter(
+            project_id=project_id, user_id__in=user_ids
+        ).values_list("project_id", "user_id", "role")
+    )
+    if lead_id in user_ids:
+        rows.append((project_id, lead_id, AccessRoles.LEAD))
+    roles = _effective_roles(rows)
+
+    ProjectAccess.objects.filter(project_id=project_id, user_id__in=user_ids).exclude(
+        user_id__in=[user_id for _, user_id in roles]
+    ).delete()
+    ProjectAccess.objects.bulk_create(
+        [
+            ProjectAccess(project_id=project, user_id=user, effective_role=role)
+            for (project, user), role in roles.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "project"],
+        update_fields=["effective_role"],
+    )
+
+
+def rebuild_project_access(batch_size: int = 1000) -> int:
+    """Rebuild the whole access table from ``Project.lead`` and ``ProjectMember``."""
+    rows = list(
+        Project.objects.filter(lead__isnull=False).values_list(
+            "pk", "lead_id", Value(AccessRoles.LEAD.value, output_field=CharField())
+        )
+    )
+    rows.extend(
+        ProjectMember.objects.values_list("project_id", "user_id", "role").iterator(
+            chunk_size=batch_size
+        )
+    )
+    roles = _effective_roles(rows)
+
+    ProjectAccess.objects.all().delete()
+    ProjectAccess.objects.bulk_create(
+        (
+            ProjectAccess(project_id=project, user_id=user, effective_role=role)
+            for (project, user), role in roles.items()
+        ),
+        batch_size=batch_size,
+    )
+    return len(roles)
+
+
+def get_project_access(user, project_id):
+    """Return the user's ``ProjectAccess`` row (with its project) or ``None``."""
+    if not user.is_authenticated:
+        return None
+    return (
+        ProjectAccess.objects.select_related("project")
+        .filter(user_id=user.pk, project_id=project_id)
+        .first()
+    )
+
+
+async def aget_project_access(user, project_id):
+    """Async version of ``get_project_access``."""
+    if not user.is_authenticated:
+        return None
+    return (
+        await ProjectAccess.objects.select_related("project")
+        .filter(user_id=user.pk, project_id=project_id)
+        .afirst()
+    )
+
+
+async def aget_request_user(request):
+    """Resolve ``request.user`` without blocking the event loop.
+
+    The resolved user replaces the lazy ``request.user`` so templates and
+    context processors don't load it again synchronously.
+    """
+    user = await request.auser()
+    request.user = user
+    return user
+
+
+def has_project_access(user, project_id, roles=None) -> bool:
+    access = get_project_access(user, project_id)
+    return access is not None and (roles is None or access.effective_role in roles)
+
+
+def project_access_required(url_kwarg: str = "pk", roles=None):
+    """Restrict a view to users with access to the project in ``url_kwarg``.
+
+    The resolved project and role are attached to the request as
+    ``request.project`` and ``request.project_role``; anyone else gets a 404.
+    Works on both sync and async views.
+    """
+
+    def decorator(view_func):
+        def check(request, access):
+            if access is None or (
+                roles is not None and access.effective_role not in roles
+            ):
+                raise Http404("No Project matches the given query.")
+            request.project = access.project
+            request.project_role = access.effective_role
+
+        if iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                user = await aget_request_user(request)
+                check(request, await aget_project_access(user, kwargs[url_kwarg]))
+                return await view_func(request, *args, **kwargs)
+
+            return _wrapped_async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            check(request, get_project_access(request.user, kwargs[url_kwarg]))
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    return decorator
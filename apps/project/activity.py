@@ -0,0 +1,111 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from inspect import iscoroutinefunction
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+from .models import ActivityLog, Epic, Issue, Sprint, UserStory
+
+KINDS = {
+    Issue: ActivityLog.Kinds.ISSUE,
+    Epic: ActivityLog.Kinds.EPIC,
+    Sprint: ActivityLog.Kinds.SPRINT,
+    UserStory: ActivityLog.Kinds.USER_STORY,
+}
+# Most rows per INSERT, and per timeline page.
+BATCH_SIZE = 500
+TIMELINE_LIMIT = 50
+
+# Returns who changes are attributed to (set by ``activity_actor``); only
+# called once something changed.
+# Not the request's lazy user itself: asgiref compares context values when
+# switching threads, which would load it.
+_actor: ContextVar = ContextVar("activity_actor", default=None)
+
+
+def _actor_id():
+    get_actor = _actor.get()
+    user = get_actor() if get_actor is not None else None
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def activity_entries(model, object_id, changes: dict) -> list:
+    """Unsaved log entries for ``changes``, ``{attname: (old, new)}``."""
+    kind = KINDS[model]
+    actor_id = _actor_id()
+    now = timezone.now()
+    return [
+        ActivityLog(
+            kind=kind,
+            object_id=object_id,
+            field=model._meta.get_field(name).name,
+            old_value=old,
+            new_value=new,
+            actor_id=actor_id,
+            created_at=now,
+        )
+        for name, (old, new) in changes.items()
+    ]
+
+
+def write_activity(entries) -> None:
+    if entries:
+        ActivityLog.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+
+
+def record_activity(entries) -> None:
+    """Log ``entries`` with one INSERT as soon as the transaction commits.
+
+    Rolled back changes are never logged.
+    """
+    if entries:
+        transaction.on_commit(partial(write_activity, entries))
+
+
+@contextmanager
+def activity_actor(actor=None):
+    """Attribute the changes made inside the block to ``actor``.
+
+    ``actor`` is a user or a callable returning one.
+    """
+    token = _actor.set(actor if callable(actor) else lambda: actor)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+def activity_timeline(model, object_id, before=None, limit=TIMELINE_LIMIT):
+    """An object's log entries, newest first, older than the entry ``before``.
+
+    Reads a range of the ``(kind, object_id, id)`` index however long the
+    log gets.
+    """
+    entries = ActivityLog.objects.filter(kind=KINDS[model], object_id=object_id)
+    if before is not None:
+        entries = entries.filter(pk__lt=before)
+    return entries.order_by("-pk")[:limit]
+
+
+@sync_and_async_middleware
+def ActivityLogMiddleware(get_response):
+    """Attribute the request's changes to its user."""
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            with activity_actor(partial(getattr, request, "user", None)):
+                return await get_response(request)
+
+    else:
+
+        def middleware(request):
+            with activity_actor(partial(getattr, request, "user", None)):
+                return get_response(request)
+
+    return middleware
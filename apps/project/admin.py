@@ -1,14 +1,30 @@
-from django.contrib import admin
-from .forms import ProjectForm
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.files.storage import default_storage
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from .admin_performance import PerformanceAdminMixin
+from .criteria import mark_criteria
+from .forms import IssueDependencyForm, IssueForm, ProjectForm
+from .importexport import detect_format, export_response
+from .jobs import enqueue
 from .models import (
+    Attachment,
     Project,
     Issue,
+    IssueDependency,
+    Job,
     Sprint,
     Epic,
     UserStory,
     AcceptanceCriteria,
     ProjectMember,
+    SearchDocument,
 )
+from .search import filter_by_search
 
 
 class ProjectMemberInline(admin.TabularInline):
@@ -19,9 +35,46 @@ class ProjectMemberInline(admin.TabularInline):
     autocomplete_fields = ("user",)  # Enable autocomplete for User if applicable
 
 
+class IssueDependencyInline(admin.TabularInline):
+    model = IssueDependency
+    form = IssueDependencyForm
+    fk_name = "issue"
+    extra = 1
+    autocomplete_fields = ("depends_on",)
+    verbose_name = "dependency"
+    verbose_name_plural = "dependencies"
+
+
+class AttachmentInline(admin.TabularInline):
+    """Attachments are uploaded through the issue pages; here they're listed."""
+
+    model = Attachment
+    extra = 0
+    fields = ("filename", "blob", "uploaded_by", "created_at")
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class SearchIndexAdminMixin:
+    """Answer the changelist search box from the full-text index."""
+
+    search_kind = None
+    search_help_text = (
+        "Searches the full-text index of titles and descriptions. Every match "
+        "is listed, not just the best ranked ones."
+    )
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return filter_by_search(queryset, search_term, self.search_kind), False
+
+
 # Register Project model
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = (
         "name",
         "methodology",
@@ -36,11 +89,93 @@ class ProjectAdmin(admin.ModelAdmin):
     search_fields = ("name", "description")
     ordering = ("-created_at",)
     inlines = [ProjectMemberInline]
+    actions = [
+        "import_issues",
+        "backfill_sprint_snapshots",
+        "export_issues_csv",
+        "export_issues_jsonl",
+    ]
+
+    def _single_project(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(
+                request, "Select exactly one project.", level=messages.ERROR
+            )
+            return None
+        return queryset.get()
+
+    @admin.action(description="Import issues from CSV/JSONL")
+    def import_issues(self, request, queryset):
+        project = self._single_project(request, queryset)
+        if project is None:
+            return None
+        upload = request.FILES.get("file")
+        if "apply" in request.POST and upload is not None:
+            # Large files take a while, the worker imports them
+            path = default_storage.save(f"imports/{upload.name}", upload)
+            job = enqueue(
+                "import_issues",
+                created_by=request.user,
+                project_id=project.pk,
+                path=path,
+                fmt=detect_format(upload.name),
+                created_by_id=request.user.pk,
+            )
+            self.message_user(
+                request,
+                format_html(
+                    'Importing issues into {} in the background: <a href="{}">{}</a>.',
+                    project,
+                    reverse("job_detail", args=[job.pk]),
+                    job,
+                ),
+                level=messages.SUCCESS,
+            )
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "project": project,
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(
+            request, "admin/project/project/import_issues.html", context
+        )
+
+    @admin.action(description="Backfill sprint snapshots")
+    def backfill_sprint_snapshots(self, request, queryset):
+        for project in queryset:
+            job = enqueue(
+                "backfill_sprint_snapshots",
+                created_by=request.user,
+                project_id=project.pk,
+            )
+            self.message_user(
+                request,
+                format_html(
+                    'Backfilling {} in the background: <a href="{}">{}</a>.',
+                    project,
+                    reverse("job_detail", args=[job.pk]),
+                    job,
+                ),
+                level=messages.SUCCESS,
+            )
+
+    @admin.action(description="Export issues as CSV")
+    def export_issues_csv(self, request, queryset):
+        project = self._single_project(request, queryset)
+        return export_response(project, "csv") if project else None
+
+    @admin.action(description="Export issues as JSONL")
+    def export_issues_jsonl(self, request, queryset):
+        project = self._single_project(request, queryset)
+        return export_response(project, "jsonl") if project else None
 
 
 # Register Issue model
 @admin.register(Issue)
-class IssueAdmin(admin.ModelAdmin):
+class IssueAdmin(SearchIndexAdminMixin, PerformanceAdminMixin, admin.ModelAdmin):
+    search_kind = SearchDocument.Kinds.ISSUE
     list_display = (
         "title",
         "project",
@@ -52,6 +187,8 @@ class IssueAdmin(admin.ModelAdmin):
         "created_at",
         "updated_at",
     )
+    form = IssueForm
+    inlines = [IssueDependencyInline, AttachmentInline]
     list_filter = ("_type", "status", "priority", "project", "assignee")
     search_fields = ("title", "description")
     ordering = ("-created_at",)
@@ -59,7 +196,7 @@ class IssueAdmin(admin.ModelAdmin):
 
 # Register Sprint model
 @admin.register(Sprint)
-class SprintAdmin(admin.ModelAdmin):
+class SprintAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = (
         "name",
         "project",
@@ -78,7 +215,8 @@ class SprintAdmin(admin.ModelAdmin):
 
 # Register Epic model
 @admin.register(Epic)
-class EpicAdmin(admin.ModelAdmin):
+class EpicAdmin(SearchIndexAdminMixin, PerformanceAdminMixin, admin.ModelAdmin):
+    search_kind = SearchDocument.Kinds.EPIC
     list_display = (
         "title",
         "project",
@@ -97,7 +235,8 @@ class EpicAdmin(admin.ModelAdmin):
 
 # Register UserStory model
 @admin.register(UserStory)
-class UserStoryAdmin(admin.ModelAdmin):
+class UserStoryAdmin(SearchIndexAdminMixin, PerformanceAdminMixin, admin.ModelAdmin):
+    search_kind = SearchDocument.Kinds.USER_STORY
     list_display = (
         "title",
         "priority",
@@ -114,7 +253,7 @@ class UserStoryAdmin(admin.ModelAdmin):
 
 # Register AcceptanceCriteria model
 @admin.register(AcceptanceCriteria)
-class AcceptanceCriteriaAdmin(admin.ModelAdmin):
+class AcceptanceCriteriaAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = (
         "user_story",
         "criteria_type",
@@ -126,3 +265,52 @@ class AcceptanceCriteriaAdmin(admin.ModelAdmin):
     list_filter = ("criteria_type", "is_met", "user_story")
     search_fields = ("user_story__title", "description")
     ordering = ("-created_at",)
+    actions = ["mark_met", "mark_unmet"]
+
+    def _mark(self, request, queryset, is_met):
+        result = mark_criteria(queryset, is_met)
+        self.message_user(
+            request,
+            f"Updated {result.updated} acceptance criteria, "
+            f"completed {len(result.completed)} and reopened "
+            f"{len(result.reopened)} user stories.",
+            level=messages.SUCCESS,
+        )
+
+    @admin.action(description="Mark selected acceptance criteria as met")
+    def mark_met(self, request, queryset):
+        self._mark(request, queryset, True)
+
+    @admin.action(description="Mark selected acceptance criteria as not met")
+    def mark_unmet(self, request, queryset):
+        self._mark(request, queryset, False)
+
+
+@admin.register(Job)
+class JobAdmin(PerformanceAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "task",
+        "status",
+        "attempts",
+        "max_attempts",
+        "run_at",
+        "created_by",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status", "task")
+    ordering = ("-created_at",)
+    readonly_fields = ("locked_by", "locked_at", "result", "error", "finished_at")
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Run selected failed jobs again")
+    def retry_jobs(self, request, queryset):
+        retried = queryset.filter(status=Job.Statuses.FAILED).update(
+            status=Job.Statuses.QUEUED,
+            attempts=0,
+            run_at=timezone.now(),
+            finished_at=None,
+        )
+        self.message_user(
+            request, f"Queued {retried} jobs again.", level=messages.SUCCESS
+        )
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProjectConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.project"
+
+    def ready(self) -> None:
+        from . import signals, tasks  # noqa: F401
@@ -0,0 +1,422 @@
+"""Issue attachments: chunked uploads into a content-addressed store.
+
+An upload is opened with its size, then sent in chunks that are appended to
+a partial file under ``ATTACHMENT_ROOT/uploads``; a dropped upload resumes
+from ``AttachmentUpload.received``. Once complete the file is hashed and
+moved to ``blobs/<sha256>``, or thrown away if that content is already
+stored, so every distinct file is on disk once however often it's attached.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow attachments just have no thumbnails
+    Image = None
+
+from .models import Attachment, AttachmentUpload, Blob
+
+COPY_BUFFER = 64 * 1024
+HASH_BUFFER = 1024 * 1024
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+# Leading bytes -> MIME type, for what the browser claimed at upload
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+)
+# Sniffed types a browser may show in the page. Anything else (HTML, SVG,
+# whatever the uploader claimed) is sent as a download of opaque bytes, so
+# an attachment can't run script in the app's origin.
+INLINE_TYPES = frozenset(
+    {"image/png", "image/jpeg", "image/gif", "image/webp", "application/pdf"}
+)
+
+
+class UploadOffsetError(ValidationError):
+    """A chunk doesn't start where the upload left off."""
+
+
+def storage() -> FileSystemStorage:
+    return FileSystemStorage(location=settings.ATTACHMENT_ROOT)
+
+
+def blob_name(sha256: str) -> str:
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def thumbnail_name(sha256: str) -> str:
+    return f"thumbnails/{sha256[:2]}/{sha256[2:4]}/{sha256}.png"
+
+
+def partial_name(upload) -> str:
+    return f"uploads/{upload.pk}.part"
+
+
+def _path(name: str) -> str:
+    path = storage().path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def clean_filename(filename: str) -> str:
+    filename = os.path.basename(filename.replace("\\", "/")).strip()
+    if not filename:
+        raise ValidationError("A file name is required.", code="filename")
+    return filename[:255]
+
+
+def attachment_data(attachment) -> dict:
+    blob = attachment.blob
+    return {
+        "id": attachment.pk,
+        "filename": attachment.filename,
+        "size": blob.size,
+        "content_type": blob.content_type,
+        "sha256": blob.sha256,
+        "created_at": attachment.created_at.isoformat(),
+    }
+
+
+# Uploads
+def attach_existing(issue, sha256: str, filename: str, user=None):
+    """Attach content already attached in ``issue``'s project without uploading it.
+
+    Returns the new ``Attachment``, or None when the project has no such
+    content; the client then uploads the file, which is still stored once.
+    Content attached elsewhere isn't offered, so a hash can't be used to
+    probe for or take files from projects the user can't see.
+    """
+    sha256 = sha256.lower()
+    if not SHA256_RE.match(sha256):
+        return None
+    blob = Blob.objects.filter(
+        sha256=sha256, attachments__issue__project_id=issue.project_id
+    ).first()
+    if blob is None or not storage().exists(blob_name(sha256)):
+        return None
+    return Attachment.objects.create(
+        issue=issue, blob=blob, filename=clean_filename(filename), uploaded_by=user
+    )
+
+
+def start_upload(issue, filename: str, size: int, content_type: str = "", user=None):
+    if size < 0 or size > settings.ATTACHMENT_MAX_SIZE:
+        raise ValidationError(
+            "Attachments can be at most %(max)s bytes.",
+            code="size",
+            params={"max": settings.ATTACHMENT_MAX_SIZE},
+        )
+    filename = clean_filename(filename)
+    if not content_type:
+        content_type = mimetypes.guess_type(filename)[0] or ""
+    return AttachmentUpload.objects.create(
+        issue=issue,
+        filename=filename,
+        content_type=content_type[:100],
+        size=size,
+        created_by=user,
+    )
+
+
+def write_chunk(upload, offset: int, stream, length: int) -> int:
+    """Append ``length`` bytes read from ``stream`` at ``offset``.
+
+    The chunk is copied to disk as it arrives instead of being held in
+    memory. Returns the new offset, which falls short of ``offset + length``
+    when the client went away mid-chunk; it resumes from there.
+    """
+    if offset != upload.received:
+        raise UploadOffsetError(
+            "The upload continues at byte %(offset)s.",
+            code="offset",
+            params={"offset": upload.received},
+        )
+    if length > settings.ATTACHMENT_CHUNK_SIZE or offset + length > upload.size:
+        raise ValidationError("The chunk is too large.", code="chunk")
+    path = _path(partial_name(upload))
+    written = 0
+    with open(path, "r+b" if offset else "wb") as file:
+        # Bytes past ``received`` are left from a chunk that never completed
+        file.seek(offset)
+        file.truncate()
+        while written < length:
+            data = stream.read(min(COPY_BUFFER, length - written))
+            if not data:
+                break
+            file.write(data)
+            written += len(data)
+    received = offset + written
+    updated = AttachmentUpload.objects.filter(pk=upload.pk, received=offset).update(
+        received=received
+    )
+    if not updated:
+        raise UploadOffsetError(
+            "Another chunk was written at the same time.", code="offset"
+        )
+    upload.received = received
+    return received
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while data := file.read(HASH_BUFFER):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def finish_upload(upload, sha256: str = "") -> Attachment:
+    """Store a complete upload under its hash and attach it to its issue.
+
+    ``sha256``, when the client sends it, must match what arrived.
+    """
+    if upload.received != upload.size:
+        raise ValidationError(
+            "Only %(received)s of %(size)s bytes were uploaded.",
+            code="incomplete",
+            params={"received": upload.received, "size": upload.size},
+        )
+    path = _path(partial_name(upload))
+    if not upload.size:
+        open(path, "ab").close()
+    digest = _sha256(path)
+    if sha256 and sha256.lower() != digest:
+        os.remove(path)
+        upload.delete()
+        raise ValidationError(
+            "The uploaded file doesn't match its checksum.", code="checksum"
+        )
+    target = _path(blob_name(digest))
+    if os.path.exists(target):
+        os.remove(path)
+    else:
+        # A rename, not a copy: the partial file is already on the same disk
+        os.replace(path, target)
+    with transaction.atomic():
+        blob, _ = Blob.objects.get_or_create(
+            sha256=digest,
+            defaults={"size": upload.size, "content_type": upload.content_type},
+        )
+        attachment = Attachment.objects.create(
+            issue_id=upload.issue_id,
+            blob=blob,
+            filename=upload.filename,
+            uploaded_by_id=upload.created_by_id,
+        )
+        upload.delete()
+    return attachment
+
+
+def prune_uploads(cutoff) -> int:
+    """Drop uploads untouched since ``cutoff`` and partial files without one."""
+    deleted, _ = AttachmentUpload.objects.filter(updated_at__lt=cutoff).delete()
+    store = storage()
+    if store.exists("uploads"):
+        live = {str(pk) for pk in AttachmentUpload.objects.values_list("pk", flat=True)}
+        for name in store.listdir("uploads")[1]:
+            if name.removesuffix(".part") not in live:
+                store.delete(f"uploads/{name}")
+    return deleted
+
+
+def prune_blobs() -> int:
+    """Delete stored content no attachment refers to any more."""
+    store = storage()
+    orphans = Blob.objects.filter(attachments__isnull=True)
+    deleted = 0
+    for blob in orphans.only("sha256").iterator():
+        with transaction.atomic():
+            if not Blob.objects.filter(pk=blob.pk, attachments__isnull=True).delete()[
+                0
+            ]:
+                continue
+            store.delete(blob_name(blob.sha256))
+            store.delete(thumbnail_name(blob.sha256))
+        deleted += 1
+    return deleted
+
+
+# Metadata and thumbnails
+def _sniff(path: str) -> str:
+    with open(path, "rb") as file:
+        head = file.read(16)
+    for signature, mime in SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return ""
+
+
+def blob_metadata(blob) -> dict:
+    """What the stored file is, worked out on first use and kept on the blob."""
+    if blob.metadata is not None:
+        return blob.metadata
+    path = storage().path(blob_name(blob.sha256))
+    sniffed = _sniff(path)
+    metadata = {
+        "content_type": sniffed or blob.content_type or "application/octet-stream",
+        # Only sniffed types are trusted, see ``INLINE_TYPES``
+        "sniffed": bool(sniffed),
+        "image": sniffed.startswith("image/"),
+    }
+    if metadata["image"] and Image is not None:
+        try:
+            with Image.open(path) as image:
+                metadata.update(width=image.width, height=image.height)
+        except OSError:
+            metadata["image"] = False
+    Blob.objects.filter(pk=blob.pk).update(metadata=metadata)
+    blob.metadata = metadata
+    return metadata
+
+
+def blob_thumbnail(blob):
+    """Storage name of a PNG thumbnail of an image blob, made on first use.
+
+    None when the blob isn't an image or Pillow isn't installed.
+    """
+    if Image is None or not blob_metadata(blob)["image"]:
+        return None
+    name = thumbnail_name(blob.sha256)
+    store = storage()
+    if not store.exists(name):
+        path = _path(name)
+        partial = f"{path}.{os.getpid()}"
+        try:
+            with Image.open(store.path(blob_name(blob.sha256))) as image:
+                image.thumbnail(settings.ATTACHMENT_THUMBNAIL_SIZE)
+                image.save(partial, "PNG")
+        except OSError:
+            return None
+        os.replace(partial, path)
+    return name
+
+
+# Downloads
+def parse_range(header, size: int):
+    """``(first, last)`` byte of a single ``Range: bytes=`` header.
+
+    None means send the whole file, which is also the answer to ranges this
+    doesn't handle (several at once). Raises ValueError if unsatisfiable.
+    """
+    match = RANGE_RE.match(header or "")
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # "bytes=-500" is the last 500 bytes
+        if not int(last) or not size:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size:
+        raise ValueError(header)
+    if last < first:
+        return None
+    return first, last
+
+
+class _RangeFile:
+    """The ``length`` bytes of an open file from where it's positioned."""
+
+    def __init__(self, file, length: int):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def inline_content_type(blob):
+    """The type ``blob`` may be shown inline as, or None to force a download."""
+    metadata = blob_metadata(blob)
+    if metadata.get("sniffed") and metadata["content_type"] in INLINE_TYPES:
+        return metadata["content_type"]
+    return None
+
+
+def serve_blob(request, blob, filename: str, as_attachment: bool = True):
+    """Send a stored file, honouring ``Range`` and ``If-None-Match``.
+
+    Only ``INLINE_TYPES`` keep their type and may be sent inline; everything
+    else goes out as an ``application/octet-stream`` download. With
+    ``ATTACHMENT_SENDFILE`` set only headers are sent and the web server
+    streams the file, ranges included.
+    """
+    name = blob_name(blob.sha256)
+    content_type = inline_content_type(blob)
+    if content_type is None:
+        content_type, as_attachment = "application/octet-stream", True
+    etag = f'"{blob.sha256}"'
+    if request.headers.get("If-None-Match") == etag:
+        return HttpResponseNotModified(headers={"ETag": etag})
+    sendfile = settings.ATTACHMENT_SENDFILE
+    if sendfile:
+        response = HttpResponse(content_type=content_type)
+        if sendfile == "x-accel-redirect":
+            response["X-Accel-Redirect"] = settings.ATTACHMENT_ACCEL_PREFIX + name
+        else:
+            response["X-Sendfile"] = storage().path(name)
+        response["Content-Disposition"] = content_disposition_header(
+            as_attachment, filename
+        )
+    else:
+        byte_range = None
+        if request.headers.get("If-Range", etag) == etag:
+            try:
+                byte_range = parse_range(request.headers.get("Range"), blob.size)
+            except ValueError:
+                return HttpResponse(
+                    status=416, headers={"Content-Range": f"bytes */{blob.size}"}
+                )
+        file = storage().open(name, "rb")
+        if byte_range is None:
+            response = FileResponse(
+                file,
+                as_attachment=as_attachment,
+                filename=filename,
+                content_type=content_type,
+            )
+        else:
+            first, last = byte_range
+            file.seek(first)
+            response = FileResponse(
+                _RangeFile(file, last - first + 1),
+                status=206,
+                as_attachment=as_attachment,
+                filename=filename,
+                content_type=content_type,
+            )
+            response["Content-Length"] = last - first + 1
+            response["Content-Range"] = f"bytes {first}-{last}/{blob.size}"
+        response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    # The content under a hash never changes
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
@@ -0,0 +1,257 @@
+import http.client
+import platform
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Epic, Issue, Project, ProjectAccess, ProjectMember, UserStory
+from .graph import invalidate_schedule, project_schedule
+from .navigation import get_navigation, invalidate_navigation
+
+
+@dataclass
+class Benchmark:
+    name: str
+    run: Callable[[], object]
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(func, repeat: int = 20, warmup: int = 2, cold: bool = False) -> dict:
+    """Time ``func`` and count its queries; memory is traced in a separate run."""
+    for _ in range(warmup):
+        func()
+    timings, queries = [], []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "min_ms": round(min(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "queries": max(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def _get(client, url):
+    def run():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+        return response
+
+    return run
+
+
+def benchmark_project(user, project_id=None) -> int:
+    """``project_id``, or the first project ``user`` has access to."""
+    if project_id is None:
+        project_id = (
+            ProjectAccess.objects.filter(user=user)
+            .order_by("project_id")
+            .values_list("project_id", flat=True)
+            .first()
+        )
+    if project_id is None:
+        raise ValueError(f"{user} has no project access to benchmark.")
+    return project_id
+
+
+def sidebar_fragment_keys(user) -> list[str]:
+    """Cache keys of the ``{% cache %}`` fragments in the user's sidebar."""
+    navigation = get_navigation(user)
+    keys = [make_template_fragment_key("sidebar", [user.pk, navigation["version"]])]
+    for project in navigation["projects"]:
+        vary_on = [project["pk"], project["name"], project["member_count"]]
+        keys.append(make_template_fragment_key("sidebar_project", vary_on))
+    return keys
+
+
+def build_benchmarks(user, project_id=None) -> list[Benchmark]:
+    """The pages to time, against ``project_id`` or the user's first project."""
+    project_id = benchmark_project(user, project_id)
+    client = Client()
+    client.force_login(user)
+    request = RequestFactory().get("/")
+    request.user = user
+
+    def sidebar():
+        return render_to_string("includes/sidebar.html", request=request)
+
+    def sidebar_cold():
+        invalidate_navigation(user.pk)
+        return sidebar()
+
+    def sidebar_uncached():
+        # Every component rendered again, as without fragment caching
+        cache.delete_many(sidebar_fragment_keys(user))
+        return sidebar()
+
+    def schedule_cold():
+        invalidate_schedule(project_id)
+        return project_schedule(project_id)
+
+    benchmarks = [
+        Benchmark("project_list", _get(client, reverse("project_list"))),
+        Benchmark(
+            "project_detail", _get(client, reverse("project_detail", args=[project_id]))
+        ),
+    ]
+    for name in (
+        "project_members_list",
+        "project_epics_list",
+        "project_issues_list",
+        "project_user_stories_list",
+        "project_sprints_list",
+    ):
+        benchmarks.append(
+            Benchmark(name, _get(client, reverse(name, args=[project_id])))
+        )
+    benchmarks.append(
+        Benchmark(
+            "project_search", _get(client, reverse("project_search") + "?search=login")
+        )
+    )
+    if user.is_staff:
+        for model in ("project", "issue", "epic", "userstory"):
+            url = reverse(f"admin:project_{model}_changelist")
+            benchmarks.append(Benchmark(f"admin_{model}_changelist", _get(client, url)))
+    benchmarks.append(Benchmark("project_schedule_cold", schedule_cold))
+    benchmarks.append(Benchmark("sidebar", sidebar))
+    benchmarks.append(Benchmark("sidebar_cold", sidebar_cold))
+    benchmarks.append(Benchmark("sidebar_uncached", sidebar_uncached))
+    return benchmarks
+
+
+# Pages with both a sync and an async ("a" prefixed) view.
+LOAD_TEST_PAGES = (
+    "project_list",
+    "project_detail",
+    "project_members_list",
+    "project_epics_list",
+)
+
+
+def load_test_urls(project_id) -> dict:
+    """``{page: (sync url, async url)}`` for ``LOAD_TEST_PAGES``."""
+    urls = {}
+    for name in LOAD_TEST_PAGES:
+        args = [] if name == "project_list" else [project_id]
+        urls[name] = (reverse(name, args=args), reverse(f"a{name}", args=args))
+    return urls
+
+
+def session_cookie(user) -> str:
+    """A ``Cookie`` header for a new session of ``user`` in the session store."""
+    client = Client()
+    client.force_login(user)
+    name = settings.SESSION_COOKIE_NAME
+    return f"{name}={client.cookies[name].value}"
+
+
+def load_test(
+    server, path, cookie="", concurrency: int = 20, requests: int = 200
+) -> dict:
+    """Send ``requests`` GETs for ``path`` to ``server`` from ``concurrency`` threads.
+
+    ``server`` is the base URL of a separately running server, so the
+    timings include how it runs sync views (in threads) and async views (on
+    its event loop), over real HTTP connections kept alive per thread.
+    """
+    parts = urlsplit(server)
+    connection_class = (
+        http.client.HTTPSConnection
+        if parts.scheme == "https"
+        else http.client.HTTPConnection
+    )
+    url = parts.path.rstrip("/") + path
+    headers = {"Cookie": cookie} if cookie else {}
+    lock = threading.Lock()
+    remaining = requests
+    timings, errors = [], 0
+
+    def worker():
+        nonlocal remaining, errors
+        connection = connection_class(parts.hostname, parts.port, timeout=30)
+        try:
+            while True:
+                with lock:
+                    if remaining <= 0:
+                        return
+                    remaining -= 1
+                start = time.perf_counter()
+                try:
+                    connection.request("GET", url, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    failed = response.status != 200
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    failed = True
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    timings.append(elapsed)
+                    errors += failed
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(timings) / elapsed, 1),
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+    }
+
+
+def environment() -> dict:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "rows": {
+            model.__name__: model.objects.count()
+            for model in (Project, ProjectMember, Epic, UserStory, Issue)
+        },
+    }
@@ -0,0 +1,199 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ChangeLog, Epic, Issue, Sprint, UserStory
+
+KINDS = {
+    Issue: ChangeLog.Kinds.ISSUE,
+    Epic: ChangeLog.Kinds.EPIC,
+    Sprint: ChangeLog.Kinds.SPRINT,
+    UserStory: ChangeLog.Kinds.USER_STORY,
+}
+# Most changes read, and sent in one frame, per poll.
+BATCH_SIZE = 200
+
+
+def change_data(instance) -> dict:
+    title = getattr(instance, "title", None) or getattr(instance, "name", "")
+    return {"title": str(title), "status": instance.status}
+
+
+def record_change(instance, action, project_ids) -> None:
+    """Log a change of ``instance`` for each of ``project_ids`` on commit.
+
+    Rolled back changes are never logged, and a row becomes visible to the
+    stream only once what it describes is visible too.
+    """
+    record_changes([instance], action, project_ids)
+
+
+def record_changes(instances, action, project_ids) -> None:
+    """``record_change`` for many instances of one model, in one INSERT."""
+    project_ids = [
+        project_id for project_id in dict.fromkeys(project_ids) if project_id
+    ]
+    rows = [
+        ChangeLog(
+            project_id=project_id,
+            kind=KINDS[type(instance)],
+            object_id=instance.pk,
+            action=action,
+            data=change_data(instance),
+        )
+        for instance in instances
+        for project_id in project_ids
+    ]
+    _write_on_commit(rows)
+
+
+def _write_on_commit(rows) -> None:
+    if rows:
+        transaction.on_commit(
+            lambda: ChangeLog.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        )
+
+
+def record_bulk_change(queryset, action, project_ids) -> None:
+    """``record_change`` for every row of ``queryset``, in one read.
+
+    For rows written with ``QuerySet.update()``, which sends no signals.
+    """
+    if any(project_ids):
+        record_changes(queryset.only("title", "status"), action, project_ids)
+
+
+def record_user_story_changes(user_story_ids, action) -> None:
+    """``record_bulk_change`` for user stories, each logged for its own projects.
+
+    A story belongs to the projects of its epic and its sprint; both are
+    read along with the stories.
+    """
+    stories = (
+        UserStory.objects.filter(pk__in=user_story_ids)
+        .annotate(
+            epic_project_id=F("epic__project_id"),
+            sprint_project_id=F("sprint__project_id"),
+        )
+        .only("title", "status")
+    )
+    rows = [
+        ChangeLog(
+            project_id=project_id,
+            kind=ChangeLog.Kinds.USER_STORY,
+            object_id=story.pk,
+            action=action,
+            data=change_data(story),
+        )
+        for story in stories
+        for project_id in dict.fromkeys(
+            (story.epic_project_id, story.sprint_project_id)
+        )
+        if project_id
+    ]
+    _write_on_commit(rows)
+
+
+def coalesce(changes) -> list[dict]:
+    """Collapse a burst of changes to the last state of each object.
+
+    An object created and deleted within the burst is left out; one created
+    and then updated is reported as created.
+    """
+    latest: dict = {}
+    for change in changes:
+        key = (change.kind, change.object_id)
+        action = change.action
+        previous = latest.pop(key, None)
+        if previous and previous["action"] == ChangeLog.Actions.CREATED:
+            if action == ChangeLog.Actions.DELETED:
+                continue
+            action = ChangeLog.Actions.CREATED
+        latest[key] = {
+            "kind": change.kind,
+            "id": change.object_id,
+            "action": action,
+            **change.data,
+        }
+    return list(latest.values())
+
+
+def _settled(changes):
+    """Leave out the changes of the last ``CHANGE_STREAM_COMMIT_LAG`` seconds.
+
+    The stream resumes after the last id it sent. On SQLite, which commits
+    one write at a time, rows become visible in id order. Elsewhere a row
+    can commit after one with a higher id, and the cursor would already be
+    past it. Reading only rows older than the lag gives such writes (short
+    INSERTs, run after the change itself commits) time to land first.
+    """
+    if connections[changes.db].vendor == "sqlite":
+        return changes
+    lag = timedelta(seconds=settings.CHANGE_STREAM_COMMIT_LAG)
+    return changes.filter(created_at__lte=timezone.now() - lag)
+
+
+async def alatest_change_id(project_id) -> int:
+    latest = (
+        _settled(ChangeLog.objects.filter(project_id=project_id))
+        .order_by("-pk")
+        .values_list("pk", flat=True)
+    )
+    return await latest.afirst() or 0
+
+
+async def achanges_since(project_id, cursor: int, limit: int = BATCH_SIZE) -> list:
+    changes = _settled(
+        ChangeLog.objects.filter(project_id=project_id, pk__gt=cursor)
+    ).order_by("pk")
+    return [change async for change in changes[:limit]]
+
+
+def format_event(event: str, data, event_id=None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.insert(0, f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def change_stream(project_id, cursor: int):
+    """Server-sent events with the project's changes after ``cursor``.
+
+    The table is polled every ``CHANGE_STREAM_POLL_INTERVAL`` seconds (see
+    ``_settled`` for databases other than SQLite). Once a
+    change shows up the stream waits ``CHANGE_STREAM_COALESCE`` seconds for
+    the rest of the burst and sends it as one ``changes`` event, whose id is
+    the cursor to resume from (browsers send it back as ``Last-Event-ID``).
+    Idle streams get a comment every ``CHANGE_STREAM_HEARTBEAT`` seconds and
+    close after ``CHANGE_STREAM_TIMEOUT``; the client then reconnects.
+    """
+    poll = settings.CHANGE_STREAM_POLL_INTERVAL
+    window = settings.CHANGE_STREAM_COALESCE
+    heartbeat = settings.CHANGE_STREAM_HEARTBEAT
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.CHANGE_STREAM_TIMEOUT
+    last_sent = loop.time()
+    yield f"retry: {int(poll * 1000) + 1000}\n\n"
+    while loop.time() < deadline:
+        changes = await achanges_since(project_id, cursor)
+        if changes and len(changes) < BATCH_SIZE and window:
+            await asyncio.sleep(window)
+            changes += await achanges_since(
+                project_id, changes[-1].pk, BATCH_SIZE - len(changes)
+            )
+        if changes:
+            cursor = changes[-1].pk
+            data = {"cursor": cursor, "changes": coalesce(changes)}
+            yield format_event("changes", data, cursor)
+            last_sent = loop.time()
+            continue
+        if loop.time() - last_sent >= heartbeat:
+            yield ": keepalive\n\n"
+            last_sent = loop.time()
+        await asyncio.sleep(poll)
@@ -1,14 +1,35 @@
-from django.db.models import Q
-from .models import Project
+from django.core.handlers.asgi import ASGIRequest
+
+from .navigation import aget_navigation, get_navigation
+
+EMPTY_NAVIGATION = {"projects": [], "total_projects": 0, "version": 0}
 
 
 def user_projects(request):
-    if request.user.is_authenticated:
-        user = request.user
-        projects = Project.objects.filter(Q(lead=user) | Q(members=user)).distinct()
+    navigation = getattr(request, "_navigation", None)
+    if navigation is None:
+        if request.user.is_authenticated:
+            navigation = get_navigation(request.user)
+        else:
+            # Anonymous users get an empty sidebar without touching the cache
+            navigation = EMPTY_NAVIGATION
+
+    return {"user_projects": navigation["projects"], "navigation": navigation}
+
+
+async def apreload_user_projects(request, user) -> None:
+    """Load the sidebar payload ahead of rendering in an async view.
+
+    Context processors are synchronous, so async views call this first and
+    ``user_projects`` then reuses the result instead of querying.
+    """
+    if user.is_authenticated:
+        request._navigation = await aget_navigation(user)
     else:
-        projects = (
-            Project.objects.none()
-        )  # Return an empty queryset for anonymous users
+        request._navigation = EMPTY_NAVIGATION
+
 
-    return {"user_projects": projects}
+def live_updates(request):
+    # The change stream holds its connection open for minutes, which only an
+    # ASGI server can afford; under WSGI each stream would take up a worker.
+    return {"live_updates": isinstance(request, ASGIRequest)}
@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, QuerySet
+from django.db.models.functions import Now
+from django.dispatch import Signal
+
+from .models import AcceptanceCriteria, Status, UserStory
+
+# Sent once per bulk update with ``criteria_ids``, ``user_story_ids``,
+# ``is_met``, ``completed`` and ``reopened`` (user story ids), and
+# ``previous``, the status each completed or reopened story had before.
+criteria_marked = Signal()
+
+
+@dataclass
+class MarkResult:
+    criteria_ids: list = field(default_factory=list)
+    user_story_ids: list = field(default_factory=list)
+    completed: list = field(default_factory=list)
+    reopened: list = field(default_factory=list)
+
+    @property
+    def updated(self) -> int:
+        return len(self.criteria_ids)
+
+
+def _sync_user_stories(user_story_ids) -> tuple[list, list, dict]:
+    """Complete stories whose criteria are all met, reopen the others.
+
+    Returns the completed and reopened ids and their statuses before.
+    """
+    unmet = AcceptanceCriteria.objects.filter(user_story=OuterRef("pk"), is_met=False)
+    rows = (
+        UserStory.objects.filter(pk__in=user_story_ids)
+        .order_by()
+        .values_list("pk", "status", Exists(unmet))
+    )
+    completed, reopened, previous = [], [], {}
+    for pk, status, has_unmet in rows:
+        if not has_unmet and status != Status.COMPLETED:
+            completed.append(pk)
+            previous[pk] = status
+        elif has_unmet and status == Status.COMPLETED:
+            reopened.append(pk)
+            previous[pk] = status
+    if completed:
+        UserStory.objects.filter(pk__in=completed).update(status=Status.COMPLETED)
+    if reopened:
+        UserStory.objects.filter(pk__in=reopened).update(status=Status.IN_PROGRESS)
+    return completed, reopened, previous
+
+
+def mark_criteria(criteria, is_met: bool, project=None) -> MarkResult:
+    """Mark ``criteria`` (ids or a queryset) met or unmet in one UPDATE.
+
+    Rows already in the requested state are left alone. Parent user stories
+    are completed or reopened in the same transaction, and
+    ``criteria_marked`` is sent once for the whole batch.
+    """
+    selected = AcceptanceCriteria.objects.exclude(is_met=is_met)
+    if isinstance(criteria, QuerySet):
+        selected = selected.filter(pk__in=criteria.values("pk"))
+    else:
+        selected = selected.filter(pk__in=list(criteria))
+    if project is not None:
+        selected = selected.filter(
+            Q(user_story__epic__project=project)
+            | Q(user_story__sprint__project=project)
+        )
+    result = MarkResult()
+    with transaction.atomic():
+        rows = list(selected.order_by().values_list("pk", "user_story_id"))
+        if not rows:
+            return result
+        result.criteria_ids = [pk for pk, _ in rows]
+        result.user_story_ids = sorted({story_id for _, story_id in rows})
+        AcceptanceCriteria.objects.filter(pk__in=result.criteria_ids).update(
+            is_met=is_met, is_met_date=Now() if is_met else None
+        )
+        result.completed, result.reopened, previous = _sync_user_stories(
+            result.user_story_ids
+        )
+        criteria_marked.send(
+            sender=AcceptanceCriteria,
+            criteria_ids=result.criteria_ids,
+            user_story_ids=result.user_story_ids,
+            is_met=is_met,
+            completed=result.completed,
+            reopened=result.reopened,
+            previous=previous,
+        )
+    return result
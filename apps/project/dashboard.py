@@ -0,0 +1,113 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Epic, Issue, Priority, Status, UserStory
+
+DASHBOARD_TIMEOUT = 60
+
+
+def _cache_key(project_id) -> str:
+    return f"project:dashboard:{project_id}"
+
+
+def _choice_counts(prefix: str, field: str, choices) -> dict:
+    return {
+        f"{prefix}__{value}": Count("pk", filter=Q(**{field: value}))
+        for value, _ in choices
+    }
+
+
+def _aggregates(groups: dict) -> dict:
+    aggregates = {"total": Count("pk")}
+    for name, (field, choices) in groups.items():
+        aggregates.update(_choice_counts(name, field, choices))
+    return aggregates
+
+
+def _shape(counts: dict, groups: dict) -> dict:
+    result = {"total": counts["total"]}
+    for name, (field, choices) in groups.items():
+        result[name] = [
+            {"value": value, "label": label, "count": counts[f"{name}__{value}"]}
+            for value, label in choices
+        ]
+    return result
+
+
+def _aggregate(queryset, groups: dict) -> dict:
+    """Count rows per choice of each field of ``groups`` in a single query.
+
+    ``groups`` maps a group name to ``(field, choices)``; the result maps it
+    to a list of ``{"value", "label", "count"}`` plus an overall total.
+    """
+    counts = queryset.order_by().aggregate(**_aggregates(groups))
+    return _shape(counts, groups)
+
+
+def _sections(project) -> dict:
+    return {
+        "issues": (
+            Issue.objects.filter(project=project),
+            {
+                "status": ("status", Status.choices),
+                "priority": ("priority", Priority.choices),
+                "type": ("_type", Issue.IssueType.choices),
+            },
+        ),
+        "epics": (
+            Epic.objects.filter(project=project),
+            {
+                "status": ("status", Epic.EpicStatuses.choices),
+                "priority": ("priority", Priority.choices),
+            },
+        ),
+        "user_stories": (
+            UserStory.objects.filter(
+                Q(epic__project=project) | Q(sprint__project=project)
+            ),
+            {
+                "status": ("status", Status.choices),
+                "priority": ("priority", Priority.choices),
+            },
+        ),
+    }
+
+
+def compute_dashboard(project) -> dict:
+    """Per status/priority/type counts for a project, one query per model."""
+    return {
+        name: _aggregate(queryset, groups)
+        for name, (queryset, groups) in _sections(project).items()
+    }
+
+
+async def acompute_dashboard(project) -> dict:
+    dashboard = {}
+    for name, (queryset, groups) in _sections(project).items():
+        counts = await queryset.order_by().aaggregate(**_aggregates(groups))
+        dashboard[name] = _shape(counts, groups)
+    return dashboard
+
+
+def project_dashboard(project) -> dict:
+    key = _cache_key(project.pk)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = compute_dashboard(project)
+        cache.set(key, dashboard, DASHBOARD_TIMEOUT)
+    return dashboard
+
+
+async def aproject_dashboard(project) -> dict:
+    key = _cache_key(project.pk)
+    dashboard = await cache.aget(key)
+    if dashboard is None:
+        dashboard = await acompute_dashboard(project)
+        await cache.aset(key, dashboard, DASHBOARD_TIMEOUT)
+    return dashboard
+
+
+def invalidate_dashboard(*project_ids) -> None:
+    cache.delete_many(
+        [_cache_key(project_id) for project_id in project_ids if project_id]
+    )
@@ -0,0 +1,330 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .access import rebuild_project_access
+from .models import (
+    AcceptanceCriteria,
+    Categories,
+    Epic,
+    Issue,
+    IssueDependency,
+    Priority,
+    Project,
+    ProjectMember,
+    ProjectType,
+    Roles,
+    Sprint,
+    Status,
+    User,
+    UserStory,
+)
+from .rollups import reconcile_epics, reconcile_user_stories
+from .search import rebuild_documents
+
+BASE_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+WORDS = (
+    "login checkout invoice report export dashboard payment search cache "
+    "session upload billing profile sprint release mobile api webhook email "
+    "timeout crash layout migration permission audit refund import backlog"
+).split()
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    projects: int
+    members_per_project: int
+    sprints_per_project: int
+    epics_per_project: int
+    stories_per_epic: int
+    criteria_per_story: int
+    issues: int
+
+
+SCALES = {
+    "tiny": Scale(20, 3, 5, 2, 2, 2, 1, 200),
+    "small": Scale(500, 100, 10, 4, 5, 4, 2, 20_000),
+    "medium": Scale(5_000, 1_000, 20, 6, 5, 4, 2, 200_000),
+    "large": Scale(50_000, 10_000, 25, 8, 5, 4, 2, 1_000_000),
+}
+
+
+class DataGenerator:
+    """Fill the project tables with deterministic synthetic data.
+
+    Every row is written with ``bulk_create``, so no signals run; the
+    derived tables (project access, search documents) are rebuilt at the
+    end. The same ``seed`` and scale always produce the same data.
+    """
+
+    def __init__(self, scale: Scale, seed: int = 0, batch_size: int = 2000, log=None):
+        self.scale = scale
+        self.seed = seed
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.prefix = f"bench{seed}"
+        self.log = log or (lambda message: None)
+
+    def exists(self) -> bool:
+        return User.objects.filter(username__startswith=f"{self.prefix}_").exists()
+
+    def words(self, count: int) -> str:
+        return " ".join(self.rng.choices(WORDS, k=count))
+
+    def day(self, offset: int) -> datetime:
+        return BASE_DATE + timedelta(days=offset)
+
+    def run(self) -> dict:
+        counts = {}
+        with transaction.atomic():
+            user_ids = self.create_users()
+            counts["users"] = len(user_ids)
+            project_ids = self.create_projects(user_ids)
+            counts["projects"] = len(project_ids)
+            counts["members"] = self.create_members(project_ids, user_ids)
+            sprints = self.create_sprints(project_ids)
+            counts["sprints"] = sum(len(ids) for ids in sprints.values())
+            epics = self.create_epics(project_ids, user_ids)
+            counts["epics"] = sum(len(ids) for ids in epics.values())
+            stories = self.create_user_stories(epics, sprints)
+            counts["user_stories"] = sum(len(ids) for ids in stories.values())
+            counts["acceptance_criteria"] = self.create_criteria(stories)
+            counts["issues"] = self.create_issues(
+                project_ids, user_ids, sprints, epics, stories
+            )
+            self.log("Reconciling progress rollups")
+            reconcile_user_stories(batch_size=self.batch_size)
+            reconcile_epics(batch_size=self.batch_size)
+            self.log("Rebuilding project access")
+            counts["access"] = rebuild_project_access(self.batch_size)
+        self.log("Rebuilding search index")
+        counts["search_documents"] = rebuild_documents(self.batch_size)
+        return counts
+
+    def _bulk(self, model, objects) -> list:
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        return [obj.pk for obj in created]
+
+    def create_users(self) -> list:
+        self.log(f"Creating {self.scale.users} users")
+        password = make_password("password")
+        users = [
+            User(
+                username=f"{self.prefix}_{i}",
+                email=f"{self.prefix}_{i}@example.com",
+                password=password,
+                # The first user administers the data set and is the one
+                # the benchmarks log in as.
+                is_staff=i == 0,
+                is_superuser=i == 0,
+            )
+            for i in range(self.scale.users)
+        ]
+        return self._bulk(User, users)
+
+    def create_projects(self, user_ids) -> list:
+        self.log(f"Creating {self.scale.projects} projects")
+        projects = []
+        for i in range(self.scale.projects):
+            start = self.rng.randrange(365)
+            projects.append(
+                Project(
+                    name=f"{self.prefix} project {i}",
+                    methodology=self.rng.choice(ProjectType.values),
+                    description=self.words(30),
+                    start_date=self.day(start),
+                    end_date=self.day(start + self.rng.randrange(30, 365)),
+                    lead_id=user_ids[0] if i < 50 else self.rng.choice(user_ids),
+                    category=self.rng.choice(Categories.values),
+                    created_by_id=self.rng.choice(user_ids),
+                )
+            )
+        return self._bulk(Project, projects)
+
+    def create_members(self, project_ids, user_ids) -> int:
+        size = min(self.scale.members_per_project, len(user_ids))
+        self.log(f"Creating {size} members per project")
+        total, batch = 0, []
+        for i, project_id in enumerate(project_ids):
+            members = self.rng.sample(user_ids, size)
+            if i < 50 and user_ids[0] not in members:
+                members[0] = user_ids[0]
+            batch.extend(
+                ProjectMember(
+                    project_id=project_id,
+                    user_id=user_id,
+                    role=self.rng.choice(Roles.values),
+                    is_active=True,
+                )
+                for user_id in members
+            )
+            if len(batch) >= self.batch_size:
+                total += len(self._bulk(ProjectMember, batch))
+                batch = []
+        total += len(self._bulk(ProjectMember, batch))
+        return total
+
+    def create_sprints(self, project_ids) -> dict:
+        self.log(f"Creating {self.scale.sprints_per_project} sprints per project")
+        sprints = []
+        for project_id in project_ids:
+            for i in range(self.scale.sprints_per_project):
+                start = self.day(i * 14)
+                sprints.append(
+                    Sprint(
+                        project_id=project_id,
+                        name=f"Sprint {i + 1}",
+                        start_date=start,
+                        end_date=start + timedelta(days=14),
+                        duration=14,
+                        goal=self.words(8),
+                        status=self.rng.choice(Sprint.SprintStatuses.values),
+                        is_active=i == self.scale.sprints_per_project - 1,
+                    )
+                )
+        return self._group(self._bulk(Sprint, sprints), sprints, "project_id")
+
+    def create_epics(self, project_ids, user_ids) -> dict:
+        self.log(f"Creating {self.scale.epics_per_project} epics per project")
+        epics = [
+            Epic(
+                project_id=project_id,
+                title=f"{self.words(3).capitalize()} epic",
+                description=self.words(40),
+                goal=self.words(10),
+                status=self.rng.choice(Epic.EpicStatuses.values),
+                priority=self.rng.choice(Priority.values),
+                created_by_id=self.rng.choice(user_ids),
+            )
+            for project_id in project_ids
+            for _ in range(self.scale.epics_per_project)
+        ]
+        return self._group(self._bulk(Epic, epics), epics, "project_id")
+
+    def create_user_stories(self, epics, sprints) -> dict:
+        self.log(f"Creating {self.scale.stories_per_epic} user stories per epic")
+        stories = []
+        for project_id, epic_ids in epics.items():
+            project_sprints = sprints.get(project_id) or [None]
+            for epic_id in epic_ids:
+                stories.extend(
+                    UserStory(
+                        title=f"As a user I want {self.words(4)}",
+                        description=self.words(30),
+                        priority=self.rng.choice(Priority.values),
+                        status=self.rng.choice(Status.values),
+                        epic_id=epic_id,
+                        sprint_id=self.rng.choice(project_sprints),
+                    )
+                    for _ in range(self.scale.stories_per_epic)
+                )
+        ids = self._bulk(UserStory, stories)
+        epic_project = {
+            epic_id: project_id
+            for project_id, epic_ids in epics.items()
+            for epic_id in epic_ids
+        }
+        grouped: dict = {}
+        for pk, story in zip(ids, stories):
+            grouped.setdefault(epic_project[story.epic_id], []).append(pk)
+        return grouped
+
+    def create_criteria(self, stories) -> int:
+        per_story = self.scale.criteria_per_story
+        self.log(f"Creating {per_story} acceptance criteria per user story")
+        criteria = []
+        for story_ids in stories.values():
+            for story_id in story_ids:
+                for _ in range(per_story):
+                    is_met = self.rng.random() < 0.4
+                    criteria.append(
+                        AcceptanceCriteria(
+                            user_story_id=story_id,
+                            description=self.words(12),
+                            given=self.words(6),
+                            when=self.words(6),
+                            then=self.words(6),
+                            is_met=is_met,
+                            is_met_date=(
+                                self.day(self.rng.randrange(365)) if is_met else None
+                            ),
+                        )
+                    )
+        return len(self._bulk(AcceptanceCriteria, criteria))
+
+    def create_issues(self, project_ids, user_ids, sprints, epics, stories) -> int:
+        self.log(f"Creating {self.scale.issues} issues")
+        types = Issue.IssueType.values
+        created = 0
+        project_issues: dict = {}
+        while created < self.scale.issues:
+            size = min(self.batch_size, self.scale.issues - created)
+            issues, epic_links = [], []
+            for i in range(created, created + size):
+                project_id = project_ids[i % len(project_ids)]
+                issues.append(
+                    Issue(
+                        project_id=project_id,
+                        title=f"{self.words(4).capitalize()} #{i}",
+                        description=self.words(50),
+                        _type=self.rng.choice(types),
+                        status=self.rng.choice(Status.values),
+                        priority=self.rng.choice(Priority.values),
+                        assignee_id=self.rng.choice(user_ids),
+                        sprint_id=self._maybe(sprints.get(project_id), 0.7),
+                        user_story_id=self._maybe(stories.get(project_id), 0.5),
+                        effort_estimate=self.rng.choice((1, 2, 3, 5, 8, 13)),
+                        created_by_id=self.rng.choice(user_ids),
+                    )
+                )
+                epic_links.append(self._maybe(epics.get(project_id), 0.3))
+            Issue.objects.bulk_create(issues)
+            Sprint.issues.through.objects.bulk_create(
+                Sprint.issues.through(sprint_id=issue.sprint_id, issue_id=issue.pk)
+                for issue in issues
+                if issue.sprint_id
+            )
+            Epic.issues.through.objects.bulk_create(
+                Epic.issues.through(epic_id=epic_id, issue_id=issue.pk)
+                for issue, epic_id in zip(issues, epic_links)
+                if epic_id
+            )
+            IssueDependency.objects.bulk_create(
+                self._dependencies(issues, project_issues)
+            )
+            created += size
+            self.log(f"  {created} issues")
+        return created
+
+    def _dependencies(self, issues, project_issues) -> list:
+        # Only ever on earlier issues of the project, so the graph is acyclic
+        edges = []
+        for issue in issues:
+            earlier = project_issues.setdefault(issue.project_id, [])
+            depends_on = self._maybe(earlier, 0.3)
+            if depends_on:
+                edges.append(
+                    IssueDependency(
+                        project_id=issue.project_id,
+                        issue_id=issue.pk,
+                        depends_on_id=depends_on,
+                    )
+                )
+            earlier.append(issue.pk)
+        return edges
+
+    def _maybe(self, choices, probability):
+        if choices and self.rng.random() < probability:
+            return self.rng.choice(choices)
+        return None
+
+    @staticmethod
+    def _group(ids, objects, attname) -> dict:
+        grouped: dict = {}
+        for pk, obj in zip(ids, objects):
+            grouped.setdefault(getattr(obj, attname), []).append(pk)
+        return grouped
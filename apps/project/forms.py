@@ -1,5 +1,15 @@
 from django import forms
-from .models import Project, Issue, Sprint, Epic, UserStory, AcceptanceCriteria
+from .graph import check_dependency
+from .models import (
+    ISSUE_DETAIL_FIELDS,
+    Project,
+    Issue,
+    IssueDependency,
+    Sprint,
+    Epic,
+    UserStory,
+    AcceptanceCriteria,
+)
 
 
 class ProjectForm(forms.ModelForm):
@@ -9,11 +19,67 @@ class ProjectForm(forms.ModelForm):
         # exclude = ("created_by",)
 
 
+def _detail_formfield(field_name: str):
+    """The form field for an Issue field kept in a detail table."""
+    for detail_name, field_names in ISSUE_DETAIL_FIELDS.items():
+        if field_name in field_names:
+            detail_model = Issue._meta.get_field(detail_name).related_model
+            return detail_model._meta.get_field(field_name).formfield()
+    raise LookupError(f"{field_name!r} is not an issue detail field.")
+
+
+# Issue fields kept in detail tables, see ISSUE_DETAIL_FIELDS
+ISSUE_DETAIL_FORMFIELDS: tuple[str, ...] = tuple(
+    field_name
+    for field_names in ISSUE_DETAIL_FIELDS.values()
+    for field_name in field_names
+)
+
+
 class IssueForm(forms.ModelForm):
+    steps_to_reproduce = _detail_formfield("steps_to_reproduce")
+    expected_result = _detail_formfield("expected_result")
+    actual_result = _detail_formfield("actual_result")
+    environment = _detail_formfield("environment")
+    requirements = _detail_formfield("requirements")
+    business_value = _detail_formfield("business_value")
+    feature_dependencies = _detail_formfield("feature_dependencies")
+    performance_impact = _detail_formfield("performance_impact")
+    estimated_impact = _detail_formfield("estimated_impact")
+    user_feedback = _detail_formfield("user_feedback")
+    technical_details = _detail_formfield("technical_details")
+    completion_criteria = _detail_formfield("completion_criteria")
+
     class Meta:
         model = Issue
         fields = "__all__"
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            for field_name in ISSUE_DETAIL_FORMFIELDS:
+                self.initial.setdefault(field_name, getattr(self.instance, field_name))
+
+    def _post_clean(self) -> None:
+        super()._post_clean()
+        for field_name in ISSUE_DETAIL_FORMFIELDS:
+            if field_name in self.cleaned_data:
+                setattr(self.instance, field_name, self.cleaned_data[field_name])
+
+
+class IssueDependencyForm(forms.ModelForm):
+    class Meta:
+        model = IssueDependency
+        fields = ("depends_on",)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        issue = self.instance.issue if self.instance.issue_id else None
+        depends_on = cleaned_data.get("depends_on")
+        if issue is not None and depends_on is not None:
+            check_dependency(issue, depends_on)
+        return cleaned_data
+
 
 class SprintForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,191 @@
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Issue, IssueDependency, Project
+
+SCHEDULE_TIMEOUT = 60 * 60
+
+
+def _cache_key(project_id) -> str:
+    return f"project:schedule:{project_id}"
+
+
+class DependencyCycleError(ValidationError):
+    pass
+
+
+@dataclass
+class DependencyGraph:
+    """A project's issue dependencies, held in memory.
+
+    ``dependents`` maps an issue to the issues waiting on it. Only issues with
+    at least one dependency are nodes; each weighs its ``effort_estimate``
+    (0 when not estimated).
+    """
+
+    weights: dict = field(default_factory=dict)
+    dependents: dict = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, project_id) -> "DependencyGraph":
+        """Read the project's edges in one query and its efforts in another.
+
+        Joining the issue table twice onto every edge is slower than reading
+        ``(id, effort)`` of the project's issues off the project index.
+        """
+        graph = cls()
+        dependents = graph.dependents
+        edges = IssueDependency.objects.filter(project_id=project_id).values_list(
+            "depends_on_id", "issue_id"
+        )
+        for before, after in edges.iterator(chunk_size=10_000):
+            dependents.setdefault(before, []).append(after)
+            dependents.setdefault(after, [])
+        if dependents:
+            efforts = Issue.objects.filter(project_id=project_id).values_list(
+                "pk", "effort_estimate"
+            )
+            graph.weights = {
+                pk: effort or 0
+                for pk, effort in efforts.iterator(chunk_size=10_000)
+                if pk in dependents
+            }
+        return graph
+
+    def reaches(self, start, target) -> bool:
+        """Whether ``target`` is ``start`` or waits on it, directly or not."""
+        if start == target:
+            return True
+        seen, stack = {start}, [start]
+        while stack:
+            for after in self.dependents.get(stack.pop(), ()):
+                if after == target:
+                    return True
+                if after not in seen:
+                    seen.add(after)
+                    stack.append(after)
+        return False
+
+    def topological_order(self) -> list:
+        """Issue ids, each after everything it depends on."""
+        return self.schedule()["order"]
+
+    def schedule(self) -> dict:
+        """Topological order, earliest starts and the critical path.
+
+        One pass of Kahn's algorithm: an issue's earliest start is final once
+        everything it depends on has been taken off the queue, and the
+        critical path is the longest chain by effort.
+        """
+        dependents, weights = self.dependents, self.weights
+        indegree = dict.fromkeys(dependents, 0)
+        for afters in dependents.values():
+            for after in afters:
+                indegree[after] += 1
+        ready = [node for node, degree in indegree.items() if not degree]
+        start = dict.fromkeys(dependents, 0)
+        previous = {}
+        order = []
+        end, length = None, 0
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            finish = start[node] + weights.get(node, 0)
+            if end is None or finish > length:
+                end, length = node, finish
+            for after in dependents[node]:
+                if finish > start[after]:
+                    start[after] = finish
+                    previous[after] = node
+                indegree[after] -= 1
+                if not indegree[after]:
+                    ready.append(after)
+        if len(order) < len(indegree):
+            cycle = sorted(node for node, degree in indegree.items() if degree)
+            raise DependencyCycleError(
+                "The dependencies of issues %(issues)s form a cycle.",
+                code="cycle",
+                params={"issues": ", ".join(map(str, cycle[:20]))},
+            )
+        path = []
+        while end is not None:
+            path.append(end)
+            end = previous.get(end)
+        path.reverse()
+        return {
+            "order": order,
+            "earliest_start": start,
+            "critical_path": path,
+            "length": length,
+        }
+
+
+def project_schedule(project_id) -> dict:
+    """The cached ``DependencyGraph.schedule`` of a project.
+
+    A graph with a cycle (edges written around ``add_dependency``) yields
+    an empty schedule with the ``cycle`` message set.
+    """
+    key = _cache_key(project_id)
+    schedule = cache.get(key)
+    if schedule is None:
+        try:
+            schedule = DependencyGraph.load(project_id).schedule()
+            schedule["cycle"] = None
+        except DependencyCycleError as error:
+            schedule = {
+                "order": [],
+                "earliest_start": {},
+                "critical_path": [],
+                "length": 0,
+                "cycle": error.messages[0],
+            }
+        cache.set(key, schedule, SCHEDULE_TIMEOUT)
+    return schedule
+
+
+def invalidate_schedule(*project_ids) -> None:
+    cache.delete_many(
+        [_cache_key(project_id) for project_id in project_ids if project_id]
+    )
+
+
+def check_dependency(issue, depends_on, graph=None) -> None:
+    """Raise ``ValidationError`` if ``issue`` may not depend on ``depends_on``."""
+    if issue.project_id != depends_on.project_id:
+        raise ValidationError(
+            "An issue can only depend on issues of the same project.",
+            code="project",
+        )
+    if issue.pk == depends_on.pk:
+        raise ValidationError("An issue can't depend on itself.", code="self")
+    if graph is None:
+        graph = DependencyGraph.load(issue.project_id)
+    if graph.reaches(issue.pk, depends_on.pk):
+        raise DependencyCycleError(
+            "%(depends_on)s already depends on %(issue)s.",
+            code="cycle",
+            params={"issue": issue, "depends_on": depends_on},
+        )
+
+
+def add_dependency(issue, depends_on) -> IssueDependency:
+    """Make ``issue`` depend on ``depends_on`` unless that closes a cycle."""
+    with transaction.atomic():
+        # Two concurrent inserts could each pass the check and close a cycle
+        # together, so edges of one project are added one at a time.
+        list(
+            Project.objects.select_for_update()
+            .filter(pk=issue.project_id)
+            .values_list("pk")
+        )
+        check_dependency(issue, depends_on)
+        edge, _ = IssueDependency.objects.get_or_create(
+            issue=issue,
+            depends_on=depends_on,
+            defaults={"project_id": issue.project_id},
+        )
+    return edge
@@ -0,0 +1,294 @@
+import csv
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+
+from .changes import record_changes
+from .dashboard import invalidate_dashboard
+from .forms import ISSUE_DETAIL_FORMFIELDS, IssueForm
+from .models import (
+    ISSUE_DETAIL_FIELDS,
+    ChangeLog,
+    Epic,
+    Issue,
+    ProjectAccess,
+    Sprint,
+    UserStory,
+)
+from .planning import sync_sprint_issues
+from .rollups import reconcile_epics, reconcile_user_stories
+from .search import index_issues
+from .snapshots import rebuild_snapshot_days
+
+FORMATS: tuple[str, ...] = ("csv", "jsonl")
+
+# Relations are exported by a natural key (username, sprint name, titles)
+REFERENCE_FIELDS: tuple[str, ...] = ("assignee", "sprint", "user_story", "epics")
+ISSUE_EXPORT_FIELDS: tuple[str, ...] = (
+    "id",
+    "title",
+    "description",
+    "type",
+    "status",
+    "priority",
+    "due_date",
+    "effort_estimate",
+    "resolution",
+    *REFERENCE_FIELDS,
+    *ISSUE_DETAIL_FORMFIELDS,
+)
+EPIC_SEPARATOR = "|"
+
+
+class IssueImportForm(IssueForm):
+    """``IssueForm`` rules without the relations, which the importer maps."""
+
+    class Meta(IssueForm.Meta):
+        fields = None
+        exclude = (
+            "project",
+            "assignee",
+            "sprint",
+            "user_story",
+            "created_by",
+        )
+
+
+def detect_format(filename: str, default: str = "csv") -> str:
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return extension if extension in FORMATS else default
+
+
+@dataclass(frozen=True)
+class InvalidRow:
+    """Stands in for a row that couldn't be read; the importer rejects it."""
+
+    error: str
+
+
+def read_rows(stream, fmt: str):
+    """Lazily yield dict rows from a text stream of CSV or JSONL.
+
+    A JSONL line that isn't valid JSON yields an ``InvalidRow`` instead, so
+    the rest of the file is still imported.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                yield InvalidRow(f"Invalid JSON: {error}.")
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+
+class IssueImporter:
+    """Validate and bulk insert issue rows into ``project``.
+
+    Users, sprints, epics and user stories are resolved from maps built once
+    up front, so a row costs no queries until its batch is written.
+    """
+
+    def __init__(self, project, created_by=None, batch_size: int = 500) -> None:
+        self.project = project
+        self.created_by = created_by
+        self.batch_size = batch_size
+        self.users = dict(
+            ProjectAccess.objects.filter(project=project).values_list(
+                "user__username", "user_id"
+            )
+        )
+        self.sprints = dict(
+            Sprint.objects.filter(project=project).values_list("name", "pk")
+        )
+        self.epics = dict(
+            Epic.objects.filter(project=project).values_list("title", "pk")
+        )
+        self.user_stories = dict(
+            UserStory.objects.filter(
+                Q(epic__project=project) | Q(sprint__project=project)
+            ).values_list("title", "pk")
+        )
+
+    def run(self, rows) -> ImportResult:
+        result = ImportResult()
+        rows = enumerate(rows, start=1)
+        while batch := list(islice(rows, self.batch_size)):
+            self._import_batch(batch, result)
+        # bulk_create sends no post_save, so invalidate the dashboard and
+        # recount the progress rollups once
+        invalidate_dashboard(self.project.pk)
+        reconcile_user_stories(
+            UserStory.objects.filter(pk__in=self.user_stories.values())
+        )
+        reconcile_epics(Epic.objects.filter(project=self.project))
+        return result
+
+    def _resolve(self, row: dict, errors: dict) -> dict:
+        resolved = {}
+        for key, lookup, attname in (
+            ("assignee", self.users, "assignee_id"),
+            ("sprint", self.sprints, "sprint_id"),
+            ("user_story", self.user_stories, "user_story_id"),
+        ):
+            value = str(row.get(key) or "").strip()
+            if not value:
+                continue
+            if value not in lookup:
+                errors[key] = [f"Unknown {key.replace('_', ' ')} {value!r}."]
+            else:
+                resolved[attname] = lookup[value]
+        epic_ids = []
+        epics = str(row.get("epics") or "")
+        for title in filter(None, epics.split(EPIC_SEPARATOR)):
+            if title.strip() not in self.epics:
+                errors.setdefault("epics", []).append(f"Unknown epic {title!r}.")
+            else:
+                epic_ids.append(self.epics[title.strip()])
+        resolved["epic_ids"] = epic_ids
+        return resolved
+
+    def _import_batch(self, batch, result: ImportResult) -> None:
+        issues, epic_links = [], []
+        for line, row in batch:
+            if isinstance(row, InvalidRow):
+                result.errors.append((line, {NON_FIELD_ERRORS: [row.error]}))
+                continue
+            if not isinstance(row, Mapping):
+                result.errors.append(
+                    (line, {NON_FIELD_ERRORS: ["Expected an object of fields."]})
+                )
+                continue
+            data = {
+                key: value for key, value in row.items() if key not in REFERENCE_FIELDS
+            }
+            data["_type"] = data.pop("type", None) or Issue.IssueType.TASK
+            data.setdefault("status", Issue._meta.get_field("status").default)
+            data.setdefault("priority", Issue._meta.get_field("priority").default)
+            form = IssueImportForm(data)
+            errors = {} if form.is_valid() else dict(form.errors)
+            resolved = self._resolve(row, errors)
+            if errors:
+                result.errors.append((line, errors))
+                continue
+            issue = form.instance
+            issue.project = self.project
+            issue.created_by = self.created_by
+            for attname, value in resolved.items():
+                if attname != "epic_ids":
+                    setattr(issue, attname, value)
+            issues.append(issue)
+            epic_links.append(resolved["epic_ids"])
+
+        with transaction.atomic():
+            Issue.objects.bulk_create(issues)
+            self._create_details(issues)
+            index_issues(issues)
+            Epic.issues.through.objects.bulk_create(
+                [
+                    Epic.issues.through(epic_id=epic_id, issue_id=issue.pk)
+                    for issue, epic_ids in zip(issues, epic_links)
+                    for epic_id in epic_ids
+                ]
+            )
+            self._sync_sprints(issues)
+            record_changes(issues, ChangeLog.Actions.CREATED, [self.project.pk])
+        result.created += len(issues)
+
+    def _sync_sprints(self, issues) -> None:
+        # bulk_create sends no post_save, so put the issues into Sprint.issues
+        # and recount today's snapshots of their sprints here
+        by_sprint: dict = {}
+        for issue in issues:
+            if issue.sprint_id:
+                by_sprint.setdefault(issue.sprint_id, []).append(issue.pk)
+        for sprint_id, issue_ids in by_sprint.items():
+            sync_sprint_issues(issue_ids, sprint_id)
+        rebuild_snapshot_days(by_sprint)
+
+    def _create_details(self, issues) -> None:
+        # bulk_create skips Issue.save(), so write the detail rows here
+        for detail_name in ISSUE_DETAIL_FIELDS:
+            detail_model = Issue._meta.get_field(detail_name).related_model
+            details = []
+            for issue in issues:
+                values = issue._detail_changes.get(detail_name, {})
+                if any(values.values()):
+                    details.append(detail_model(issue=issue, **values))
+            detail_model.objects.bulk_create(details)
+
+
+def export_rows(project, chunk_size: int = 2000):
+    """Yield one flat dict per issue of ``project`` with constant memory."""
+    issues = (
+        Issue.objects.filter(project=project)
+        .select_related("assignee", "sprint", "user_story", *ISSUE_DETAIL_FIELDS)
+        .prefetch_related("epics")
+        .order_by("pk")
+    )
+    for issue in issues.iterator(chunk_size=chunk_size):
+        row = {
+            "id": issue.pk,
+            "title": issue.title,
+            "description": issue.description,
+            "type": issue._type,
+            "status": issue.status,
+            "priority": issue.priority,
+            "due_date": issue.due_date.isoformat() if issue.due_date else None,
+            "effort_estimate": issue.effort_estimate,
+            "resolution": issue.resolution,
+            "assignee": issue.assignee.username if issue.assignee else None,
+            "sprint": issue.sprint.name if issue.sprint else None,
+            "user_story": issue.user_story.title if issue.user_story else None,
+            "epics": EPIC_SEPARATOR.join(epic.title for epic in issue.epics.all()),
+        }
+        for field_name in ISSUE_DETAIL_FORMFIELDS:
+            row[field_name] = getattr(issue, field_name)
+        yield row
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.DictWriter(_Echo(), fieldnames=ISSUE_EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+def export_response(project, fmt: str = "csv", chunk_size: int = 2000):
+    rows = export_rows(project, chunk_size=chunk_size)
+    if fmt == "jsonl":
+        content, content_type = iter_jsonl(rows), "application/x-ndjson"
+    else:
+        fmt, content, content_type = "csv", iter_csv(rows), "text/csv"
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = (
+        f'attachment; filename="project-{project.pk}-issues.{fmt}"'
+    )
+    return response
@@ -0,0 +1,170 @@
+import os
+import socket
+import traceback
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .transactions import call_with_retry
+
+Statuses = Job.Statuses
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: Callable
+    max_attempts: int | None = None
+
+
+# Registered with ``task``, by name
+TASKS: dict[str, Task] = {}
+
+
+def task(name=None, max_attempts=None):
+    """Register the decorated function as a background task.
+
+    It's called with the job's payload as keyword arguments and may return
+    a JSON serialisable result. A failed job runs again up to
+    ``max_attempts`` times in all (``JOB_MAX_ATTEMPTS`` by default), so
+    tasks have to be safe to repeat; pass ``max_attempts=1`` otherwise.
+    """
+
+    def decorator(func):
+        spec = Task(name or func.__name__, func, max_attempts)
+        TASKS[spec.name] = spec
+        func.task_name = spec.name
+        return func
+
+    return decorator
+
+
+def enqueue(task_name: str, *, created_by=None, run_at=None, **payload) -> Job:
+    """Queue ``task_name`` with ``payload``, which has to be JSON serialisable.
+
+    The job is only picked up once the current transaction commits.
+    """
+    try:
+        spec = TASKS[task_name]
+    except KeyError:
+        raise ValueError(f"Unknown task {task_name!r}.")
+    return Job.objects.create(
+        task=task_name,
+        payload=payload,
+        max_attempts=spec.max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=run_at or timezone.now(),
+        created_by=created_by,
+    )
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _claim(worker: str, limit: int, now) -> list:
+    due = list(
+        Job.objects.filter(status=Statuses.QUEUED, run_at__lte=now)
+        .order_by("run_at", "pk")
+        .select_for_update(skip_locked=True)
+        .values_list("pk", flat=True)[:limit]
+    )
+    if due:
+        Job.objects.filter(pk__in=due, status=Statuses.QUEUED).update(
+            status=Statuses.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+    return due
+
+
+def claim_jobs(worker: str, limit: int) -> list[int]:
+    """Mark up to ``limit`` due jobs as running for ``worker``, oldest first.
+
+    The UPDATE only takes jobs that are still queued, so two workers never
+    run the same job; on PostgreSQL they also skip each other's rows.
+    """
+    if limit < 1:
+        return []
+    due = call_with_retry(_claim, worker, limit, timezone.now())
+    if not due:
+        return []
+    return list(
+        Job.objects.filter(
+            pk__in=due, status=Statuses.RUNNING, locked_by=worker
+        ).values_list("pk", flat=True)
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """``JOB_RETRY_DELAY`` seconds, doubled for every attempt after the first."""
+    return timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def fail_job(job: Job, error: str) -> None:
+    """Queue a failed run of ``job`` again later, or give up on its last attempt.
+
+    Only applies while ``job`` is still held by the worker that ran it.
+    """
+    now = timezone.now()
+    running = Job.objects.filter(
+        pk=job.pk, status=Statuses.RUNNING, locked_by=job.locked_by
+    )
+    if job.attempts < job.max_attempts:
+        call_with_retry(
+            running.update,
+            status=Statuses.QUEUED,
+            run_at=now + retry_delay(job.attempts),
+            error=error,
+            locked_by="",
+            locked_at=None,
+        )
+    else:
+        call_with_retry(
+            running.update, status=Statuses.FAILED, error=error, finished_at=now
+        )
+
+
+def run_job(job_id: int) -> None:
+    """Run a claimed job and record how it went; called in the worker processes."""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=job_id)
+        try:
+            spec = TASKS.get(job.task)
+            if spec is None:
+                raise LookupError(f"Unknown task {job.task!r}.")
+            result = spec.func(**job.payload)
+        except Exception:
+            fail_job(job, traceback.format_exc())
+            return
+        call_with_retry(
+            Job.objects.filter(
+                pk=job.pk, status=Statuses.RUNNING, locked_by=job.locked_by
+            ).update,
+            status=Statuses.SUCCEEDED,
+            result=result,
+            error="",
+            finished_at=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+
+
+def requeue_stale_jobs() -> int:
+    """Fail the runs of jobs held longer than ``JOB_TIMEOUT`` seconds.
+
+    Their worker died or hangs; they're retried like any other failure.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+    stale = list(Job.objects.filter(status=Statuses.RUNNING, locked_at__lt=cutoff))
+    for job in stale:
+        fail_job(job, f"Still running after {settings.JOB_TIMEOUT} seconds.")
+    return len(stale)
@@ -0,0 +1,51 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the indexes declared in Meta.indexes of the project app with "
+        "the indexes that actually exist in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Exit with a non-zero status when a declared index is missing.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        supports_partial = connection.features.supports_partial_indexes
+        missing = []
+
+        with connection.cursor() as cursor:
+            tables = set(connection.introspection.table_names(cursor))
+            for model in apps.get_app_config("project").get_models():
+                table = model._meta.db_table
+                if table not in tables:
+                    self.stdout.write(self.style.WARNING(f"{table}: table missing"))
+                    continue
+                constraints = connection.introspection.get_constraints(cursor, table)
+                existing = {name for name, info in constraints.items() if info["index"]}
+                for index in model._meta.indexes:
+                    if index.condition is not None and not supports_partial:
+                        self.stdout.write(
+                            f"{table}.{index.name}: partial index skipped "
+                            f"on {connection.vendor}"
+                        )
+                    elif index.name in existing:
+                        self.stdout.write(f"{table}.{index.name}: ok")
+                    else:
+                        missing.append(f"{table}.{index.name}")
+                        self.stdout.write(
+                            self.style.ERROR(f"{table}.{index.name}: missing")
+                        )
+
+        if missing and options["check"]:
+            raise CommandError(f"Missing indexes: {', '.join(missing)}")
+        if not missing:
+            self.stdout.write(self.style.SUCCESS("All declared indexes are present."))
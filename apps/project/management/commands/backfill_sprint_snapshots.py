@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.project.jobs import enqueue
+from apps.project.models import Sprint
+from apps.project.snapshots import backfill_sprint
+
+
+class Command(BaseCommand):
+    help = (
+        "Write daily burndown snapshots for sprints from their start date up to "
+        "today. Days before snapshots existed are approximated from issue "
+        "creation dates and current statuses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, help="Only this project's sprints.")
+        parser.add_argument("--sprint", type=int, help="Only this sprint.")
+        parser.add_argument(
+            "--enqueue", action="store_true", help="Leave it to the job worker."
+        )
+
+    def handle(self, *args, **options):
+        if options["enqueue"]:
+            job = enqueue(
+                "backfill_sprint_snapshots",
+                project_id=options["project"],
+                sprint_id=options["sprint"],
+            )
+            self.stdout.write(self.style.SUCCESS(f"Queued {job}."))
+            return
+        sprints = Sprint.objects.all()
+        if options["project"]:
+            sprints = sprints.filter(project_id=options["project"])
+        if options["sprint"]:
+            sprints = sprints.filter(pk=options["sprint"])
+
+        total = 0
+        for sprint in sprints.iterator():
+            with transaction.atomic():
+                days = backfill_sprint(sprint)
+            total += days
+            self.stdout.write(f"{sprint}: {days} days")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} snapshot days."))
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.project.importexport import (
+    FORMATS,
+    detect_format,
+    export_rows,
+    iter_csv,
+    iter_jsonl,
+)
+from apps.project.models import Project
+
+
+class Command(BaseCommand):
+    help = "Stream a project's issues to a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument("path", nargs="?", default="-")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options["project_id"])
+        except Project.DoesNotExist:
+            raise CommandError(f"Project {options['project_id']} does not exist.")
+
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+        rows = export_rows(project, chunk_size=options["chunk_size"])
+        chunks = iter_jsonl(rows) if fmt == "jsonl" else iter_csv(rows)
+        if path == "-":
+            sys.stdout.writelines(chunks)
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as stream:
+                stream.writelines(chunks)
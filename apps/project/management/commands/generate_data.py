@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.project.datagen import SCALES, DataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic data set for every project model. "
+        "The first generated user (bench<seed>_0, password 'password') is a "
+        "superuser and a member of the first 50 projects."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=SCALES, default="small")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        generator = DataGenerator(
+            SCALES[options["scale"]],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            log=self.stdout.write,
+        )
+        if generator.exists():
+            raise CommandError(
+                f"Data for seed {options['seed']} already exists, use another --seed."
+            )
+        counts = generator.run()
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,51 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.project.importexport import FORMATS, IssueImporter, detect_format, read_rows
+from apps.project.models import Project
+
+
+class Command(BaseCommand):
+    help = "Stream issues from a CSV or JSONL file into a project."
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument("path", help="File to read, or - for stdin.")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--created-by", help="Username recorded as creator.")
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options["project_id"])
+        except Project.DoesNotExist:
+            raise CommandError(f"Project {options['project_id']} does not exist.")
+
+        created_by = None
+        if options["created_by"]:
+            created_by = (
+                get_user_model().objects.filter(username=options["created_by"]).first()
+            )
+            if created_by is None:
+                raise CommandError(f"Unknown user {options['created_by']!r}.")
+
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+        importer = IssueImporter(
+            project, created_by=created_by, batch_size=options["batch_size"]
+        )
+        if path == "-":
+            result = importer.run(read_rows(sys.stdin, fmt))
+        else:
+            with open(path, newline="", encoding="utf-8") as stream:
+                result = importer.run(read_rows(stream, fmt))
+
+        for line, errors in result.errors:
+            self.stderr.write(f"Row {line}: {errors}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.created} issues, {len(result.errors)} rows rejected."
+            )
+        )
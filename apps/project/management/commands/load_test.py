@@ -0,0 +1,100 @@
+import json
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.project.benchmarks import (
+    benchmark_project,
+    environment,
+    load_test,
+    load_test_urls,
+    session_cookie,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the sync and async project pages with concurrent HTTP requests "
+        "to a server started separately on the same database. The two are "
+        "only comparable on an ASGI server (config.asgi:application); under "
+        "WSGI every async view runs in an event loop of its own. Use "
+        "generate_data to create a data set first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "server",
+            help="Base URL of the running server, e.g. http://127.0.0.1:8000.",
+        )
+        parser.add_argument(
+            "--username", help="User to log in as (default: first superuser)."
+        )
+        parser.add_argument("--project", type=int, help="Project to load.")
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per page and mode."
+        )
+        parser.add_argument(
+            "--only", nargs="+", metavar="PAGE", help="Load only these pages."
+        )
+        parser.add_argument("--output", help="JSON file to write the results to.")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by("pk")
+        if options["username"]:
+            user = users.filter(username=options["username"]).first()
+        else:
+            user = users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No user to load test as, pass --username.")
+        try:
+            project_id = benchmark_project(user, options["project"])
+        except ValueError as error:
+            raise CommandError(str(error))
+        urls = {
+            name: pair
+            for name, pair in load_test_urls(project_id).items()
+            if not options["only"] or name in options["only"]
+        }
+
+        results = self.run(session_cookie(user), urls, options)
+
+        report = {
+            "environment": environment(),
+            "options": {
+                "server": options["server"],
+                "username": user.username,
+                "project": project_id,
+                "concurrency": options["concurrency"],
+                "requests": options["requests"],
+            },
+            "results": results,
+        }
+        if options["output"]:
+            path = Path(options["output"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
+
+    def run(self, cookie, urls, options) -> dict:
+        server = options["server"]
+        results = {}
+        for name, (sync_url, async_url) in urls.items():
+            results[name] = {}
+            for mode, url in (("sync", sync_url), ("async", async_url)):
+                # One warm-up request fills the caches for both modes alike.
+                warmup = load_test(server, url, cookie, concurrency=1, requests=1)
+                if warmup["errors"]:
+                    raise CommandError(f"{server}{url} did not answer with 200 OK.")
+                result = load_test(
+                    server, url, cookie, options["concurrency"], options["requests"]
+                )
+                results[name][mode] = result
+                self.stdout.write(
+                    f"{name:24} {mode:5} {result['requests_per_second']:>8.1f} req/s  "
+                    f"p50 {result['p50_ms']:>9.2f}ms  "
+                    f"p95 {result['p95_ms']:>9.2f}ms  "
+                    f"{result['errors']} errors"
+                )
+        return results
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.project.attachments import prune_blobs, prune_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete uploads left unfinished for more than --hours, their partial "
+        "files, and stored content no attachment refers to any more."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        uploads = prune_uploads(cutoff)
+        blobs = prune_blobs()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {uploads} stale uploads and {blobs} unused files."
+            )
+        )
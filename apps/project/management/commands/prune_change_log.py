@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.project.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete change log rows older than --days. Clients resuming from an "
+        "older cursor only miss the pruned changes, so keep more than the "
+        "longest time a board stays disconnected."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = ChangeLog.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change log rows."))
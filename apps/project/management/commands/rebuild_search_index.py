@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from apps.project.jobs import enqueue
+from apps.project.search import get_backend, rebuild_documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the full-text search structures for the current database and "
+        "regenerate every search document from issues, epics and user stories."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--enqueue", action="store_true", help="Leave it to the job worker."
+        )
+
+    def handle(self, *args, **options):
+        if options["enqueue"]:
+            job = enqueue("rebuild_search_index", batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Queued {job}."))
+            return
+        backend = get_backend()
+        backend.setup()
+        total = rebuild_documents(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {total} documents with {type(backend).__name__}."
+            )
+        )
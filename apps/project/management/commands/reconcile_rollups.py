@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.project.rollups import reconcile_epics, reconcile_user_stories
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the progress counters of every user story and epic from "
+        "their issues, with one aggregate query per level, and report how "
+        "many rows had drifted. Run it once after adding the counters to an "
+        "existing database, where they start at 0."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        with transaction.atomic():
+            stories = reconcile_user_stories(batch_size=batch_size)
+            epics = reconcile_epics(batch_size=batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reconciled rollups: {stories} user stories and {epics} epics "
+                "were out of date."
+            )
+        )
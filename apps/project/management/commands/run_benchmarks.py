@@ -0,0 +1,81 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.project.benchmarks import build_benchmarks, environment, measure
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main project pages, admin changelists and the sidebar against "
+        "the current database and write p50/p95 latency, query counts and peak "
+        "memory to a JSON file. Use generate_data to create a data set first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username", help="User to log in as (default: first superuser)."
+        )
+        parser.add_argument("--project", type=int, help="Project to benchmark.")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--cold", action="store_true", help="Clear the cache before every run."
+        )
+        parser.add_argument(
+            "--only", nargs="+", metavar="NAME", help="Run only these benchmarks."
+        )
+        parser.add_argument("--output", help="JSON file to write the results to.")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by("pk")
+        if options["username"]:
+            user = users.filter(username=options["username"]).first()
+        else:
+            user = users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No user to benchmark as, pass --username.")
+
+        results = {}
+        # The test client talks to "testserver", which is not in ALLOWED_HOSTS.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            try:
+                benchmarks = build_benchmarks(user, options["project"])
+            except ValueError as error:
+                raise CommandError(str(error))
+            for benchmark in benchmarks:
+                if options["only"] and benchmark.name not in options["only"]:
+                    continue
+                result = measure(
+                    benchmark.run,
+                    repeat=options["repeat"],
+                    warmup=options["warmup"],
+                    cold=options["cold"],
+                )
+                results[benchmark.name] = result
+                self.stdout.write(
+                    f"{benchmark.name:32} p50 {result['p50_ms']:>9.2f}ms  "
+                    f"p95 {result['p95_ms']:>9.2f}ms  "
+                    f"{result['queries']:>4} queries  "
+                    f"{result['peak_memory_kb']:>9.1f}KiB"
+                )
+
+        report = {
+            "environment": environment(),
+            "options": {
+                "username": user.username,
+                "project": options["project"],
+                "repeat": options["repeat"],
+                "cold": options["cold"],
+            },
+            "results": results,
+        }
+        if options["output"]:
+            path = Path(options["output"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
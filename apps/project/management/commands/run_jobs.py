@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.project.jobs import (
+    claim_jobs,
+    fail_job,
+    requeue_stale_jobs,
+    run_job,
+    worker_name,
+)
+from apps.project.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (apps.project.jobs) in a pool of processes, "
+        "polling the job table for new ones. Several workers can share the "
+        "table. Stops after the queue is empty with --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Jobs run at once; 0 runs them one by one in this process.",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            help="Seconds between looks at the queue (JOB_POLL_INTERVAL).",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once no job is due."
+        )
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        poll = options["poll"] or settings.JOB_POLL_INTERVAL
+        processes = options["processes"]
+        self.stdout.write(f"Worker {worker} running {processes or 1} at a time.")
+        if not processes:
+            total = self.run_inline(worker, poll, options["once"])
+        else:
+            # Spawned rather than forked, so no process inherits the
+            # worker's database connections.
+            with ProcessPoolExecutor(
+                processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            ) as pool:
+                total = self.run_pool(pool, processes, worker, poll, options["once"])
+        self.stdout.write(self.style.SUCCESS(f"Ran {total} jobs."))
+
+    def run_inline(self, worker, poll, once) -> int:
+        total = 0
+        while True:
+            requeue_stale_jobs()
+            claimed = claim_jobs(worker, 1)
+            if not claimed:
+                if once:
+                    return total
+                time.sleep(poll)
+                continue
+            run_job(claimed[0])
+            total += 1
+
+    def run_pool(self, pool, processes, worker, poll, once) -> int:
+        total = 0
+        running = {}
+        try:
+            while True:
+                requeue_stale_jobs()
+                claimed = claim_jobs(worker, processes - len(running))
+                for job_id in claimed:
+                    running[pool.submit(run_job, job_id)] = job_id
+                if not running:
+                    if once:
+                        return total
+                    time.sleep(poll)
+                    continue
+                done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    total += 1
+                    if future.exception() is not None:
+                        # The process running it died
+                        fail_job(Job.objects.get(pk=job_id), repr(future.exception()))
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the running jobs.")
+            wait(running)
+            return total + len(running)
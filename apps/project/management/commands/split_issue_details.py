@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.project.models import ISSUE_DETAIL_FIELDS, Issue
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the legacy per-type text columns of project_issue into the "
+        "issue detail tables, streaming the rows in primary key batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        table = Issue._meta.db_table
+        with connection.cursor() as cursor:
+            columns = {
+                column.name
+                for column in connection.introspection.get_table_description(
+                    cursor, table
+                )
+            }
+
+        legacy = {
+            detail_name: [name for name in field_names if name in columns]
+            for detail_name, field_names in ISSUE_DETAIL_FIELDS.items()
+        }
+        legacy = {name: fields for name, fields in legacy.items() if fields}
+        if not legacy:
+            self.stdout.write("No legacy detail columns found, nothing to copy.")
+            return
+
+        quote = connection.ops.quote_name
+        selected = [column for fields in legacy.values() for column in fields]
+        sql = (
+            f"SELECT {quote('id')}, {', '.join(quote(c) for c in selected)} "
+            f"FROM {quote(table)} WHERE {quote('id')} > %s "
+            f"ORDER BY {quote('id')} LIMIT %s"
+        )
+
+        last_id, copied = 0, 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [last_id, batch_size])
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            with transaction.atomic():
+                for detail_name, fields in legacy.items():
+                    detail_model = Issue._meta.get_field(detail_name).related_model
+                    details = []
+                    for row in rows:
+                        values = dict(zip(selected, row[1:]))
+                        values = {field: values[field] for field in fields}
+                        if any(values.values()):
+                            details.append(detail_model(issue_id=row[0], **values))
+                    detail_model.objects.bulk_create(details, ignore_conflicts=True)
+                    copied += len(details)
+            self.stdout.write(f"Processed issues up to id {last_id}")
+
+        self.stdout.write(self.style.SUCCESS(f"Copied {copied} issue detail rows."))
@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from apps.project.models import Issue, Project
+from apps.project.transactions import call_with_retry
+
+PROFILES = ("default", "production")
+
+
+class Command(BaseCommand):
+    help = (
+        "Create issues from several processes at once in a scratch SQLite "
+        "database, once per DATABASE_SQLITE_PROFILE, and report write "
+        "throughput, retries and failed writes. Each write reads the project "
+        "first, like issue_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=8)
+        parser.add_argument(
+            "--writes", type=int, default=200, help="Issues per process."
+        )
+        parser.add_argument(
+            "--profiles", nargs="+", choices=PROFILES, default=list(PROFILES)
+        )
+        parser.add_argument("--output", help="JSON file to write the results to.")
+        # Used by the processes the command starts
+        parser.add_argument("--setup", action="store_true", help=argparse.SUPPRESS)
+        parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+        parser.add_argument("--start-at", type=float, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["setup"]:
+            return self.setup()
+        if options["worker"] is not None:
+            return self.work(options["worker"], options["writes"], options["start_at"])
+
+        results = {}
+        for profile in options["profiles"]:
+            with tempfile.TemporaryDirectory() as directory:
+                result = self.run(
+                    profile,
+                    Path(directory) / "stress.sqlite3",
+                    options["processes"],
+                    options["writes"],
+                )
+            results[profile] = result
+            self.stdout.write(
+                f"{profile:12} {result['writes_per_second']:>9.1f} writes/s  "
+                f"{result['written']:>6} written  {result['retries']:>5} retries  "
+                f"{result['failed']:>4} failed  {result['seconds']:>7.2f}s"
+            )
+        if options["output"]:
+            path = Path(options["output"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            report = {
+                "options": {
+                    "processes": options["processes"],
+                    "writes": options["writes"],
+                },
+                "results": results,
+            }
+            path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
+
+    def run(self, profile, path, processes, writes) -> dict:
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+            "DATABASE_URL": f"sqlite:///{path}",
+            "DATABASE_REPLICA_URLS": "",
+            "DATABASE_SQLITE_PROFILE": "" if profile == "default" else profile,
+        }
+        cwd = settings.BASE_DIR
+        django = [sys.executable, "-m", "django"]
+        subprocess.run(
+            [*django, "migrate", "--run-syncdb", "-v0"], env=env, cwd=cwd, check=True
+        )
+        subprocess.run(
+            [*django, "sqlite_stress", "--setup"], env=env, cwd=cwd, check=True
+        )
+        # Give every process time to start, then let them all go at once
+        start_at = time.time() + 2 + processes * 0.25
+        workers = [
+            subprocess.Popen(
+                [
+                    *django,
+                    "sqlite_stress",
+                    "--worker",
+                    str(number),
+                    "--writes",
+                    str(writes),
+                    "--start-at",
+                    str(start_at),
+                ],
+                env=env,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            for number in range(processes)
+        ]
+        reports = []
+        for worker in workers:
+            out, _ = worker.communicate()
+            if worker.returncode:
+                raise CommandError(f"A stress worker exited with {worker.returncode}.")
+            reports.append(json.loads(out.strip().splitlines()[-1]))
+        seconds = max(report["finished"] for report in reports) - start_at
+        written = sum(report["written"] for report in reports)
+        return {
+            "written": written,
+            "failed": sum(report["failed"] for report in reports),
+            "retries": sum(report["attempts"] for report in reports) - written,
+            "seconds": round(seconds, 3),
+            "writes_per_second": round(written / seconds, 1),
+        }
+
+    def setup(self):
+        Project.objects.create(
+            name="Stress",
+            methodology="SC",
+            category="IT",
+            start_date="2024-01-01T00:00:00Z",
+            end_date="2024-12-31T00:00:00Z",
+        )
+
+    def work(self, number, writes, start_at):
+        project_id = Project.objects.values_list("pk", flat=True).get()
+        attempts = 0
+
+        def create_issue(title):
+            nonlocal attempts
+            attempts += 1
+            project = Project.objects.get(pk=project_id)
+            Issue.objects.create(project=project, title=title)
+
+        time.sleep(max(0, start_at - time.time()))
+        written = failed = 0
+        for i in range(writes):
+            try:
+                call_with_retry(create_issue, f"Worker {number} issue {i}")
+                written += 1
+            except OperationalError:
+                failed += 1
+        report = {
+            "written": written,
+            "failed": failed,
+            "attempts": attempts,
+            "finished": time.time(),
+        }
+        self.stdout.write(json.dumps(report))
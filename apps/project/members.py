@@ -0,0 +1,110 @@
+from django.db.models import Count, IntegerField, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import ProjectMember, Roles, User
+from .pagination import apaginate_request, paginate_request
+
+MEMBER_FIELDS = (
+    "project_id",
+    "role",
+    "is_active",
+    "date_joined",
+    "user__username",
+    "user__first_name",
+    "user__last_name",
+    "user__email",
+)
+
+
+def _role_count(project_id, role):
+    # Not correlated with the outer row, so the database evaluates it once
+    # per query rather than once per member.
+    return Coalesce(
+        Subquery(
+            ProjectMember.objects.filter(project_id=project_id, role=role)
+            .order_by()
+            .values("project_id")
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def project_memberships(project):
+    """Memberships of ``project`` with their user and per-role totals."""
+    return (
+        ProjectMember.objects.filter(project=project)
+        .select_related("user")
+        .only(*MEMBER_FIELDS)
+        .annotate(
+            **{f"{role}_count": _role_count(project.pk, role) for role in Roles.values}
+        )
+    )
+
+
+def _role_totals(project):
+    return (
+        ProjectMember.objects.filter(project=project)
+        .order_by()
+        .values_list("role")
+        .annotate(Count("pk"))
+    )
+
+
+def _loaded_counts(memberships):
+    first = memberships[0]
+    return {role: getattr(first, f"{role}_count") for role in Roles.values}
+
+
+def _role_counts(counts: dict) -> list[dict]:
+    return [
+        {"value": value, "label": label, "count": counts.get(value, 0)}
+        for value, label in Roles.choices
+    ]
+
+
+def role_counts(project, memberships) -> list[dict]:
+    """Per-role totals, read from the first loaded membership when there is one."""
+    if memberships:
+        return _role_counts(_loaded_counts(memberships))
+    return _role_counts(dict(_role_totals(project)))
+
+
+def _lead(request, project):
+    if project.lead_id and not request.GET.get("cursor"):
+        return User.objects.only("username", "first_name", "last_name", "email").filter(
+            pk=project.lead_id
+        )
+    return None
+
+
+def members_page(request, project) -> dict:
+    """Context for one keyset page of a project's roster."""
+    page = paginate_request(request, project_memberships(project), field="date_joined")
+    lead = _lead(request, project)
+    return {
+        "members": page,
+        "page": page,
+        "lead": lead.first() if lead is not None else None,
+        "role_counts": role_counts(project, page.object_list),
+    }
+
+
+async def amembers_page(request, project) -> dict:
+    """Async version of ``members_page``."""
+    page = await apaginate_request(
+        request, project_memberships(project), field="date_joined"
+    )
+    lead = _lead(request, project)
+    if page.object_list:
+        counts = _loaded_counts(page.object_list)
+    else:
+        counts = {role: total async for role, total in _role_totals(project)}
+    return {
+        "members": page,
+        "page": page,
+        "lead": await lead.afirst() if lead is not None else None,
+        "role_counts": _role_counts(counts),
+    }
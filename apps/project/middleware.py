@@ -0,0 +1,266 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+_recorder: ContextVar = ContextVar("request_recorder", default=None)
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries=None, max_duplicates=0, max_ms=None):
+    """Declare the most queries, duplicate queries and time a view may use.
+
+    Exceeding the budget is logged, or raises ``QueryBudgetExceeded`` when
+    the ``QUERY_BUDGET_RAISE`` setting is on, so tests fail instead.
+    """
+
+    def decorator(view_func):
+        # Only annotate the view, so sync and async views stay what they are
+        view_func.query_budget = {
+            "queries": max_queries,
+            "duplicates": max_duplicates,
+            "ms": max_ms,
+        }
+        return view_func
+
+    return decorator
+
+
+def query_signature(sql: str) -> str:
+    """Normalise ``sql`` so that the same query with other values compares equal."""
+    return _NUMBER.sub("N", _IN_LIST.sub("IN (...)", sql))
+
+
+@dataclass
+class RequestRecorder:
+    queries: int = 0
+    db_time: float = 0.0
+    render_time: float = 0.0
+    render_depth: int = 0
+    signatures: Counter = field(default_factory=Counter)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.signatures[query_signature(sql)] += 1
+
+    @property
+    def duplicates(self) -> dict:
+        return {sql: count for sql, count in self.signatures.items() if count > 1}
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        recorder = _recorder.get()
+        if recorder is None or recorder.render_depth:
+            return super().render(context, request)
+        # Only the outermost template counts, includes and cotton
+        # components render inside it.
+        recorder.render_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            recorder.render_time += time.perf_counter() - start
+            recorder.render_depth -= 1
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders for the middleware below.
+
+    Renders outside an instrumented request aren't affected.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class RequestStats:
+    """Per-view totals kept in process memory for the stats endpoint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._views: dict = {}
+
+    def add(self, view, recorder, elapsed, over_budget) -> None:
+        with self._lock:
+            stats = self._views.setdefault(
+                view,
+                {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "duplicates": 0,
+                    "db_ms": 0.0,
+                    "render_ms": 0.0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "over_budget": 0,
+                },
+            )
+            stats["requests"] += 1
+            stats["queries"] += recorder.queries
+            stats["max_queries"] = max(stats["max_queries"], recorder.queries)
+            stats["duplicates"] += sum(recorder.duplicates.values())
+            stats["db_ms"] += recorder.db_time * 1000
+            stats["render_ms"] += recorder.render_time * 1000
+            stats["total_ms"] += elapsed * 1000
+            stats["max_ms"] = max(stats["max_ms"], elapsed * 1000)
+            stats["over_budget"] += over_budget
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                view: dict(
+                    stats,
+                    avg_queries=stats["queries"] / stats["requests"],
+                    avg_ms=stats["total_ms"] / stats["requests"],
+                )
+                for view, stats in self._views.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+request_stats = RequestStats()
+
+
+def _record_query(execute, sql, params, many, context):
+    # Installed once per connection and shared by every request using it;
+    # queries count towards the recorder of the request (context) running them.
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install() -> None:
+    """Add ``_record_query`` to the current thread's connections, once."""
+    for connection in connections.all():
+        if _record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_record_query)
+
+
+class QueryInstrumentationMiddleware:
+    """Record queries, DB time and template render time of every view.
+
+    Adds a ``Server-Timing`` header for staff users (or when ``DEBUG`` is on)
+    and checks the view's ``query_budget``. Render time is only measured
+    with the ``TimedDjangoTemplates`` backend.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = RequestRecorder()
+        token = _recorder.set(recorder)
+        request._query_view = None
+        start = time.perf_counter()
+        _install()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        elapsed = time.perf_counter() - start
+        return self.finish(
+            request, response, recorder, elapsed, getattr(request, "user", None)
+        )
+
+    async def __acall__(self, request):
+        # Async views run their queries through sync_to_async, on a thread
+        # and connection that concurrent requests share. The recorder is
+        # found through the request's context, which sync_to_async carries
+        # over, so each request only counts its own queries.
+        recorder = RequestRecorder()
+        token = _recorder.set(recorder)
+        request._query_view = None
+        start = time.perf_counter()
+        await sync_to_async(_install)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        elapsed = time.perf_counter() - start
+        user = None
+        if request._query_view and hasattr(request, "auser"):
+            user = await request.auser()
+        return self.finish(request, response, recorder, elapsed, user)
+
+    def finish(self, request, response, recorder, elapsed, user):
+        view, budget = request._query_view or (None, None)
+        if view is None:
+            return response
+        problems = self.check_budget(budget, recorder, elapsed) if budget else []
+        request_stats.add(view, recorder, elapsed, bool(problems))
+        if problems:
+            message = f"{view} exceeded its query budget: {'; '.join(problems)}"
+            if getattr(settings, "QUERY_BUDGET_RAISE", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        if settings.DEBUG or getattr(user, "is_staff", False):
+            response["Server-Timing"] = self.server_timing(recorder, elapsed)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = f"{view_func.__module__}.{view_func.__name__}"
+        request._query_view = (view, getattr(view_func, "query_budget", None))
+
+    @staticmethod
+    def check_budget(budget, recorder, elapsed) -> list:
+        problems = []
+        if budget["queries"] is not None and recorder.queries > budget["queries"]:
+            problems.append(f"{recorder.queries} queries > {budget['queries']}")
+        duplicates = recorder.duplicates
+        if budget["duplicates"] is not None and len(duplicates) > budget["duplicates"]:
+            problems.append(
+                f"{len(duplicates)} repeated queries > {budget['duplicates']}: "
+                + ", ".join(
+                    f"{count}x {sql[:120]}" for sql, count in duplicates.items()
+                )
+            )
+        if budget["ms"] is not None and elapsed * 1000 > budget["ms"]:
+            problems.append(f"{elapsed * 1000:.1f}ms > {budget['ms']}ms")
+        return problems
+
+    @staticmethod
+    def server_timing(recorder, elapsed) -> str:
+        return ", ".join(
+            [
+                f'db;dur={recorder.db_time * 1000:.1f};desc="{recorder.queries} queries"',
+                f'dup;desc="{len(recorder.duplicates)} repeated"',
+                f"render;dur={recorder.render_time * 1000:.1f}",
+                f"total;dur={elapsed * 1000:.1f}",
+            ]
+        )
@@ -1,9 +1,12 @@
-from datetime import datetime
+import uuid
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 
 User = get_user_model()
 
@@ -69,7 +72,100 @@ class Roles(models.TextChoices):
     REVIEWER = "reviewer", "Reviewer"
 
 
-class Project(models.Model):
+class AccessRoles(models.TextChoices):
+    LEAD = "lead", "Lead"
+    REVIEWER = "reviewer", "Reviewer"
+    MEMBER = "member", "Member"
+    GUEST = "guest", "Guest"
+
+
+class TrackedFieldsMixin:
+    """Remember the values of ``tracked_fields`` as loaded from the database.
+
+    Signal handlers compare them with the current values to react to
+    changes without re-reading the row before each save.
+    """
+
+    tracked_fields: tuple[str, ...] = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_tracked_values()
+        return instance
+
+    def _remember_tracked_values(self) -> None:
+        self._loaded_values = {
+            name: self.__dict__[name]
+            for name in self.tracked_fields
+            if name in self.__dict__
+        }
+
+    def get_loaded_value(self, name: str, default=None):
+        return getattr(self, "_loaded_values", {}).get(name, default)
+
+    def tracked_changes(self) -> dict:
+        """Return ``{field: (loaded, current)}`` for every changed tracked field."""
+        loaded = getattr(self, "_loaded_values", {})
+        return {
+            name: (old, self.__dict__.get(name))
+            for name, old in loaded.items()
+            if self.__dict__.get(name) != old
+        }
+
+
+class IssueRollup(models.Model):
+    """Progress of the issues below an epic or user story, kept denormalized.
+
+    ``apps.project.rollups`` adjusts the counters with ``F()`` updates as
+    issues change, and ``reconcile_rollups`` recomputes them. Saving an
+    existing row never writes them back, so a stale instance can't undo a
+    concurrent adjustment. The counters are signed: rows that predate them
+    start at 0 and may go below it until ``reconcile_rollups`` has run once.
+    """
+
+    rollup_fields: tuple[str, ...] = (
+        "issue_count",
+        "issues_done",
+        "effort_total",
+        "effort_done",
+    )
+
+    issue_count = models.IntegerField(default=0, editable=False)
+    issues_done = models.IntegerField(default=0, editable=False)
+    effort_total = models.IntegerField(default=0, editable=False)
+    effort_done = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def progress(self) -> int:
+        """Percent done, by effort when the issues are estimated."""
+        if self.effort_total:
+            return round(100 * self.effort_done / self.effort_total)
+        if self.issue_count:
+            return round(100 * self.issues_done / self.issue_count)
+        return 0
+
+    def save(self, *args, **kwargs) -> None:
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.rollup_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class Project(TrackedFieldsMixin, models.Model):
     name = models.CharField(max_length=255, unique=True)
     methodology = models.CharField(max_length=3, choices=ProjectType.choices)
     description = models.TextField(
@@ -95,12 +191,18 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now=True)
     updated_at = models.DateTimeField(auto_now_add=True)
 
+    tracked_fields = ("lead_id",)
+
     def __str__(self) -> str:
         return self.name
 
     def get_absolute_url(self):
         return reverse("project_detail", args=[self.pk])
 
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        self._remember_tracked_values()
+
     # def clean(self) -> None:
     #     if self.lead and self.members.filter(id=self.lead.id).exists():
     #         raise ValidationError("The lead cannot also be a member of the project.")
@@ -119,9 +221,82 @@ class ProjectMember(models.Model):
 
     class Meta:
         unique_together = ("project", "user", "role")
+        indexes = [
+            models.Index(
+                fields=["project", "-date_joined", "-id"],
+                name="member_project_joined_idx",
+            ),
+        ]
+
 
+class ProjectAccess(models.Model):
+    """Denormalized (user, project) access index, lead included.
 
-class Issue(models.Model):
+    Kept in sync with ``Project.lead`` and ``ProjectMember`` by signals, so
+    access checks resolve with a single lookup on the unique index.
+    """
+
+    user = models.ForeignKey(
+        User, related_name="project_access", on_delete=models.CASCADE
+    )
+    project = models.ForeignKey(
+        Project, related_name="access", on_delete=models.CASCADE
+    )
+    effective_role = models.CharField(max_length=10, choices=AccessRoles.choices)
+
+    def __str__(self) -> str:
+        return f"{self.user} ({self.effective_role}) on {self.project_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "project"], name="project_access_user_project"
+            )
+        ]
+        verbose_name_plural = "Project access"
+
+
+# Issue fields that only matter for one IssueType live in one-to-one detail
+# tables, so the hot Issue row stays narrow. Keyed by the reverse accessor.
+ISSUE_DETAIL_FIELDS: dict[str, tuple[str, ...]] = {
+    "bug_detail": (
+        "steps_to_reproduce",
+        "expected_result",
+        "actual_result",
+        "environment",
+    ),
+    "feature_detail": ("requirements", "business_value", "feature_dependencies"),
+    "improvement_detail": (
+        "performance_impact",
+        "estimated_impact",
+        "user_feedback",
+        "technical_details",
+    ),
+    "task_detail": ("completion_criteria",),
+}
+
+
+def _detail_property(detail_name: str, field_name: str) -> property:
+    """Expose a detail table field as a plain attribute of ``Issue``.
+
+    Reads load the detail row lazily (once per instance); writes are kept
+    on the issue and persisted by ``Issue.save()``.
+    """
+
+    def getter(self):
+        changes = self._detail_changes.get(detail_name, {})
+        if field_name in changes:
+            return changes[field_name]
+        detail = self.get_detail(detail_name)
+        return getattr(detail, field_name) if detail is not None else None
+
+    def setter(self, value) -> None:
+        self._detail_changes.setdefault(detail_name, {})[field_name] = value
+
+    return property(getter, setter)
+
+
+class Issue(TrackedFieldsMixin, models.Model):
     class IssueType(models.TextChoices):
         BUG = "BUG", "Bug"
         TASK = "TASK", "Task"
@@ -176,7 +351,155 @@ class Issue(models.Model):
         blank=True, null=True, help_text="Resolution details once the issue is resolved"
     )
 
-    # bug report
+    # Feature-specific fields
+    user_story = models.ForeignKey(
+        "UserStory",
+        related_name="issues",
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        help_text="User story describing the feature from a user's perspective",
+    )
+
+    # Task-specific fields
+    effort_estimate = models.PositiveIntegerField(
+        blank=True, null=True, help_text="Estimated effort in hours/days"
+    )
+    # Per-type text fields, stored in the detail tables below
+    steps_to_reproduce = _detail_property("bug_detail", "steps_to_reproduce")
+    expected_result = _detail_property("bug_detail", "expected_result")
+    actual_result = _detail_property("bug_detail", "actual_result")
+    environment = _detail_property("bug_detail", "environment")
+    requirements = _detail_property("feature_detail", "requirements")
+    business_value = _detail_property("feature_detail", "business_value")
+    feature_dependencies = _detail_property("feature_detail", "feature_dependencies")
+    performance_impact = _detail_property("improvement_detail", "performance_impact")
+    estimated_impact = _detail_property("improvement_detail", "estimated_impact")
+    user_feedback = _detail_property("improvement_detail", "user_feedback")
+    technical_details = _detail_property("improvement_detail", "technical_details")
+    completion_criteria = _detail_property("task_detail", "completion_criteria")
+
+    created_by = models.ForeignKey(
+        User, related_name="issues_created", null=True, on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now_add=True)
+
+    tracked_fields = (
+        "status",
+        "priority",
+        "assignee_id",
+        "sprint_id",
+        "effort_estimate",
+        "user_story_id",
+    )
+
+    def __str__(self) -> str:
+        return self.title
+
+    @property
+    def _detail_changes(self) -> dict:
+        return self.__dict__.setdefault("_pending_detail_changes", {})
+
+    def get_detail(self, detail_name: str):
+        """Return the detail row for ``detail_name`` or ``None``."""
+        try:
+            return getattr(self, detail_name)
+        except ObjectDoesNotExist:
+            return None
+
+    def save(self, *args, **kwargs) -> None:
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        self._save_details(adding)
+        self._remember_tracked_values()
+
+    def _save_details(self, adding: bool) -> None:
+        changes = self.__dict__.pop("_pending_detail_changes", None) or {}
+        for detail_name, values in changes.items():
+            detail = None if adding else self.get_detail(detail_name)
+            if detail is None:
+                if not any(values.values()):
+                    continue
+                detail_model = self._meta.get_field(detail_name).related_model
+                detail = detail_model(issue=self)
+            for field_name, value in values.items():
+                setattr(detail, field_name, value)
+            detail.save()
+            setattr(self, detail_name, detail)
+
+    class Meta:
+        ordering: list[str] = ["-created_at"]
+        indexes = [
+            # Board: a project's issues per status column
+            models.Index(
+                fields=["project", "status", "-created_at"],
+                name="issue_project_status_idx",
+            ),
+            # Backlog and sprint boards: sprint IS NULL / sprint = X
+            models.Index(
+                fields=["project", "sprint", "-created_at"],
+                name="issue_project_sprint_idx",
+            ),
+            models.Index(
+                fields=["project", "_type", "-created_at"],
+                name="issue_project_type_idx",
+            ),
+            models.Index(
+                fields=["project", "priority", "-created_at"],
+                name="issue_project_priority_idx",
+            ),
+            # "My issues"
+            models.Index(
+                fields=["assignee", "status"], name="issue_assignee_status_idx"
+            ),
+        ]
+
+
+class IssueDependency(models.Model):
+    """``issue`` can't start before ``depends_on`` is finished.
+
+    ``project`` repeats the issues' project so a project's whole graph loads
+    with one indexed query. Add edges with ``apps.project.graph.add_dependency``,
+    which rejects cycles; ``Issue`` has no many-to-many to write them through,
+    its edges are read with ``dependency_edges`` and ``dependent_edges``.
+    """
+
+    project = models.ForeignKey(
+        Project, related_name="issue_dependencies", on_delete=models.CASCADE
+    )
+    issue = models.ForeignKey(
+        Issue, related_name="dependency_edges", on_delete=models.CASCADE
+    )
+    depends_on = models.ForeignKey(
+        Issue, related_name="dependent_edges", on_delete=models.CASCADE
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.issue_id} depends on {self.depends_on_id}"
+
+    def save(self, *args, **kwargs) -> None:
+        if self.project_id is None:
+            self.project_id = self.issue.project_id
+        super().save(*args, **kwargs)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["issue", "depends_on"], name="issue_dependency_edge"
+            ),
+            models.CheckConstraint(
+                condition=~models.Q(issue=models.F("depends_on")),
+                name="issue_dependency_not_self",
+            ),
+        ]
+
+
+class IssueBugDetail(models.Model):
+    issue = models.OneToOneField(
+        Issue, primary_key=True, related_name="bug_detail", on_delete=models.CASCADE
+    )
     steps_to_reproduce = models.TextField(
         blank=True, null=True, help_text="Steps to reproduce the bug"
     )
@@ -192,18 +515,14 @@ class Issue(models.Model):
         help_text="Environment details (e.g., OS, browser version)",
     )
 
-    # Feature-specific fields
+
+class IssueFeatureDetail(models.Model):
+    issue = models.OneToOneField(
+        Issue, primary_key=True, related_name="feature_detail", on_delete=models.CASCADE
+    )
     requirements = models.TextField(
         blank=True, null=True, help_text="Business requirements for the feature"
     )
-    user_story = models.ForeignKey(
-        "UserStory",
-        related_name="issues",
-        on_delete=models.CASCADE,
-        blank=True,
-        null=True,
-        help_text="User story describing the feature from a user's perspective",
-    )
     business_value = models.TextField(
         blank=True, null=True, help_text="The value this feature brings to the business"
     )
@@ -213,7 +532,14 @@ class Issue(models.Model):
         help_text="Other features, tasks, or issues this feature depends on",
     )
 
-    # Improvement-specific fields
+
+class IssueImprovementDetail(models.Model):
+    issue = models.OneToOneField(
+        Issue,
+        primary_key=True,
+        related_name="improvement_detail",
+        on_delete=models.CASCADE,
+    )
     performance_impact = models.TextField(
         blank=True, null=True, help_text="Impact of the improvement on performance"
     )
@@ -227,42 +553,17 @@ class Issue(models.Model):
         blank=True, null=True, help_text="Technical aspects of the improvement"
     )
 
-    # Task-specific fields
-    effort_estimate = models.PositiveIntegerField(
-        blank=True, null=True, help_text="Estimated effort in hours/days"
+
+class IssueTaskDetail(models.Model):
+    issue = models.OneToOneField(
+        Issue, primary_key=True, related_name="task_detail", on_delete=models.CASCADE
     )
     completion_criteria = models.TextField(
         blank=True, null=True, help_text="Criteria to consider the task complete"
     )
-    task_dependencies = models.ForeignKey(
-        "self",
-        related_name="issue_dependencies",
-        blank=True,
-        null=True,
-        on_delete=models.PROTECT,
-        help_text="Dependencies on other tasks or issues",
-    )
-
-    attachments = models.FileField(
-        upload_to="issue/attachments/",
-        null=True,
-        blank=True,
-        help_text="Files related to the issue",
-    )
-    created_by = models.ForeignKey(
-        User, related_name="issues_created", null=True, on_delete=models.SET_NULL
-    )
-    created_at = models.DateTimeField(auto_now=True)
-    updated_at = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self) -> str:
-        return self.title
 
-    class Meta:
-        ordering: list[str] = ["-created_at"]
 
-
-class Sprint(models.Model):
+class Sprint(TrackedFieldsMixin, models.Model):
 
     class SprintStatuses(models.TextChoices):
         NOT_STARTED = "NOT_STARTED", "Not Started"
@@ -307,16 +608,57 @@ class Sprint(models.Model):
         help_text="Issues assigned to this sprint",
     )
 
+    tracked_fields = ("status", "start_date", "end_date", "is_active")
+
     def __str__(self) -> str:
         return f"Sprint: {self.name} ({self.project.name})"
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "-created_at"],
+                condition=models.Q(is_active=True),
+                name="sprint_active_project_idx",
+            ),
+        ]
+
     def save(self, *args, **kwargs) -> None:
         if self.start_date and self.end_date:
             self.duration = (self.end_date - self.start_date).days
         super().save(*args, **kwargs)
+        self._remember_tracked_values()
+
+
+class SprintSnapshot(models.Model):
+    """Daily per-status totals of a sprint, for burndown and velocity charts.
+
+    Maintained incrementally from issue changes; one row per
+    (sprint, date, status).
+    """
+
+    sprint = models.ForeignKey(
+        Sprint, related_name="snapshots", on_delete=models.CASCADE
+    )
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Status.choices)
+    issue_count = models.IntegerField(default=0)
+    effort = models.IntegerField(
+        default=0, help_text="Sum of effort_estimate of the issues in this status"
+    )
+
+    def __str__(self) -> str:
+        return f"{self.sprint_id} {self.date} {self.status}: {self.issue_count}"
+
+    class Meta:
+        ordering: list[str] = ["date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sprint", "date", "status"], name="sprint_snapshot_day_status"
+            )
+        ]
 
 
-class Epic(models.Model):
+class Epic(TrackedFieldsMixin, IssueRollup):
     class EpicStatuses(models.TextChoices):
         TO_DO = "TO_DO", "To Do"
         IN_PROGRESS = "IN_PROGRESS", "In Progress"
@@ -365,17 +707,37 @@ class Epic(models.Model):
     created_by = models.ForeignKey(
         User, related_name="epics_created", null=True, on_delete=models.SET_NULL
     )
+    story_count = models.IntegerField(default=0, editable=False)
+    stories_done = models.IntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now=True)
     updated_at = models.DateTimeField(auto_now_add=True)
 
+    rollup_fields = (*IssueRollup.rollup_fields, "story_count", "stories_done")
+    tracked_fields = ("status", "priority", "is_blocked", "is_active")
+
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        self._remember_tracked_values()
+
     class Meta:
         ordering: list[str] = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["project", "status", "-created_at"],
+                name="epic_project_status_idx",
+            ),
+            models.Index(
+                fields=["project", "-created_at"],
+                condition=models.Q(is_active=True),
+                name="epic_active_project_idx",
+            ),
+        ]
 
 
-class UserStory(models.Model):
+class UserStory(TrackedFieldsMixin, IssueRollup):
     title = models.CharField(
         max_length=255, help_text="The title or summary of the user story"
     )
@@ -425,12 +787,29 @@ class UserStory(models.Model):
     created_at = models.DateTimeField(auto_now=True)
     updated_at = models.DateTimeField(auto_now_add=True)
 
+    tracked_fields = ("epic_id", "sprint_id", "status", "priority", "is_blocked")
+
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        self._remember_tracked_values()
+
     class Meta:
         ordering: list[str] = ["-created_at"]
         verbose_name_plural = "User Stories"
+        indexes = [
+            models.Index(
+                fields=["sprint", "status", "-created_at"],
+                name="userstory_sprint_status_idx",
+            ),
+            models.Index(
+                fields=["epic", "-created_at"],
+                condition=models.Q(is_active=True),
+                name="userstory_active_epic_idx",
+            ),
+        ]
 
 
 class AcceptanceCriteria(models.Model):
@@ -467,7 +846,9 @@ class AcceptanceCriteria(models.Model):
         default=False,
         help_text="Indicates whether the acceptance criteria has been met",
     )
-    is_met_date = models.DateTimeField()
+    is_met_date = models.DateTimeField(
+        blank=True, null=True, help_text="When the acceptance criteria was met"
+    )
     created_by = models.ForeignKey(
         User,
         related_name="created_acceptance_criteria",
@@ -480,9 +861,248 @@ class AcceptanceCriteria(models.Model):
     def __str__(self) -> str:
         return f"Acceptance Criteria for {self.user_story.title}"
 
-    def save(self) -> None:
-        if self.is_met:
-            self.is_met_date = datetime.now()
+    def save(self, *args, **kwargs) -> None:
+        if not self.is_met:
+            self.is_met_date = None
+        elif self.is_met_date is None:
+            self.is_met_date = timezone.now()
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering: list[str] = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user_story", "is_met"], name="criteria_story_met_idx"
+            ),
+        ]
+
+
+class SearchDocument(models.Model):
+    """Denormalized text of a searchable object, indexed by the search backend.
+
+    On SQLite an FTS5 table mirrors these rows; on PostgreSQL a GIN index
+    covers their tsvector. See ``apps.project.search``.
+    """
+
+    class Kinds(models.TextChoices):
+        ISSUE = "issue", "Issue"
+        EPIC = "epic", "Epic"
+        USER_STORY = "user_story", "User Story"
+
+    kind = models.CharField(max_length=20, choices=Kinds.choices)
+    object_id = models.BigIntegerField()
+    project = models.ForeignKey(
+        Project,
+        related_name="search_documents",
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()}: {self.title}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"], name="search_document_object"
+            )
+        ]
+
+
+class ChangeLog(models.Model):
+    """One change to an issue, epic, sprint or user story of a project.
+
+    Written from model signals once the change commits; the id is the
+    cursor clients resume the live change stream from. See
+    ``apps.project.changes``.
+    """
+
+    class Kinds(models.TextChoices):
+        ISSUE = "issue", "Issue"
+        EPIC = "epic", "Epic"
+        SPRINT = "sprint", "Sprint"
+        USER_STORY = "user_story", "User Story"
+
+    class Actions(models.TextChoices):
+        CREATED = "created", "Created"
+        UPDATED = "updated", "Updated"
+        DELETED = "deleted", "Deleted"
+
+    project = models.ForeignKey(
+        Project, related_name="changes", on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=20, choices=Kinds.choices)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=Actions.choices)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} {self.object_id} {self.action}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "id"], name="changelog_project_id_idx"),
+            models.Index(fields=["created_at"], name="changelog_created_idx"),
+        ]
+
+
+class ActivityLog(models.Model):
+    """One field of an issue, epic, sprint or user story changing value.
+
+    Append-only: rows are never updated or deleted, and outlive what they
+    describe, so ``object_id`` and ``actor`` are plain columns without
+    foreign key constraints. The only index serves the timeline of one
+    object, newest first. Written in batches by ``apps.project.activity``.
+    """
+
+    class Kinds(models.IntegerChoices):
+        ISSUE = 1, "Issue"
+        EPIC = 2, "Epic"
+        SPRINT = 3, "Sprint"
+        USER_STORY = 4, "User Story"
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.PositiveSmallIntegerField(choices=Kinds.choices)
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=30)
+    old_value = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    new_value = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    actor = models.ForeignKey(
+        User,
+        related_name="+",
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} {self.object_id} {self.field}"
+
+    def save(self, *args, **kwargs) -> None:
+        if not self._state.adding:
+            raise ValueError("Activity log entries can't be changed.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Activity log entries can't be deleted.")
+
+    class Meta:
+        ordering: list[str] = ["-id"]
+        indexes = [
+            models.Index(
+                fields=["kind", "object_id", "id"], name="activity_object_idx"
+            ),
+        ]
+
+
+class Job(models.Model):
+    """A task of ``apps.project.jobs`` to run in the background.
+
+    Queued jobs whose ``run_at`` has come are claimed by the ``run_jobs``
+    worker; failures are queued again, later, until ``max_attempts`` runs
+    failed.
+    """
+
+    class Statuses(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(
+        max_length=10, choices=Statuses.choices, default=Statuses.QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User, related_name="jobs", null=True, on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.task} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Statuses.SUCCEEDED, self.Statuses.FAILED)
 
     class Meta:
         ordering: list[str] = ["-created_at"]
+        indexes = [
+            # The worker's poll: due queued jobs, and stale running ones
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+            models.Index(
+                fields=["created_by", "-created_at"], name="job_created_by_idx"
+            ),
+        ]
+
+
+class Blob(models.Model):
+    """The content of attached files, stored once per SHA-256.
+
+    The file lives in the attachment store under ``apps.project.attachments.
+    blob_name``; ``metadata`` is filled in the first time it's asked for.
+    """
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    metadata = models.JSONField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.sha256
+
+
+class Attachment(models.Model):
+    issue = models.ForeignKey(
+        Issue,
+        related_name="attachments",
+        on_delete=models.CASCADE,
+        help_text="Files related to the issue",
+    )
+    blob = models.ForeignKey(Blob, related_name="attachments", on_delete=models.PROTECT)
+    filename = models.CharField(max_length=255)
+    uploaded_by = models.ForeignKey(
+        User, related_name="attachments", null=True, on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.filename
+
+
+class AttachmentUpload(models.Model):
+    """A chunked upload in progress; ``received`` bytes are on disk so far."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    issue = models.ForeignKey(
+        Issue, related_name="attachment_uploads", on_delete=models.CASCADE
+    )
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    created_by = models.ForeignKey(
+        User, related_name="attachment_uploads", null=True, on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.filename} ({self.received}/{self.size})"
@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.db.models import Count, F
+from django.urls import reverse
+
+from .models import ProjectAccess, ProjectMember
+
+NAVIGATION_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(user_id) -> str:
+    return f"project:navigation:version:{user_id}"
+
+
+def _payload_key(user_id, version) -> str:
+    return f"project:navigation:{user_id}:v{version}"
+
+
+def get_navigation_version(user_id) -> int:
+    return cache.get_or_set(_version_key(user_id), 1, NAVIGATION_TIMEOUT)
+
+
+async def aget_navigation_version(user_id) -> int:
+    return await cache.aget_or_set(_version_key(user_id), 1, NAVIGATION_TIMEOUT)
+
+
+def invalidate_navigation(*user_ids) -> None:
+    """Bump the navigation version of every given user.
+
+    Old payloads are never deleted, they simply stop being addressed and
+    expire on their own.
+    """
+    for user_id in {pk for pk in user_ids if pk is not None}:
+        key = _version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, NAVIGATION_TIMEOUT)
+
+
+def _accessible_projects(user):
+    return (
+        ProjectAccess.objects.filter(user=user)
+        .order_by("project__name")
+        .values(pk=F("project_id"), name=F("project__name"))
+    )
+
+
+def _member_counts(projects):
+    return (
+        ProjectMember.objects.filter(project_id__in=[p["pk"] for p in projects])
+        .order_by()
+        .values("project_id")
+        .annotate(total=Count("user_id", distinct=True))
+        .values_list("project_id", "total")
+    )
+
+
+def _navigation(projects, member_counts) -> dict:
+    for project in projects:
+        pk = project["pk"]
+        project["url"] = reverse("project_detail", args=[pk])
+        project["members_url"] = reverse("project_members_list", args=[pk])
+        project["epics_url"] = reverse("project_epics_list", args=[pk])
+        project["issues_url"] = reverse("project_issues_list", args=[pk])
+        project["user_stories_url"] = reverse("project_user_stories_list", args=[pk])
+        project["sprints_url"] = reverse("project_sprints_list", args=[pk])
+        project["member_count"] = member_counts.get(pk, 0)
+    return {"projects": projects, "total_projects": len(projects)}
+
+
+def build_navigation(user) -> dict:
+    projects = list(_accessible_projects(user))
+    return _navigation(projects, dict(_member_counts(projects)))
+
+
+async def abuild_navigation(user) -> dict:
+    projects = [project async for project in _accessible_projects(user)]
+    counts = {pk: total async for pk, total in _member_counts(projects)}
+    return _navigation(projects, counts)
+
+
+def get_navigation(user) -> dict:
+    """Return the sidebar payload for ``user``, cached per user version."""
+    version = get_navigation_version(user.pk)
+    key = _payload_key(user.pk, version)
+    navigation = cache.get(key)
+    if navigation is None:
+        navigation = build_navigation(user)
+        navigation["version"] = version
+        cache.set(key, navigation, NAVIGATION_TIMEOUT)
+    return navigation
+
+
+async def aget_navigation(user) -> dict:
+    """Async version of ``get_navigation``."""
+    version = await aget_navigation_version(user.pk)
+    key = _payload_key(user.pk, version)
+    navigation = await cache.aget(key)
+    if navigation is None:
+        navigation = await abuild_navigation(user)
+        navigation["version"] = version
+        await cache.aset(key, navigation, NAVIGATION_TIMEOUT)
+    return navigation
@@ -0,0 +1,113 @@
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(position, pk) -> str:
+    raw = f"{position.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return ``(position, pk)`` for a cursor, or ``None`` if it is invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position, pk = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(position), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str | None
+    page_size: int
+    next_query: str | None = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _seek(queryset, cursor, page_size, field):
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    queryset = queryset.order_by(f"-{field}", "-pk")
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        value, pk = position
+        queryset = queryset.filter(
+            Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk})
+        )
+    return queryset[: page_size + 1], page_size
+
+
+def _page(rows, page_size, field) -> KeysetPage:
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(getattr(rows[-1], field), rows[-1].pk)
+    return KeysetPage(object_list=rows, next_cursor=next_cursor, page_size=page_size)
+
+
+def paginate_keyset(
+    queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, field="created_at"
+) -> KeysetPage:
+    """Seek-paginate ``queryset`` newest first on ``(field, id)``.
+
+    Each page is a range scan that starts right after the previous page's
+    last row, so deep pages cost the same as the first one. ``field`` must
+    be a datetime field.
+    """
+    queryset, page_size = _seek(queryset, cursor, page_size, field)
+    return _page(list(queryset), page_size, field)
+
+
+async def apaginate_keyset(
+    queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, field="created_at"
+) -> KeysetPage:
+    """Async version of ``paginate_keyset``."""
+    queryset, page_size = _seek(queryset, cursor, page_size, field)
+    return _page([row async for row in queryset], page_size, field)
+
+
+def _page_size(request):
+    page_size = request.GET.get("page_size", DEFAULT_PAGE_SIZE)
+    if not str(page_size).isdigit():
+        page_size = DEFAULT_PAGE_SIZE
+    return page_size
+
+
+def _link(request, page) -> KeysetPage:
+    if page.has_next:
+        params = request.GET.copy()
+        params["cursor"] = page.next_cursor
+        page.next_query = params.urlencode()
+    return page
+
+
+def paginate_request(request, queryset, field="created_at") -> KeysetPage:
+    """Paginate using the ``cursor`` and ``page_size`` query parameters."""
+    page = paginate_keyset(
+        queryset, request.GET.get("cursor"), _page_size(request), field
+    )
+    return _link(request, page)
+
+
+async def apaginate_request(request, queryset, field="created_at") -> KeysetPage:
+    """Async version of ``paginate_request``."""
+    page = await apaginate_keyset(
+        queryset, request.GET.get("cursor"), _page_size(request), field
+    )
+    return _link(request, page)
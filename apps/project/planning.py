@@ -0,0 +1,87 @@
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import QuerySet
+from django.dispatch import Signal
+
+from .models import Issue, Sprint
+from .snapshots import rebuild_snapshot_days
+
+# Sent once per move with ``project_id``, ``sprint_id`` (None for the
+# backlog), ``issue_ids``, ``from_sprint_ids`` and ``previous``, the sprint
+# id each issue had before.
+issues_moved = Signal()
+
+SprintIssues = Sprint.issues.through
+
+
+@dataclass
+class MoveResult:
+    issue_ids: list = field(default_factory=list)
+    from_sprint_ids: list = field(default_factory=list)
+
+    @property
+    def moved(self) -> int:
+        return len(self.issue_ids)
+
+
+def sync_sprint_issues(issue_ids, sprint_id) -> None:
+    """Make ``sprint_id`` the only sprint of ``issue_ids`` in ``Sprint.issues``."""
+    stale = SprintIssues.objects.filter(issue_id__in=issue_ids)
+    if sprint_id is not None:
+        stale = stale.exclude(sprint_id=sprint_id)
+    stale.delete()
+    if sprint_id is not None:
+        SprintIssues.objects.bulk_create(
+            [SprintIssues(sprint_id=sprint_id, issue_id=pk) for pk in issue_ids],
+            ignore_conflicts=True,
+        )
+
+
+def move_issues(issues, sprint, project) -> MoveResult:
+    """Move ``issues`` (ids or a queryset) of ``project`` into ``sprint``.
+
+    ``sprint=None`` moves them back to the backlog. Issues of other projects
+    and issues already there are left alone. ``Issue.sprint`` is set with
+    one UPDATE, ``Sprint.issues`` is brought in line and today's snapshots
+    of every sprint involved are rebuilt, all in one transaction; no
+    per-issue signals are sent, ``issues_moved`` is sent once instead.
+    """
+    if sprint is not None and sprint.project_id != project.pk:
+        raise ValidationError(
+            "Issues can only be moved to a sprint of their project.", code="project"
+        )
+    sprint_id = sprint.pk if sprint is not None else None
+    selected = Issue.objects.filter(project=project)
+    if isinstance(issues, QuerySet):
+        selected = selected.filter(pk__in=issues.values("pk"))
+    else:
+        selected = selected.filter(pk__in=list(issues))
+    if sprint_id is None:
+        selected = selected.filter(sprint__isnull=False)
+    else:
+        selected = selected.exclude(sprint_id=sprint_id)
+    result = MoveResult()
+    with transaction.atomic():
+        rows = list(
+            selected.select_for_update().order_by().values_list("pk", "sprint_id")
+        )
+        if not rows:
+            return result
+        result.issue_ids = [pk for pk, _ in rows]
+        result.from_sprint_ids = sorted({old for _, old in rows if old is not None})
+        Issue.objects.filter(pk__in=result.issue_ids).update(sprint_id=sprint_id)
+        sync_sprint_issues(result.issue_ids, sprint_id)
+        rebuild_snapshot_days(
+            [*result.from_sprint_ids, *([sprint_id] if sprint_id else [])]
+        )
+        issues_moved.send(
+            sender=Issue,
+            project_id=project.pk,
+            sprint_id=sprint_id,
+            issue_ids=result.issue_ids,
+            from_sprint_ids=result.from_sprint_ids,
+            previous=dict(rows),
+        )
+    return result
@@ -0,0 +1,233 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Epic, Issue, IssueRollup, Status, UserStory
+
+ISSUE_FIELDS = IssueRollup.rollup_fields
+STORY_FIELDS = ("story_count", "stories_done")
+
+
+def contribution(status, effort) -> tuple:
+    """What one issue adds to ``IssueRollup.rollup_fields``."""
+    done = status == Status.COMPLETED
+    effort = effort or 0
+    return (1, int(done), effort, effort if done else 0)
+
+
+def _negate(values) -> tuple:
+    return tuple(-value for value in values)
+
+
+def _difference(new, old) -> tuple:
+    return tuple(a - b for a, b in zip(new, old))
+
+
+def apply_delta(queryset, fields, delta) -> None:
+    """Add ``delta`` to ``fields`` of every row of ``queryset`` in one UPDATE."""
+    updates = {name: F(name) + value for name, value in zip(fields, delta) if value}
+    if updates:
+        queryset.update(**updates)
+
+
+def _issue_aggregates(prefix: str = "") -> dict:
+    done = Q(**{f"{prefix}status": Status.COMPLETED})
+    return {
+        "issue_count": Count(f"{prefix}pk"),
+        "issues_done": Count(f"{prefix}pk", filter=done),
+        "effort_total": Coalesce(Sum(f"{prefix}effort_estimate"), 0),
+        "effort_done": Coalesce(Sum(f"{prefix}effort_estimate", filter=done), 0),
+    }
+
+
+def _issue_totals(issues) -> tuple:
+    totals = issues.aggregate(**_issue_aggregates())
+    return tuple(totals[name] for name in ISSUE_FIELDS)
+
+
+# Issues
+def record_issue_saved(issue, created: bool) -> None:
+    """Move an issue's contribution between its old and new state."""
+    new = contribution(issue.status, issue.effort_estimate)
+    if created:
+        if issue.user_story_id:
+            apply_delta(
+                UserStory.objects.filter(pk=issue.user_story_id), ISSUE_FIELDS, new
+            )
+        return
+    changes = issue.tracked_changes()
+    if not changes.keys() & {"status", "effort_estimate", "user_story_id"}:
+        return
+    old = contribution(
+        changes.get("status", (issue.status,))[0],
+        changes.get("effort_estimate", (issue.effort_estimate,))[0],
+    )
+    delta = _difference(new, old)
+    old_story_id = changes.get("user_story_id", (issue.user_story_id,))[0]
+    if old_story_id == issue.user_story_id:
+        if issue.user_story_id:
+            apply_delta(
+                UserStory.objects.filter(pk=issue.user_story_id), ISSUE_FIELDS, delta
+            )
+    else:
+        if old_story_id:
+            apply_delta(
+                UserStory.objects.filter(pk=old_story_id), ISSUE_FIELDS, _negate(old)
+            )
+        if issue.user_story_id:
+            apply_delta(
+                UserStory.objects.filter(pk=issue.user_story_id), ISSUE_FIELDS, new
+            )
+    if any(delta):
+        apply_delta(Epic.objects.filter(issues=issue), ISSUE_FIELDS, delta)
+
+
+def record_issue_epics_removed(issue) -> None:
+    """Take a deleted issue off its epics, before its links are deleted."""
+    removed = _negate(contribution(issue.status, issue.effort_estimate))
+    apply_delta(Epic.objects.filter(issues=issue), ISSUE_FIELDS, removed)
+
+
+def record_issue_story_removed(issue) -> None:
+    if issue.user_story_id:
+        removed = _negate(contribution(issue.status, issue.effort_estimate))
+        apply_delta(
+            UserStory.objects.filter(pk=issue.user_story_id), ISSUE_FIELDS, removed
+        )
+
+
+def record_epic_issues_linked(epic_ids, issue_ids, sign: int = 1) -> None:
+    """Add (or with ``sign=-1`` remove) issues to the totals of epics.
+
+    One side of the link is always a single object, as in ``m2m_changed``.
+    """
+    if not epic_ids or not issue_ids:
+        return
+    totals = _issue_totals(Issue.objects.filter(pk__in=issue_ids))
+    delta = totals if sign > 0 else _negate(totals)
+    apply_delta(Epic.objects.filter(pk__in=epic_ids), ISSUE_FIELDS, delta)
+
+
+# User stories
+def story_contribution(status) -> tuple:
+    return (1, int(status == Status.COMPLETED))
+
+
+def record_user_story_saved(story, created: bool) -> None:
+    new = story_contribution(story.status)
+    if created:
+        if story.epic_id:
+            apply_delta(Epic.objects.filter(pk=story.epic_id), STORY_FIELDS, new)
+        return
+    changes = story.tracked_changes()
+    if not changes.keys() & {"status", "epic_id"}:
+        return
+    old = story_contribution(changes.get("status", (story.status,))[0])
+    old_epic_id = changes.get("epic_id", (story.epic_id,))[0]
+    if old_epic_id == story.epic_id:
+        if story.epic_id:
+            apply_delta(
+                Epic.objects.filter(pk=story.epic_id),
+                STORY_FIELDS,
+                _difference(new, old),
+            )
+        return
+    if old_epic_id:
+        apply_delta(Epic.objects.filter(pk=old_epic_id), STORY_FIELDS, _negate(old))
+    if story.epic_id:
+        apply_delta(Epic.objects.filter(pk=story.epic_id), STORY_FIELDS, new)
+
+
+def record_user_story_removed(story) -> None:
+    if story.epic_id:
+        apply_delta(
+            Epic.objects.filter(pk=story.epic_id),
+            STORY_FIELDS,
+            _negate(story_contribution(story.status)),
+        )
+
+
+def record_user_stories_status(story_ids, done: bool) -> None:
+    """Adjust epics, in one UPDATE, after ``story_ids`` were bulk set (not) done."""
+    if not story_ids:
+        return
+    stories = UserStory.objects.filter(pk__in=story_ids)
+    per_epic = Subquery(
+        stories.filter(epic=OuterRef("pk"))
+        .order_by()
+        .values("epic")
+        .annotate(total=Count("pk"))
+        .values("total"),
+        output_field=IntegerField(),
+    )
+    stories_done = (
+        F("stories_done") + per_epic if done else F("stories_done") - per_epic
+    )
+    Epic.objects.filter(pk__in=stories.values("epic_id")).update(
+        stories_done=stories_done
+    )
+
+
+# Reconciliation
+def _story_count(filter=None):
+    return Coalesce(
+        Subquery(
+            UserStory.objects.filter(epic=OuterRef("pk"))
+            .order_by()
+            .values("epic")
+            .annotate(total=Count("pk", filter=filter))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _write(objects, rows, fields, batch_size) -> int:
+    """Store recomputed counters, touching only rows that drifted."""
+    changed = []
+    current = objects.only(*fields).order_by("pk")
+    for obj in current.iterator(chunk_size=batch_size):
+        values = rows.get(obj.pk, (0,) * len(fields))
+        if tuple(getattr(obj, name) for name in fields) != values:
+            for name, value in zip(fields, values):
+                setattr(obj, name, value)
+            changed.append(obj)
+    objects.model.objects.bulk_update(changed, fields, batch_size=batch_size)
+    return len(changed)
+
+
+def reconcile_user_stories(stories=None, batch_size: int = 1000) -> int:
+    """Recompute the counters of ``stories`` (default all) in one aggregate query.
+
+    Returns how many user stories had drifted.
+    """
+    if stories is None:
+        stories = UserStory.objects.all()
+    rows = {
+        story_id: tuple(totals)
+        for story_id, *totals in Issue.objects.filter(user_story__in=stories)
+        .order_by()
+        .values_list("user_story_id")
+        .annotate(**_issue_aggregates())
+    }
+    return _write(stories, rows, ISSUE_FIELDS, batch_size)
+
+
+def reconcile_epics(epics=None, batch_size: int = 1000) -> int:
+    """Recompute the counters of ``epics`` (default all) in one aggregate query.
+
+    Returns how many epics had drifted.
+    """
+    if epics is None:
+        epics = Epic.objects.all()
+    rows = {
+        epic_id: tuple(totals)
+        for epic_id, *totals in epics.order_by()
+        .values_list("pk")
+        .annotate(
+            **_issue_aggregates("issues__"),
+            story_count=_story_count(),
+            stories_done=_story_count(Q(status=Status.COMPLETED)),
+        )
+    }
+    return _write(epics, rows, ISSUE_FIELDS + STORY_FIELDS, batch_size)
@@ -0,0 +1,113 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+# Reads may go to a replica (set by ``use_replica``)
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+# Reads stay on the primary: this request wrote, or follows a recent write
+_pinned: ContextVar[bool] = ContextVar("pinned_to_primary", default=False)
+
+PIN_COOKIE = "pin_primary"
+
+
+def pin_to_primary() -> None:
+    _pinned.set(True)
+
+
+def is_pinned() -> bool:
+    return _pinned.get()
+
+
+class ReplicaRouter:
+    """Send reads of ``use_replica`` views to ``settings.DATABASE_REPLICAS``.
+
+    Everything else, writes and every read after a write in the same request
+    included, uses the primary. Replicas mirror the primary, so nothing is
+    migrated on them.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if replicas and _replica_reads.get() and not _pinned.get():
+            return random.choice(replicas)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+def use_replica(view_func):
+    """Let the view read from a replica, unless it or a recent request wrote."""
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def _wrapped_async_view(request, *args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+
+        return _wrapped_async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    return _wrapped_view
+
+
+@sync_and_async_middleware
+def PrimaryPinningMiddleware(get_response):
+    """Keep a client on the primary for ``REPLICA_PIN_SECONDS`` after it wrote.
+
+    Replicas lag behind, so the page a client is redirected to after a
+    POST would otherwise miss what it just saved.
+    """
+
+    def start(request):
+        return _pinned.set(
+            request.method not in ("GET", "HEAD", "OPTIONS")
+            or PIN_COOKIE in request.COOKIES
+        )
+
+    def finish(request, response, token):
+        if _pinned.get() and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        _pinned.reset(token)
+        return response
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = start(request)
+            return finish(request, await get_response(request), token)
+
+    else:
+
+        def middleware(request):
+            token = start(request)
+            return finish(request, get_response(request), token)
+
+    return middleware
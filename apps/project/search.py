@@ -0,0 +1,339 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Prefetch
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from .models import (
+    AcceptanceCriteria,
+    Epic,
+    Issue,
+    ProjectAccess,
+    SearchDocument,
+    UserStory,
+)
+
+Kinds = SearchDocument.Kinds
+DOCUMENT_TABLE = SearchDocument._meta.db_table
+ACCESS_SUBQUERY = (
+    f"SELECT project_id FROM {ProjectAccess._meta.db_table} WHERE user_id = %s"
+)
+
+
+def _join(*parts) -> str:
+    return "\n".join(part for part in parts if part)
+
+
+# Documents
+def issue_document(issue) -> SearchDocument:
+    return SearchDocument(
+        kind=Kinds.ISSUE,
+        object_id=issue.pk,
+        project_id=issue.project_id,
+        title=issue.title,
+        body=_join(issue.description, issue.resolution),
+    )
+
+
+def epic_document(epic) -> SearchDocument:
+    return SearchDocument(
+        kind=Kinds.EPIC,
+        object_id=epic.pk,
+        project_id=epic.project_id,
+        title=epic.title,
+        body=_join(epic.description, epic.goal),
+    )
+
+
+def user_story_document(user_story, project_id, criteria) -> SearchDocument:
+    return SearchDocument(
+        kind=Kinds.USER_STORY,
+        object_id=user_story.pk,
+        project_id=project_id,
+        title=user_story.title,
+        body=_join(
+            user_story.description,
+            *(_join(c.description, c.given, c.when, c.then) for c in criteria),
+        ),
+    )
+
+
+def _user_stories():
+    return UserStory.objects.annotate(
+        project_ref=Coalesce("epic__project_id", "sprint__project_id")
+    ).prefetch_related(
+        Prefetch("acceptance_criteria", queryset=AcceptanceCriteria.objects.order_by())
+    )
+
+
+def save_documents(documents) -> None:
+    SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["kind", "object_id"],
+        update_fields=["project", "title", "body", "updated_at"],
+    )
+
+
+def delete_documents(kind, object_ids) -> None:
+    SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def index_issues(issues) -> None:
+    save_documents([issue_document(issue) for issue in issues])
+
+
+def index_epic(epic) -> None:
+    save_documents([epic_document(epic)])
+
+
+def index_user_story(user_story_id) -> None:
+    user_story = _user_stories().filter(pk=user_story_id).first()
+    if user_story is not None:
+        save_documents(
+            [
+                user_story_document(
+                    user_story,
+                    user_story.project_ref,
+                    user_story.acceptance_criteria.all(),
+                )
+            ]
+        )
+
+
+def rebuild_documents(batch_size: int = 1000) -> int:
+    """Regenerate every search document from the source tables."""
+    SearchDocument.objects.all().delete()
+    total = 0
+    sources = (
+        (
+            Issue.objects.only("title", "description", "resolution", "project"),
+            issue_document,
+        ),
+        (Epic.objects.only("title", "description", "goal", "project"), epic_document),
+        (
+            _user_stories(),
+            lambda story: user_story_document(
+                story, story.project_ref, story.acceptance_criteria.all()
+            ),
+        ),
+    )
+    for queryset, build in sources:
+        batch = []
+        for obj in queryset.order_by("pk").iterator(chunk_size=batch_size):
+            batch.append(build(obj))
+            if len(batch) >= batch_size:
+                save_documents(batch)
+                total += len(batch)
+                batch = []
+        save_documents(batch)
+        total += len(batch)
+    get_backend().rebuild()
+    return total
+
+
+# Backends
+class BaseSearchBackend:
+    """Ranked full-text lookups over ``SearchDocument`` rows."""
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+
+    def setup(self) -> None:
+        """Create the backend's index structures if they do not exist."""
+
+    def rebuild(self) -> None:
+        """Rebuild the backend's index from the document table."""
+
+    def search(self, query, user_id=None, kind=None, limit=20, offset=0) -> list:
+        """Return ``[(document_id, rank), ...]`` best match first."""
+        raise NotImplementedError
+
+    def filter_objects(self, queryset, query, kind):
+        """Narrow ``queryset`` to every object of ``kind`` matching ``query``."""
+        raise NotImplementedError
+
+    def _filters(self, alias, user_id, kind):
+        sql, params = [], []
+        if user_id is not None:
+            sql.append(f"{alias}.project_id IN ({ACCESS_SUBQUERY})")
+            params.append(user_id)
+        if kind is not None:
+            sql.append(f"{alias}.kind = %s")
+            params.append(kind)
+        return "".join(f" AND {part}" for part in sql), params
+
+    def _fetch(self, sql, params) -> list:
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 external-content table kept in sync with triggers."""
+
+    table = f"{DOCUMENT_TABLE}_fts"
+
+    def setup(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                f"title, body, content='{DOCUMENT_TABLE}', content_rowid='id', "
+                "tokenize='porter unicode61')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_ai AFTER INSERT ON "
+                f"{DOCUMENT_TABLE} BEGIN INSERT INTO {self.table}(rowid, title, body) "
+                "VALUES (new.id, new.title, new.body); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_ad AFTER DELETE ON "
+                f"{DOCUMENT_TABLE} BEGIN INSERT INTO {self.table}"
+                f"({self.table}, rowid, title, body) "
+                "VALUES ('delete', old.id, old.title, old.body); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_au AFTER UPDATE ON "
+                f"{DOCUMENT_TABLE} BEGIN INSERT INTO {self.table}"
+                f"({self.table}, rowid, title, body) "
+                "VALUES ('delete', old.id, old.title, old.body); "
+                f"INSERT INTO {self.table}(rowid, title, body) "
+                "VALUES (new.id, new.title, new.body); END"
+            )
+
+    def rebuild(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+    @staticmethod
+    def match_expression(query) -> str:
+        # Quote every word so user input can't inject FTS5 syntax, and
+        # prefix-match it so the search box works while typing.
+        tokens = re.findall(r"\w+", query)
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def search(self, query, user_id=None, kind=None, limit=20, offset=0) -> list:
+        match = self.match_expression(query)
+        if not match:
+            return []
+        filters, params = self._filters("d", user_id, kind)
+        sql = (
+            f"SELECT d.id, bm25({self.table}, 10.0, 1.0) AS rank "
+            f"FROM {self.table} JOIN {DOCUMENT_TABLE} d ON d.id = {self.table}.rowid "
+            f"WHERE {self.table} MATCH %s{filters} "
+            "ORDER BY rank LIMIT %s OFFSET %s"
+        )
+        return self._fetch(sql, [match, *params, limit, offset])
+
+    def filter_objects(self, queryset, query, kind):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        filters, params = self._filters("d", None, kind)
+        sql = (
+            f"SELECT d.object_id FROM {self.table} "
+            f"JOIN {DOCUMENT_TABLE} d ON d.id = {self.table}.rowid "
+            f"WHERE {self.table} MATCH %s{filters}"
+        )
+        return queryset.filter(pk__in=RawSQL(sql, [match, *params]))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Expression GIN index over the documents' weighted tsvector."""
+
+    config = "english"
+    index = f"{DOCUMENT_TABLE}_search_idx"
+
+    @property
+    def vector(self) -> str:
+        return (
+            f"(setweight(to_tsvector('{self.config}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{self.config}', coalesce(body, '')), 'B'))"
+        )
+
+    def setup(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.index} ON {DOCUMENT_TABLE} "
+                f"USING GIN ({self.vector})"
+            )
+
+    def search(self, query, user_id=None, kind=None, limit=20, offset=0) -> list:
+        if not query.strip():
+            return []
+        filters, params = self._filters("d", user_id, kind)
+        sql = (
+            f"SELECT d.id, ts_rank(d.vector, q) AS rank FROM "
+            f"(SELECT id, project_id, kind, {self.vector} AS vector "
+            f"FROM {DOCUMENT_TABLE}) d, "
+            f"websearch_to_tsquery('{self.config}', %s) q "
+            f"WHERE d.vector @@ q{filters} ORDER BY rank DESC LIMIT %s OFFSET %s"
+        )
+        return self._fetch(sql, [query, *params, limit, offset])
+
+    def filter_objects(self, queryset, query, kind):
+        if not query.strip():
+            return queryset.none()
+        filters, params = self._filters("d", None, kind)
+        sql = (
+            f"SELECT d.object_id FROM "
+            f"(SELECT object_id, kind, {self.vector} AS vector "
+            f"FROM {DOCUMENT_TABLE}) d "
+            f"WHERE d.vector @@ websearch_to_tsquery('{self.config}', %s){filters}"
+        )
+        return queryset.filter(pk__in=RawSQL(sql, [query, *params]))
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unindexed ``icontains`` fallback for other databases."""
+
+    def search(self, query, user_id=None, kind=None, limit=20, offset=0) -> list:
+        if not query.strip():
+            return []
+        documents = SearchDocument.objects.filter(title__icontains=query)
+        if user_id is not None:
+            documents = documents.filter(project__access__user_id=user_id)
+        if kind is not None:
+            documents = documents.filter(kind=kind)
+        ids = documents.order_by("-updated_at").values_list("pk", flat=True)
+        return [(pk, 0) for pk in ids[offset : offset + limit]]
+
+    def filter_objects(self, queryset, query, kind):
+        if not query.strip():
+            return queryset.none()
+        documents = SearchDocument.objects.filter(title__icontains=query, kind=kind)
+        return queryset.filter(pk__in=documents.values("object_id"))
+
+
+BACKENDS = {"sqlite": SQLiteSearchBackend, "postgresql": PostgresSearchBackend}
+
+
+def get_backend(using: str = DEFAULT_DB_ALIAS) -> BaseSearchBackend:
+    connection = connections[using]
+    return BACKENDS.get(connection.vendor, SimpleSearchBackend)(connection)
+
+
+def search_documents(query, user=None, kind=None, page: int = 1, page_size: int = 20):
+    """Return ``(documents, has_next)`` for a ranked page of search results."""
+    page = max(page, 1)
+    rows = get_backend().search(
+        query,
+        user_id=user.pk if user is not None else None,
+        kind=kind,
+        limit=page_size + 1,
+        offset=(page - 1) * page_size,
+    )
+    has_next = len(rows) > page_size
+    ids = [pk for pk, _ in rows[:page_size]]
+    documents = SearchDocument.objects.select_related("project").in_bulk(ids)
+    return [documents[pk] for pk in ids if pk in documents], has_next
+
+
+def filter_by_search(queryset, query, kind):
+    """``queryset`` narrowed to every object of ``kind`` matching ``query``.
+
+    The match runs as a subquery of ``queryset``'s own query, so however many
+    objects match, none are left out and no id list is sent back and forth.
+    """
+    return get_backend(queryset.db).filter_objects(queryset, query, kind)
@@ -0,0 +1,449 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+)
+from django.db.models import QuerySet
+from django.dispatch import receiver
+
+from .access import sync_project_access
+from .activity import activity_entries, record_activity
+from .changes import record_bulk_change, record_change, record_user_story_changes
+from .criteria import criteria_marked
+from .dashboard import invalidate_dashboard
+from .graph import invalidate_schedule
+from .models import (
+    AcceptanceCriteria,
+    ChangeLog,
+    Epic,
+    Issue,
+    IssueDependency,
+    Project,
+    ProjectMember,
+    SearchDocument,
+    Sprint,
+    Status,
+    UserStory,
+)
+from .navigation import invalidate_navigation
+from .planning import issues_moved, sync_sprint_issues
+from .rollups import (
+    record_epic_issues_linked,
+    record_issue_epics_removed,
+    record_issue_saved,
+    record_issue_story_removed,
+    record_user_stories_status,
+    record_user_story_removed,
+    record_user_story_saved,
+)
+from .search import (
+    delete_documents,
+    get_backend,
+    index_epic,
+    index_issues,
+    index_user_story,
+)
+from .snapshots import record_issue_change, record_issue_removal
+
+
+def _cascaded_from(origin, *models) -> bool:
+    """Whether a deletion started from an instance or queryset of ``models``."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in models
+
+
+def _project_user_ids(project_ids) -> list:
+    return list(
+        ProjectMember.objects.filter(project_id__in=project_ids)
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+
+
+def _navigation_user_ids(project_ids) -> list:
+    """Everyone whose sidebar lists one of ``project_ids``: leads and members."""
+    return [
+        *Project.objects.filter(pk__in=project_ids).values_list("lead_id", flat=True),
+        *_project_user_ids(project_ids),
+    ]
+
+
+def _user_story_project_ids(user_story) -> list:
+    project_ids = []
+    if user_story.epic_id:
+        project_ids += Epic.objects.filter(pk=user_story.epic_id).values_list(
+            "project_id", flat=True
+        )
+    if user_story.sprint_id:
+        project_ids += Sprint.objects.filter(pk=user_story.sprint_id).values_list(
+            "project_id", flat=True
+        )
+    return project_ids
+
+
+def _previous_lead_id(project):
+    """The lead ``project`` was loaded with, if ``save()`` replaced it."""
+    if "lead_id" in project.tracked_changes():
+        return project.get_loaded_value("lead_id")
+    return None
+
+
+# Navigation cache invalidation
+@receiver(post_save, sender=Project)
+def invalidate_project_navigation(sender, instance, **kwargs) -> None:
+    invalidate_navigation(
+        instance.lead_id,
+        _previous_lead_id(instance),
+        *_project_user_ids([instance.pk]),
+    )
+
+
+@receiver(pre_delete, sender=Project)
+def remember_project_users(sender, instance, **kwargs) -> None:
+    instance._navigation_user_ids = [
+        instance.lead_id,
+        *_project_user_ids([instance.pk]),
+    ]
+
+
+@receiver(post_delete, sender=Project)
+def invalidate_deleted_project_navigation(sender, instance, **kwargs) -> None:
+    invalidate_navigation(
+        *getattr(instance, "_navigation_user_ids", [instance.lead_id])
+    )
+
+
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def invalidate_member_navigation(sender, instance, origin=None, **kwargs) -> None:
+    if _cascaded_from(origin, Project):
+        # invalidate_deleted_project_navigation covers everyone
+        return
+    # The project's member count changes for all of its users
+    invalidate_navigation(
+        instance.user_id, *_navigation_user_ids([instance.project_id])
+    )
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def invalidate_membership_navigation(
+    sender, instance, action, reverse, pk_set, **kwargs
+) -> None:
+    # Forward, ``instance`` is a project and ``pk_set`` users; reverse, it's
+    # a user and ``pk_set`` projects.
+    if action == "pre_clear":
+        if reverse:
+            project_ids = instance.project_member.values_list("pk", flat=True)
+            instance._navigation_user_ids = _navigation_user_ids(list(project_ids))
+        else:
+            instance._navigation_user_ids = _navigation_user_ids([instance.pk])
+        return
+    if action == "post_clear":
+        invalidate_navigation(
+            instance.pk if reverse else None,
+            *getattr(instance, "_navigation_user_ids", []),
+        )
+    elif action in ("post_add", "post_remove"):
+        if reverse:
+            invalidate_navigation(instance.pk, *_navigation_user_ids(pk_set or ()))
+        else:
+            invalidate_navigation(*(pk_set or ()), *_navigation_user_ids([instance.pk]))
+
+
+# Project access index
+@receiver(post_save, sender=Project)
+def sync_lead_access(sender, instance, **kwargs) -> None:
+    sync_project_access(instance.pk, [instance.lead_id, _previous_lead_id(instance)])
+
+
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def sync_member_access(sender, instance, origin=None, **kwargs) -> None:
+    if _cascaded_from(origin, Project):
+        # The project cascade removes its access rows on its own
+        return
+    sync_project_access(instance.project_id, [instance.user_id])
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def sync_membership_access(sender, instance, action, reverse, pk_set, **kwargs) -> None:
+    if action == "pre_clear":
+        instance._access_pk_set = (
+            list(instance.project_member.values_list("pk", flat=True))
+            if reverse
+            else _project_user_ids([instance.pk])
+        )
+        return
+    if action == "post_clear":
+        pk_set = getattr(instance, "_access_pk_set", [])
+    elif action not in ("post_add", "post_remove"):
+        return
+    if reverse:
+        for project_id in pk_set:
+            sync_project_access(project_id, [instance.pk])
+    else:
+        sync_project_access(instance.pk, pk_set)
+
+
+# Sprint snapshots
+@receiver(post_save, sender=Issue)
+def snapshot_issue_change(sender, instance, created, raw=False, **kwargs) -> None:
+    if not raw:
+        record_issue_change(instance, created=created)
+
+
+@receiver(post_delete, sender=Issue)
+def snapshot_issue_removal(sender, instance, origin=None, **kwargs) -> None:
+    if _cascaded_from(origin, Project, Sprint):
+        # The sprint's snapshots go with it
+        return
+    record_issue_removal(instance)
+
+
+# Sprint membership
+@receiver(post_save, sender=Issue)
+def sync_issue_sprint(sender, instance, created, raw=False, **kwargs) -> None:
+    # Keeps Sprint.issues in line with Issue.sprint; move_issues does the same
+    # for many issues at once.
+    if raw:
+        return
+    if created:
+        if instance.sprint_id:
+            sync_sprint_issues([instance.pk], instance.sprint_id)
+    elif "sprint_id" in instance.tracked_changes():
+        sync_sprint_issues([instance.pk], instance.sprint_id)
+
+
+# Dashboard cache
+@receiver(post_save, sender=Issue)
+@receiver(post_delete, sender=Issue)
+@receiver(post_save, sender=Epic)
+@receiver(post_delete, sender=Epic)
+def invalidate_project_dashboard(sender, instance, **kwargs) -> None:
+    invalidate_dashboard(instance.project_id)
+
+
+@receiver(post_save, sender=UserStory)
+@receiver(post_delete, sender=UserStory)
+def invalidate_user_story_dashboard(sender, instance, **kwargs) -> None:
+    invalidate_dashboard(*_user_story_project_ids(instance))
+
+
+@receiver(criteria_marked)
+def invalidate_marked_criteria_dashboard(sender, completed, reopened, **kwargs) -> None:
+    if not completed and not reopened:
+        return
+    rows = UserStory.objects.filter(pk__in=[*completed, *reopened]).values_list(
+        "epic__project_id", "sprint__project_id"
+    )
+    invalidate_dashboard(*{project_id for row in rows for project_id in row})
+
+
+# Progress rollups
+@receiver(post_save, sender=Issue)
+def rollup_saved_issue(sender, instance, created, raw=False, **kwargs) -> None:
+    if not raw:
+        record_issue_saved(instance, created)
+
+
+@receiver(pre_delete, sender=Issue)
+def rollup_deleted_issue_epics(sender, instance, origin=None, **kwargs) -> None:
+    # Before the cascade removes the issue's epic links
+    if not _cascaded_from(origin, Project):
+        record_issue_epics_removed(instance)
+
+
+@receiver(post_delete, sender=Issue)
+def rollup_deleted_issue_story(sender, instance, origin=None, **kwargs) -> None:
+    if not _cascaded_from(origin, Project, UserStory):
+        record_issue_story_removed(instance)
+
+
+@receiver(m2m_changed, sender=Epic.issues.through)
+def rollup_epic_issue_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_remove", "pre_clear"):
+        # remove() reports the ids it was given, linked or not
+        if reverse:
+            links = sender.objects.filter(issue=instance)
+            column = "epic_id"
+        else:
+            links = sender.objects.filter(epic=instance)
+            column = "issue_id"
+        if action == "pre_remove":
+            links = links.filter(**{f"{column}__in": pk_set})
+        instance._rollup_unlinked = list(links.values_list(column, flat=True))
+        return
+    if action == "post_add":
+        sign = 1
+    elif action in ("post_remove", "post_clear"):
+        sign, pk_set = -1, getattr(instance, "_rollup_unlinked", [])
+    else:
+        return
+    if reverse:
+        record_epic_issues_linked(pk_set, [instance.pk], sign)
+    else:
+        record_epic_issues_linked([instance.pk], pk_set, sign)
+
+
+@receiver(post_save, sender=UserStory)
+def rollup_saved_user_story(sender, instance, created, raw=False, **kwargs) -> None:
+    if not raw:
+        record_user_story_saved(instance, created)
+
+
+@receiver(post_delete, sender=UserStory)
+def rollup_deleted_user_story(sender, instance, **kwargs) -> None:
+    record_user_story_removed(instance)
+
+
+@receiver(criteria_marked)
+def rollup_marked_criteria(sender, completed, reopened, **kwargs) -> None:
+    record_user_stories_status(completed, done=True)
+    record_user_stories_status(reopened, done=False)
+
+
+# Dependency schedule cache
+@receiver(post_save, sender=IssueDependency)
+@receiver(post_delete, sender=IssueDependency)
+def invalidate_dependency_schedule(sender, instance, **kwargs) -> None:
+    invalidate_schedule(instance.project_id)
+
+
+@receiver(post_save, sender=Issue)
+def invalidate_effort_schedule(sender, instance, created, **kwargs) -> None:
+    if not created and "effort_estimate" in instance.tracked_changes():
+        invalidate_schedule(instance.project_id)
+
+
+# Search index
+@receiver(post_migrate)
+def setup_search_backend(sender, using, **kwargs) -> None:
+    if sender.name == "apps.project":
+        get_backend(using).setup()
+
+
+@receiver(post_save, sender=Issue)
+def index_issue(sender, instance, raw=False, **kwargs) -> None:
+    if not raw:
+        index_issues([instance])
+
+
+@receiver(post_save, sender=Epic)
+def index_saved_epic(sender, instance, raw=False, **kwargs) -> None:
+    if not raw:
+        index_epic(instance)
+
+
+@receiver(post_save, sender=UserStory)
+def index_saved_user_story(sender, instance, raw=False, **kwargs) -> None:
+    if not raw:
+        index_user_story(instance.pk)
+
+
+@receiver(post_save, sender=AcceptanceCriteria)
+@receiver(post_delete, sender=AcceptanceCriteria)
+def index_criteria_user_story(sender, instance, raw=False, **kwargs) -> None:
+    if not raw:
+        index_user_story(instance.user_story_id)
+
+
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Epic)
+@receiver(post_delete, sender=UserStory)
+def remove_search_document(sender, instance, **kwargs) -> None:
+    kind = {
+        Issue: SearchDocument.Kinds.ISSUE,
+        Epic: SearchDocument.Kinds.EPIC,
+        UserStory: SearchDocument.Kinds.USER_STORY,
+    }[sender]
+    delete_documents(kind, [instance.pk])
+
+
+# Live change stream
+@receiver(post_save, sender=Issue)
+@receiver(post_save, sender=Epic)
+@receiver(post_save, sender=Sprint)
+@receiver(post_save, sender=UserStory)
+def log_saved_change(sender, instance, created, raw=False, **kwargs) -> None:
+    if raw:
+        return
+    action = ChangeLog.Actions.CREATED if created else ChangeLog.Actions.UPDATED
+    if sender is UserStory:
+        project_ids = _user_story_project_ids(instance)
+    else:
+        project_ids = [instance.project_id]
+    record_change(instance, action, project_ids)
+
+
+@receiver(issues_moved)
+def log_moved_issues(sender, project_id, issue_ids, **kwargs) -> None:
+    record_bulk_change(
+        Issue.objects.filter(pk__in=issue_ids), ChangeLog.Actions.UPDATED, [project_id]
+    )
+
+
+@receiver(criteria_marked)
+def log_marked_user_stories(sender, completed, reopened, **kwargs) -> None:
+    # mark_criteria completes and reopens user stories with update()
+    if completed or reopened:
+        record_user_story_changes([*completed, *reopened], ChangeLog.Actions.UPDATED)
+
+
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Epic)
+@receiver(post_delete, sender=Sprint)
+@receiver(post_delete, sender=UserStory)
+def log_deleted_change(sender, instance, origin=None, **kwargs) -> None:
+    if _cascaded_from(origin, Project):
+        # The project's change log goes with it
+        return
+    if sender is UserStory:
+        project_ids = _user_story_project_ids(instance)
+    else:
+        project_ids = [instance.project_id]
+    record_change(instance, ChangeLog.Actions.DELETED, project_ids)
+
+
+# Activity log
+@receiver(post_save, sender=Issue)
+@receiver(post_save, sender=Epic)
+@receiver(post_save, sender=Sprint)
+@receiver(post_save, sender=UserStory)
+def log_saved_activity(sender, instance, created, raw=False, **kwargs) -> None:
+    if not raw and not created:
+        record_activity(
+            activity_entries(sender, instance.pk, instance.tracked_changes())
+        )
+
+
+@receiver(issues_moved)
+def log_moved_activity(sender, sprint_id, previous, **kwargs) -> None:
+    record_activity(
+        [
+            entry
+            for issue_id, old_sprint_id in previous.items()
+            for entry in activity_entries(
+                Issue, issue_id, {"sprint_id": (old_sprint_id, sprint_id)}
+            )
+        ]
+    )
+
+
+@receiver(criteria_marked)
+def log_marked_activity(sender, completed, reopened, previous, **kwargs) -> None:
+    # mark_criteria completes and reopens user stories with update()
+    record_activity(
+        [
+            entry
+            for story_ids, status in (
+                (completed, Status.COMPLETED),
+                (reopened, Status.IN_PROGRESS),
+            )
+            for story_id in story_ids
+            for entry in activity_entries(
+                UserStory, story_id, {"status": (previous[story_id], status)}
+            )
+        ]
+    )
@@ -0,0 +1,244 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Issue, Sprint, SprintSnapshot, Status
+
+
+def _today():
+    return timezone.localdate()
+
+
+def ensure_snapshot_day(sprint_id, day=None) -> bool:
+    """Make sure ``day`` has a row per status, carrying the last day forward.
+
+    A sprint without any snapshot yet is backfilled instead, and ``day`` is
+    counted from the current issue rows; returns True then, since changes
+    already saved are in it.
+    """
+    day = day or _today()
+    if SprintSnapshot.objects.filter(sprint_id=sprint_id, date=day).exists():
+        return False
+    previous = dict.fromkeys(Status.values, (0, 0))
+    latest = (
+        SprintSnapshot.objects.filter(sprint_id=sprint_id, date__lt=day)
+        .order_by("-date")
+        .values_list("date", flat=True)
+        .first()
+    )
+    if latest is None and not (
+        SprintSnapshot.objects.filter(sprint_id=sprint_id).exists()
+    ):
+        # The sprint predates its snapshots
+        sprint = Sprint.objects.filter(pk=sprint_id).first()
+        if sprint is not None:
+            backfill_sprint(sprint)
+            # Also when ``day`` lies outside the sprint's dates
+            _write_day(
+                sprint_id, day, _status_totals(Issue.objects.filter(sprint=sprint))
+            )
+        return True
+    if latest is not None:
+        previous.update(
+            (status, (count, effort))
+            for status, count, effort in SprintSnapshot.objects.filter(
+                sprint_id=sprint_id, date=latest
+            ).values_list("status", "issue_count", "effort")
+        )
+    SprintSnapshot.objects.bulk_create(
+        [
+            SprintSnapshot(
+                sprint_id=sprint_id,
+                date=day,
+                status=status,
+                issue_count=count,
+                effort=effort,
+            )
+            for status, (count, effort) in previous.items()
+        ],
+        ignore_conflicts=True,
+    )
+    return False
+
+
+def _add_to_cell(sprint_id, day, status, count: int, effort: int) -> None:
+    SprintSnapshot.objects.filter(sprint_id=sprint_id, date=day, status=status).update(
+        issue_count=F("issue_count") + count, effort=F("effort") + effort
+    )
+
+
+def apply_issue_delta(sprint_id, status, count: int, effort: int, day=None) -> None:
+    """Add ``count`` issues and ``effort`` to one status of today's snapshot."""
+    if sprint_id is None or (not count and not effort):
+        return
+    day = day or _today()
+    if not ensure_snapshot_day(sprint_id, day):
+        _add_to_cell(sprint_id, day, status, count, effort)
+
+
+def record_issue_change(issue, created: bool = False) -> None:
+    """Move an issue's contribution between (sprint, status) cells."""
+    deltas = [(issue.sprint_id, issue.status, 1, issue.effort_estimate or 0)]
+    if not created:
+        if not issue.tracked_changes().keys() & {
+            "sprint_id",
+            "status",
+            "effort_estimate",
+        }:
+            return
+        effort = issue.get_loaded_value("effort_estimate") or 0
+        deltas.append(
+            (
+                issue.get_loaded_value("sprint_id"),
+                issue.get_loaded_value("status"),
+                -1,
+                -effort,
+            )
+        )
+    deltas = [delta for delta in deltas if delta[0] is not None]
+    day = _today()
+    # Ensured before any delta is added: a sprint backfilled here already
+    # counts the issue as saved, in both of its cells
+    backfilled = {
+        sprint_id: ensure_snapshot_day(sprint_id, day)
+        for sprint_id in dict.fromkeys(delta[0] for delta in deltas)
+    }
+    for sprint_id, status, count, effort in deltas:
+        if not backfilled[sprint_id]:
+            _add_to_cell(sprint_id, day, status, count, effort)
+
+
+def record_issue_removal(issue) -> None:
+    apply_issue_delta(issue.sprint_id, issue.status, -1, -(issue.effort_estimate or 0))
+
+
+def _status_totals(issues) -> dict:
+    return {
+        row["status"]: (row["total"], row["effort"])
+        for row in issues.order_by()
+        .values("status")
+        .annotate(total=Count("pk"), effort=Coalesce(Sum("effort_estimate"), 0))
+    }
+
+
+def rebuild_snapshot_day(sprint_id, day=None) -> None:
+    """Recompute one day of a sprint from the current issue rows."""
+    rebuild_snapshot_days([sprint_id], day)
+
+
+def rebuild_snapshot_days(sprint_ids, day=None) -> None:
+    """``rebuild_snapshot_day`` for many sprints, in one aggregate and one upsert."""
+    sprint_ids = list(dict.fromkeys(sprint_ids))
+    if not sprint_ids:
+        return
+    day = day or _today()
+    totals: dict = {sprint_id: {} for sprint_id in sprint_ids}
+    rows = (
+        Issue.objects.filter(sprint_id__in=sprint_ids)
+        .order_by()
+        .values_list("sprint_id", "status")
+        .annotate(total=Count("pk"), effort=Coalesce(Sum("effort_estimate"), 0))
+    )
+    for sprint_id, status, count, effort in rows:
+        totals[sprint_id][status] = (count, effort)
+    _write_days(day, totals)
+
+
+def _write_day(sprint_id, day, totals: dict) -> None:
+    _write_days(day, {sprint_id: totals})
+
+
+def _write_days(day, totals: dict) -> None:
+    """Upsert ``{sprint_id: {status: (count, effort)}}`` as the rows of ``day``."""
+    SprintSnapshot.objects.bulk_create(
+        [
+            SprintSnapshot(
+                sprint_id=sprint_id,
+                date=day,
+                status=status,
+                issue_count=cells.get(status, (0, 0))[0],
+                effort=cells.get(status, (0, 0))[1],
+            )
+            for sprint_id, cells in totals.items()
+            for status in Status.values
+        ],
+        update_conflicts=True,
+        unique_fields=["sprint", "date", "status"],
+        update_fields=["issue_count", "effort"],
+    )
+
+
+def backfill_sprint(sprint: Sprint) -> int:
+    """Write a snapshot for every day of ``sprint`` up to today.
+
+    Issues carry no status history, so past days count the issues that
+    existed on that day (``updated_at`` is set once, on creation) with
+    their current status. Today is exact.
+    """
+    today = _today()
+    start = timezone.localdate(sprint.start_date)
+    end = min(timezone.localdate(sprint.end_date), today)
+    issues = Issue.objects.filter(sprint=sprint)
+    tz = timezone.get_current_timezone()
+    days = 0
+    day = start
+    while day <= end:
+        if day == today:
+            totals = _status_totals(issues)
+        else:
+            end_of_day = datetime.combine(day + timedelta(days=1), time.min, tz)
+            totals = _status_totals(issues.filter(updated_at__lt=end_of_day))
+        _write_day(sprint.pk, day, totals)
+        days += 1
+        day += timedelta(days=1)
+    return days
+
+
+def sprint_burndown(sprint) -> list[dict]:
+    """Remaining issues and effort per day, read from the snapshot rows.
+
+    Rows are only written on days something changed, so every day without
+    one, up to today or the sprint's end, repeats the day before it.
+    """
+    not_done = ~Q(status=Status.COMPLETED)
+    rows = list(
+        SprintSnapshot.objects.filter(sprint=sprint)
+        .values("date")
+        .annotate(
+            remaining=Sum("issue_count", filter=not_done),
+            remaining_effort=Sum("effort", filter=not_done),
+            completed=Sum("issue_count", filter=~not_done),
+        )
+        .order_by("date")
+    )
+    if not rows:
+        return rows
+    last = max(rows[-1]["date"], min(timezone.localdate(sprint.end_date), _today()))
+    by_date = {row["date"]: row for row in rows}
+    days, day, previous = [], rows[0]["date"], None
+    while day <= last:
+        previous = by_date.get(day) or {**previous, "date": day}
+        days.append(previous)
+        day += timedelta(days=1)
+    return days
+
+
+def project_velocity(project) -> list[dict]:
+    """Completed issues and effort per sprint, from each sprint's last snapshot."""
+    latest: dict = {}
+    rows = (
+        SprintSnapshot.objects.filter(sprint__project=project, status=Status.COMPLETED)
+        .order_by("sprint_id", "date")
+        .values_list("sprint_id", "sprint__name", "date", "issue_count", "effort")
+    )
+    for sprint_id, name, day, count, effort in rows:
+        latest[sprint_id] = {
+            "sprint": sprint_id,
+            "name": name,
+            "date": day,
+            "completed": count,
+            "completed_effort": effort,
+        }
+    return list(latest.values())
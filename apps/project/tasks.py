@@ -0,0 +1,81 @@
+"""Background tasks, run by the ``run_jobs`` worker (see ``apps.project.jobs``)."""
+
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .importexport import IssueImporter, read_rows
+from .jobs import task
+from .models import Project, Sprint
+from .search import get_backend, rebuild_documents
+from .snapshots import backfill_sprint
+
+# Rejected rows kept in an import job's result
+IMPORT_ERRORS_KEPT = 100
+
+
+@task()
+def delete_project(project_id: int) -> dict:
+    project = Project.objects.filter(pk=project_id).first()
+    if project is None:
+        return {"deleted": 0}
+    deleted, _ = project.delete()
+    return {"deleted": deleted}
+
+
+@task(max_attempts=1)
+def import_issues(project_id: int, path: str, fmt: str, created_by_id=None) -> dict:
+    """Import the file at ``path`` in the default storage, then delete it.
+
+    Batches are committed as they go, so a failed import isn't repeated.
+    """
+    try:
+        project = Project.objects.get(pk=project_id)
+        created_by = (
+            get_user_model().objects.filter(pk=created_by_id).first()
+            if created_by_id
+            else None
+        )
+        with default_storage.open(path, "rb") as upload:
+            stream = io.TextIOWrapper(upload, encoding="utf-8", newline="")
+            result = IssueImporter(project, created_by=created_by).run(
+                read_rows(stream, fmt)
+            )
+    finally:
+        default_storage.delete(path)
+    return {
+        "created": result.created,
+        "rejected": len(result.errors),
+        "errors": [
+            [
+                line,
+                {
+                    key: [str(message) for message in messages]
+                    for key, messages in errors.items()
+                },
+            ]
+            for line, errors in result.errors[:IMPORT_ERRORS_KEPT]
+        ],
+    }
+
+
+@task()
+def backfill_sprint_snapshots(project_id=None, sprint_id=None) -> dict:
+    sprints = Sprint.objects.all()
+    if project_id:
+        sprints = sprints.filter(project_id=project_id)
+    if sprint_id:
+        sprints = sprints.filter(pk=sprint_id)
+    total = 0
+    for sprint in sprints.iterator():
+        with transaction.atomic():
+            total += backfill_sprint(sprint)
+    return {"days": total}
+
+
+@task()
+def rebuild_search_index(batch_size: int = 1000) -> dict:
+    get_backend().setup()
+    return {"documents": rebuild_documents(batch_size=batch_size)}
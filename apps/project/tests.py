@@ -1,3 +1,2132 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.core.management import CommandError, call_command
+from django.template.base import Template as BaseTemplate
+from django.template.loader import render_to_string
+from django.http import HttpResponse
+from django.db import OperationalError, connection, transaction
+from django.test import (
+    AsyncRequestFactory,
+    LiveServerTestCase,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import localdate, now as timezone_now
+
+from config.database import database_settings
+
+from .activity import activity_actor, activity_timeline
+from .admin_performance import EstimatedCountPaginator
+from .attachments import blob_metadata, blob_name, parse_range, prune_blobs
+from .changes import _settled, coalesce
+from .criteria import criteria_marked, mark_criteria
+from .dashboard import project_dashboard
+from .forms import IssueForm
+from .importexport import IssueImporter, read_rows
+from .graph import (
+    DependencyCycleError,
+    DependencyGraph,
+    add_dependency,
+    project_schedule,
+)
+from .jobs import TASKS, claim_jobs, enqueue, requeue_stale_jobs, task
+from .navigation import get_navigation
+from .pagination import decode_cursor, encode_cursor, paginate_keyset
+from .planning import move_issues
+from .routers import PrimaryPinningMiddleware, ReplicaRouter, use_replica
+from .middleware import (
+    QueryBudgetExceeded,
+    QueryInstrumentationMiddleware,
+    query_budget,
+    request_stats,
+)
+from .models import (
+    AccessRoles,
+    AcceptanceCriteria,
+    ActivityLog,
+    Attachment,
+    AttachmentUpload,
+    Blob,
+    ChangeLog,
+    Epic,
+    Issue,
+    IssueBugDetail,
+    IssueDependency,
+    IssueFeatureDetail,
+    IssueImprovementDetail,
+    IssueTaskDetail,
+    Job,
+    Project,
+    ProjectAccess,
+    ProjectMember,
+    Roles,
+    SearchDocument,
+    Sprint,
+    SprintSnapshot,
+    Status,
+    UserStory,
+)
+from .search import index_issues, search_documents
+from .snapshots import (
+    apply_issue_delta,
+    backfill_sprint,
+    project_velocity,
+    rebuild_snapshot_day,
+    sprint_burndown,
+)
+from .transactions import call_with_retry
+
+User = get_user_model()
+
+
+def create_project(name, lead=None, **fields) -> Project:
+    now = datetime.now(timezone.utc)
+    defaults = {
+        "methodology": "SC",
+        "category": "IT",
+        "start_date": now,
+        "end_date": now,
+    }
+    return Project.objects.create(name=name, lead=lead, **{**defaults, **fields})
+
+
+class IndexUsageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password")
+        cls.project = create_project("Indexed", lead=cls.user)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_board_query_uses_project_status_index(self):
+        queryset = Issue.objects.filter(project=self.project, status=Status.TO_DO)
+        self.assertUsesIndex(queryset, "issue_project_status_idx")
+
+    def test_my_issues_query_uses_assignee_status_index(self):
+        queryset = Issue.objects.filter(assignee=self.user, status=Status.IN_PROGRESS)
+        self.assertUsesIndex(queryset, "issue_assignee_status_idx")
+
+    def test_backlog_query_uses_project_sprint_index(self):
+        queryset = Issue.objects.filter(project=self.project, sprint__isnull=True)
+        self.assertUsesIndex(queryset, "issue_project_sprint_idx")
+
+    def test_active_sprints_use_partial_index(self):
+        queryset = Sprint.objects.filter(project=self.project, is_active=True).order_by(
+            "-created_at"
+        )
+        self.assertUsesIndex(queryset, "sprint_active_project_idx")
+
+    def test_active_epics_use_partial_index(self):
+        queryset = Epic.objects.filter(project=self.project, is_active=True)
+        self.assertUsesIndex(queryset, "epic_active_project_idx")
+
+    def test_declared_indexes_exist(self):
+        call_command("audit_indexes", "--check", stdout=StringIO())
+
+
+class NavigationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lead, cls.a, cls.b, cls.c = [
+            User.objects.create_user(name, password="password")
+            for name in ("lead", "a", "b", "c")
+        ]
+        cls.project = create_project("Navigable", lead=cls.lead)
+        ProjectMember.objects.create(project=cls.project, user=cls.a)
+
+    def setUp(self):
+        cache.clear()
+
+    def member_counts(self, *users):
+        return [
+            [project["member_count"] for project in get_navigation(user)["projects"]]
+            for user in users
+        ]
+
+    def test_navigation_is_cached_per_user(self):
+        self.assertEqual(self.member_counts(self.lead, self.a), [[1], [1]])
+        with self.assertNumQueries(0):
+            get_navigation(self.lead)
+
+    def test_membership_changes_reach_every_project_user(self):
+        self.assertEqual(self.member_counts(self.lead, self.a), [[1], [1]])
+        ProjectMember.objects.create(project=self.project, user=self.b)
+        self.assertEqual(self.member_counts(self.lead, self.a, self.b), [[2]] * 3)
+        self.project.members.add(self.c)
+        self.assertEqual(
+            self.member_counts(self.lead, self.a, self.b, self.c), [[3]] * 4
+        )
+        self.project.members.remove(self.b)
+        self.assertEqual(
+            self.member_counts(self.lead, self.a, self.b, self.c),
+            [[2], [2], [], [2]],
+        )
+        self.b.project_member.add(self.project)
+        self.assertEqual(self.member_counts(self.lead, self.a), [[3], [3]])
+        self.c.project_member.clear()
+        self.assertEqual(self.member_counts(self.lead, self.c), [[2], []])
+        ProjectMember.objects.filter(user=self.a).delete()
+        self.assertEqual(self.member_counts(self.lead, self.a), [[1], []])
+        self.project.members.clear()
+        self.assertEqual(self.member_counts(self.lead), [[0]])
+
+    def test_project_changes_reach_every_project_user(self):
+        self.assertEqual(self.member_counts(self.a), [[1]])
+        self.project.name = "Renamed"
+        self.project.save()
+        self.assertEqual(get_navigation(self.a)["projects"][0]["name"], "Renamed")
+        self.project.delete()
+        self.assertEqual(self.member_counts(self.lead, self.a), [[], []])
+
+    def test_lead_changes_reach_the_previous_lead(self):
+        self.assertEqual(self.member_counts(self.lead, self.b), [[1], []])
+        project = Project.objects.get(pk=self.project.pk)
+        project.lead = self.b
+        with CaptureQueriesContext(connection) as queries:
+            project.save()
+        # The previous lead is tracked, not read again before saving
+        self.assertTrue(queries[0]["sql"].startswith("UPDATE"))
+        self.assertEqual(self.member_counts(self.lead, self.b), [[], [1]])
+
+
+class ProjectAccessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lead, cls.member, cls.guest, cls.outsider = [
+            User.objects.create_user(name, password="password")
+            for name in ("lead", "member", "guest", "outsider")
+        ]
+        cls.project = create_project("Guarded", lead=cls.lead)
+        ProjectMember.objects.create(
+            project=cls.project, user=cls.member, role=Roles.MEMBER
+        )
+        ProjectMember.objects.create(
+            project=cls.project, user=cls.guest, role=Roles.GUEST
+        )
+
+    def roles(self) -> dict:
+        return dict(
+            ProjectAccess.objects.filter(project=self.project).values_list(
+                "user__username", "effective_role"
+            )
+        )
+
+    def test_access_follows_lead_and_memberships(self):
+        self.assertEqual(
+            self.roles(), {"lead": "lead", "member": "member", "guest": "guest"}
+        )
+        # The highest of several roles wins
+        ProjectMember.objects.create(
+            project=self.project, user=self.member, role=Roles.REVIEWER
+        )
+        self.assertEqual(self.roles()["member"], AccessRoles.REVIEWER)
+        ProjectMember.objects.filter(user=self.guest).delete()
+        self.assertNotIn("guest", self.roles())
+        self.project.lead = self.outsider
+        self.project.save()
+        self.assertEqual(self.roles(), {"outsider": "lead", "member": "reviewer"})
+
+    def test_rebuild_restores_the_synced_rows(self):
+        expected = self.roles()
+        ProjectAccess.objects.all().delete()
+        call_command("rebuild_project_access", stdout=StringIO())
+        self.assertEqual(self.roles(), expected)
+
+    def test_access_required_views_hide_projects(self):
+        detail = reverse("project_detail", args=[self.project.pk])
+        self.assertEqual(self.client.get(detail).status_code, 404)
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(detail).status_code, 404)
+        self.client.force_login(self.guest)
+        self.assertEqual(self.client.get(detail).status_code, 200)
+        # Guests can look but not plan
+        plan = reverse("sprint_plan", args=[self.project.pk])
+        self.assertEqual(self.client.post(plan).status_code, 404)
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.post(plan).json()["moved"], 0)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password")
+        cls.project = create_project("Paged", lead=cls.user)
+        Issue.objects.bulk_create(
+            Issue(project=cls.project, title=f"Issue {n}") for n in range(25)
+        )
+        # Ties on created_at are broken by the primary key
+        Issue.objects.update(created_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+    def test_cursor_round_trip(self):
+        position = datetime(2024, 5, 6, 7, 8, 9, 123456, tzinfo=timezone.utc)
+        cursor = encode_cursor(position, 42)
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor), (position, 42))
+
+    def test_tampered_cursors_are_ignored(self):
+        valid = encode_cursor(datetime(2024, 1, 1, tzinfo=timezone.utc), 1)
+        for cursor in (
+            valid[:-3] + "!!!",
+            "bm90IGEgY3Vyc29y",  # "not a cursor"
+            "MjAyNC0wMS0wMXxvbmU",  # "2024-01-01|one"
+            "bm90LWEtZGF0ZXwx",  # "not-a-date|1"
+            "_-8",  # not UTF-8
+            "",
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+        first = paginate_keyset(Issue.objects.all(), page_size=10)
+        tampered = paginate_keyset(Issue.objects.all(), "garbage", page_size=10)
+        self.assertEqual(list(tampered), list(first))
+
+    def test_pages_cover_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            page = paginate_keyset(Issue.objects.all(), cursor, page_size=10)
+            seen += [issue.pk for issue in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        expected = list(
+            Issue.objects.order_by("-created_at", "-pk").values_list("pk", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_request_parameters(self):
+        self.client.force_login(self.user)
+        url = reverse("project_issues_list", args=[self.project.pk])
+        response = self.client.get(f"{url}?page_size=abc&status=TO_DO")
+        page = response.context["page"]
+        self.assertEqual(len(page), 25)
+        self.assertFalse(page.has_next)
+        response = self.client.get(f"{url}?page_size=20&status=TO_DO")
+        page = response.context["page"]
+        self.assertEqual(len(page), 20)
+        self.assertIn("status=TO_DO", page.next_query)
+        response = self.client.get(f"{url}?{page.next_query}")
+        self.assertEqual(len(response.context["page"]), 5)
+
+
+class IssueDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password")
+        cls.project = create_project("Detailed", lead=cls.user)
+
+    def test_detail_fields_are_stored_in_their_own_tables(self):
+        issue = Issue.objects.create(
+            project=self.project,
+            title="Crash",
+            _type=Issue.IssueType.BUG,
+            steps_to_reproduce="Click twice",
+        )
+        self.assertEqual(
+            IssueBugDetail.objects.get(issue=issue).steps_to_reproduce, "Click twice"
+        )
+        # Nothing to store, no row
+        self.assertFalse(IssueTaskDetail.objects.filter(issue=issue).exists())
+        issue = Issue.objects.get(pk=issue.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(issue.steps_to_reproduce, "Click twice")
+            self.assertIsNone(issue.environment)
+        self.assertIsNone(issue.completion_criteria)
+        issue.environment = "Firefox"
+        issue.completion_criteria = "Fixed"
+        issue.save()
+        detail = IssueBugDetail.objects.get(issue=issue)
+        self.assertEqual(
+            (detail.steps_to_reproduce, detail.environment), ("Click twice", "Firefox")
+        )
+        self.assertEqual(
+            IssueTaskDetail.objects.get(issue=issue).completion_criteria, "Fixed"
+        )
+        issue.delete()
+        self.assertFalse(IssueBugDetail.objects.exists())
+
+    def test_form_round_trip(self):
+        self.assertIn("steps_to_reproduce", IssueForm.base_fields)
+        data = {
+            "project": self.project.pk,
+            "title": "Slow page",
+            "_type": Issue.IssueType.IMPROVEMENT,
+            "status": Status.TO_DO,
+            "priority": "medium",
+            "assignee": self.user.pk,
+            "created_by": self.user.pk,
+            "performance_impact": "Halves load time",
+        }
+        form = IssueForm(data)
+        self.assertTrue(form.is_valid(), form.errors)
+        issue = form.save()
+        self.assertEqual(
+            IssueImprovementDetail.objects.get(issue=issue).performance_impact,
+            "Halves load time",
+        )
+        form = IssueForm(instance=Issue.objects.get(pk=issue.pk))
+        self.assertEqual(form.initial["performance_impact"], "Halves load time")
+        form = IssueForm(
+            {**data, "performance_impact": "", "user_feedback": "Finally"},
+            instance=issue,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        detail = IssueImprovementDetail.objects.get(issue=issue)
+        self.assertEqual(
+            (detail.performance_impact, detail.user_feedback), ("", "Finally")
+        )
+
+    def test_split_command_copies_legacy_columns(self):
+        issues = Issue.objects.bulk_create(
+            Issue(project=self.project, title=f"Legacy {n}") for n in range(3)
+        )
+        table = Issue._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN requirements text")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN environment text")
+            cursor.execute(
+                f"UPDATE {table} SET requirements = %s WHERE id <> %s",
+                ["Must export", issues[0].pk],
+            )
+            cursor.execute(
+                f"UPDATE {table} SET environment = %s WHERE id = %s",
+                ["Linux", issues[0].pk],
+            )
+        out = StringIO()
+        call_command("split_issue_details", "--batch-size", "2", stdout=out)
+        self.assertIn("Copied 3 issue detail rows.", out.getvalue())
+        self.assertEqual(
+            set(IssueFeatureDetail.objects.values_list("issue_id", "requirements")),
+            {(issue.pk, "Must export") for issue in issues[1:]},
+        )
+        self.assertEqual(IssueBugDetail.objects.get().environment, "Linux")
+        # Running it again doesn't duplicate or overwrite anything
+        call_command("split_issue_details", stdout=StringIO())
+        self.assertEqual(IssueFeatureDetail.objects.count(), 2)
+
+    def test_split_command_without_legacy_columns(self):
+        out = StringIO()
+        call_command("split_issue_details", stdout=out)
+        self.assertIn("nothing to copy", out.getvalue())
+
+
+class ImportExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password")
+        cls.project = create_project("Exported", lead=cls.user)
+        now = datetime.now(timezone.utc)
+        cls.sprint = Sprint.objects.create(
+            project=cls.project, name="Sprint 1", start_date=now, end_date=now
+        )
+        cls.epic = Epic.objects.create(project=cls.project, title="Billing")
+
+    def import_jsonl(self, *lines, batch_size=500):
+        stream = StringIO("\n".join(lines) + "\n")
+        return IssueImporter(self.project, batch_size=batch_size).run(
+            read_rows(stream, "jsonl")
+        )
+
+    def test_rejected_rows_are_reported_per_line(self):
+        result = self.import_jsonl(
+            '{"title": "Imported", "assignee": "lead", "epics": "Billing"}',
+            '{"title": "Truncated"',
+            '["not", "an", "object"]',
+            "",
+            '{"title": "Wrong", "status": "LOST", "sprint": "Sprint 9"}',
+            '{"title": "Also imported", "type": "BUG", "environment": "Linux"}',
+            batch_size=2,
+        )
+        self.assertEqual(result.created, 2)
+        errors = dict(result.errors)
+        self.assertEqual(sorted(errors), [2, 3, 4])
+        self.assertIn("Invalid JSON", errors[2][NON_FIELD_ERRORS][0])
+        self.assertEqual(
+            errors[3], {NON_FIELD_ERRORS: ["Expected an object of fields."]}
+        )
+        self.assertEqual(sorted(errors[4]), ["sprint", "status"])
+        issue = Issue.objects.get(title="Imported")
+        self.assertEqual(issue.assignee, self.user)
+        self.assertEqual(list(issue.epics.all()), [self.epic])
+        self.assertEqual(Issue.objects.get(title="Also imported").environment, "Linux")
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as upload:
+            upload.write("title,type,sprint\nFrom CSV,FEATURE,Sprint 1\n,TASK,\n")
+        self.addCleanup(os.remove, upload.name)
+        out, err = StringIO(), StringIO()
+        call_command(
+            "import_issues", self.project.pk, upload.name, stdout=out, stderr=err
+        )
+        self.assertIn("Imported 1 issues, 1 rows rejected.", out.getvalue())
+        self.assertIn("Row 2", err.getvalue())
+        self.assertEqual(Issue.objects.get(title="From CSV").sprint, self.sprint)
+
+    def test_imported_issues_join_their_sprint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_jsonl(
+                '{"title": "Planned", "sprint": "Sprint 1", "effort_estimate": 3}',
+                '{"title": "Done", "sprint": "Sprint 1", "status": "COMPLETED"}',
+                '{"title": "Backlog"}',
+            )
+        planned = Issue.objects.get(title="Planned")
+        self.assertQuerySetEqual(
+            self.sprint.issues.order_by("title").values_list("title", flat=True),
+            ["Done", "Planned"],
+        )
+        [today] = sprint_burndown(self.sprint)
+        self.assertEqual(today["remaining"], 1)
+        self.assertEqual(today["remaining_effort"], 3)
+        self.assertEqual(today["completed"], 1)
+        self.assertTrue(
+            ChangeLog.objects.filter(
+                project=self.project,
+                object_id=planned.pk,
+                action=ChangeLog.Actions.CREATED,
+            ).exists()
+        )
+
+    def test_export_round_trip(self):
+        issue = Issue.objects.create(
+            project=self.project,
+            title="Exported",
+            _type=Issue.IssueType.BUG,
+            sprint=self.sprint,
+            assignee=self.user,
+            steps_to_reproduce="Open the page",
+        )
+        issue.epics.add(self.epic)
+        self.client.force_login(self.user)
+        url = reverse("project_issues_export", args=[self.project.pk])
+        for fmt in ("csv", "jsonl"):
+            with self.subTest(fmt=fmt):
+                response = self.client.get(f"{url}?format={fmt}")
+                self.assertTrue(response.streaming)
+                content = b"".join(response.streaming_content).decode()
+                rows = list(read_rows(StringIO(content, newline=""), fmt))
+                self.assertEqual(len(rows), 1)
+                self.assertEqual(rows[0]["epics"], "Billing")
+                self.assertEqual(rows[0]["steps_to_reproduce"], "Open the page")
+                result = IssueImporter(self.project).run(rows)
+                self.assertEqual((result.created, result.errors), (1, []))
+                copy = Issue.objects.exclude(pk=issue.pk).get()
+                self.assertEqual(
+                    (copy.sprint, copy.assignee, copy.steps_to_reproduce),
+                    (self.sprint, self.user, "Open the page"),
+                )
+                self.assertEqual(list(copy.epics.all()), [self.epic])
+                copy.delete()
+
+
+class SprintSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password")
+        cls.project = create_project("Charted", lead=cls.user)
+        now = timezone_now()
+        cls.sprint, cls.other = [
+            Sprint.objects.create(
+                project=cls.project,
+                name=name,
+                start_date=now - timedelta(days=3),
+                end_date=now + timedelta(days=1),
+            )
+            for name in ("Sprint 1", "Sprint 2")
+        ]
+
+    def cells(self, sprint, day=None) -> dict:
+        return {
+            status: (count, effort)
+            for status, count, effort in SprintSnapshot.objects.filter(
+                sprint=sprint, date=day or localdate()
+            ).values_list("status", "issue_count", "effort")
+            if count or effort
+        }
+
+    def test_issue_changes_move_counts_between_cells(self):
+        issue = Issue.objects.create(
+            project=self.project, title="Charted", sprint=self.sprint, effort_estimate=3
+        )
+        self.assertEqual(self.cells(self.sprint), {Status.TO_DO: (1, 3)})
+        issue.status = Status.COMPLETED
+        issue.effort_estimate = 5
+        issue.save()
+        self.assertEqual(self.cells(self.sprint), {Status.COMPLETED: (1, 5)})
+        issue.title = "Untracked change"
+        with CaptureQueriesContext(connection) as queries:
+            issue.save(update_fields=["title"])
+        self.assertFalse(
+            [query for query in queries if "sprintsnapshot" in query["sql"]]
+        )
+        issue.sprint = self.other
+        issue.save()
+        self.assertEqual(self.cells(self.sprint), {})
+        self.assertEqual(self.cells(self.other), {Status.COMPLETED: (1, 5)})
+        Issue.objects.create(project=self.project, title="Second", sprint=self.other)
+        expected = self.cells(self.other)
+        rebuild_snapshot_day(self.other.pk)
+        self.assertEqual(self.cells(self.other), expected)
+        issue.delete()
+        self.assertEqual(self.cells(self.other), {Status.TO_DO: (1, 0)})
+
+    def test_new_days_carry_the_last_one_forward(self):
+        today = localdate()
+        SprintSnapshot.objects.create(
+            sprint=self.sprint,
+            date=today - timedelta(days=2),
+            status=Status.IN_PROGRESS,
+            issue_count=2,
+            effort=8,
+        )
+        apply_issue_delta(self.sprint.pk, Status.IN_PROGRESS, -1, -3)
+        self.assertEqual(self.cells(self.sprint), {Status.IN_PROGRESS: (1, 5)})
+        # Nothing changed yesterday, so it has no rows but still charts
+        self.assertEqual(self.cells(self.sprint, today - timedelta(days=1)), {})
+        burndown = sprint_burndown(self.sprint)
+        self.assertEqual(
+            [(day["date"], day["remaining"]) for day in burndown],
+            [
+                (today - timedelta(days=2), 2),
+                (today - timedelta(days=1), 2),
+                (today, 1),
+            ],
+        )
+
+    def test_first_change_backfills_a_sprint_without_snapshots(self):
+        # As for a sprint that predates the snapshots
+        issue = Issue.objects.create(
+            project=self.project, title="Old", sprint=self.sprint, effort_estimate=2
+        )
+        Issue.objects.filter(pk=issue.pk).update(
+            updated_at=timezone_now() - timedelta(days=2)
+        )
+        SprintSnapshot.objects.all().delete()
+        issue = Issue.objects.get(pk=issue.pk)
+        issue.status = Status.COMPLETED
+        issue.save()
+        self.assertEqual(self.cells(self.sprint), {Status.COMPLETED: (1, 2)})
+        today = localdate()
+        self.assertEqual(
+            [(day["date"], day["completed"]) for day in sprint_burndown(self.sprint)],
+            [
+                (today - timedelta(days=days), 0 if days == 3 else 1)
+                for days in (3, 2, 1, 0)
+            ],
+        )
+
+    def test_backfill(self):
+        now = timezone_now()
+        old, new = [
+            Issue.objects.create(
+                project=self.project, title=title, sprint=self.sprint, effort_estimate=2
+            )
+            for title in ("Old", "New")
+        ]
+        Issue.objects.filter(pk=old.pk).update(
+            updated_at=now - timedelta(days=2), status=Status.COMPLETED
+        )
+        SprintSnapshot.objects.all().delete()
+        out = StringIO()
+        call_command(
+            "backfill_sprint_snapshots", "--sprint", self.sprint.pk, stdout=out
+        )
+        self.assertIn("Wrote 4 snapshot days.", out.getvalue())
+        today = localdate()
+        self.assertEqual(self.cells(self.sprint, today - timedelta(days=3)), {})
+        self.assertEqual(
+            self.cells(self.sprint, today - timedelta(days=2)),
+            {Status.COMPLETED: (1, 2)},
+        )
+        self.assertEqual(
+            self.cells(self.sprint),
+            {Status.COMPLETED: (1, 2), Status.TO_DO: (1, 2)},
+        )
+        # Backfilling again rewrites the same rows
+        self.assertEqual(backfill_sprint(self.sprint), 4)
+        self.assertEqual(SprintSnapshot.objects.count(), 4 * len(Status.values))
+        self.assertEqual(
+            project_velocity(self.project),
+            [
+                {
+                    "sprint": self.sprint.pk,
+                    "name": "Sprint 1",
+                    "date": today,
+                    "completed": 1,
+                    "completed_effort": 2,
+                }
+            ],
+        )
+
+
+class ProjectDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password")
+        cls.project = create_project("Dashboard", lead=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def create_issues(self, count):
+        Issue.objects.bulk_create(
+            Issue(
+                project=self.project,
+                title=f"Issue {i}",
+                status=Status.values[i % len(Status.values)],
+            )
+            for i in range(count)
+        )
+        Epic.objects.bulk_create(
+            Epic(project=self.project, title=f"Epic {i}") for i in range(count // 10)
+        )
+
+    def test_counts_per_status(self):
+        self.create_issues(10)
+        dashboard = project_dashboard(self.project)
+        self.assertEqual(dashboard["issues"]["total"], 10)
+        self.assertEqual(
+            [row["count"] for row in dashboard["issues"]["status"]], [2, 2, 2, 2, 2]
+        )
+        self.assertEqual(dashboard["epics"]["total"], 1)
+
+    def test_detail_query_count_is_independent_of_data_size(self):
+        url = reverse("project_detail", args=[self.project.pk])
+        for count in (5, 500):
+            self.create_issues(count)
+            cache.clear()
+            # session, user, access, 3 dashboard aggregates, 2 navigation
+            with self.assertNumQueries(8):
+                self.client.get(url)
+            # warm cache: session, user, access
+            with self.assertNumQueries(3):
+                self.client.get(url)
+
+    def test_issue_write_invalidates_dashboard(self):
+        self.assertEqual(project_dashboard(self.project)["issues"]["total"], 0)
+        Issue.objects.create(project=self.project, title="New")
+        self.assertEqual(project_dashboard(self.project)["issues"]["total"], 1)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password")
+        cls.outsider = User.objects.create_user("outsider", password="password")
+        cls.project = create_project("Searchable", lead=cls.user)
+
+    def titles(self, query, user=None, **kwargs):
+        documents, _ = search_documents(query, user=user or self.user, **kwargs)
+        return [document.title for document in documents]
+
+    def test_title_matches_rank_above_body_matches(self):
+        Issue.objects.create(
+            project=self.project, title="Checkout", description="login is slow"
+        )
+        Issue.objects.create(project=self.project, title="Login timeout")
+        self.assertEqual(self.titles("login"), ["Login timeout", "Checkout"])
+
+    def test_index_follows_writes(self):
+        issue = Issue.objects.create(project=self.project, title="Crash on save")
+        issue.resolution = "Fixed the serializer"
+        issue.save()
+        self.assertEqual(self.titles("serializer"), ["Crash on save"])
+        issue.delete()
+        self.assertEqual(self.titles("serializer"), [])
+
+    def test_acceptance_criteria_text_is_indexed(self):
+        epic = Epic.objects.create(project=self.project, title="Payments")
+        story = UserStory.objects.create(title="Refunds", epic=epic)
+        AcceptanceCriteria.objects.create(
+            user_story=story,
+            description="Partial refund",
+            given="a settled invoice",
+            when="support refunds it",
+            then="the ledger balances",
+        )
+        self.assertEqual(self.titles("ledger", kind="user_story"), ["Refunds"])
+
+    def test_results_are_limited_to_accessible_projects(self):
+        Issue.objects.create(project=self.project, title="Private roadmap")
+        self.assertEqual(self.titles("roadmap", user=self.outsider), [])
+
+    def test_query_syntax_is_escaped(self):
+        Issue.objects.create(project=self.project, title="Quote handling")
+        self.assertEqual(self.titles('quote" OR NEAR(*'), [])
+        self.assertEqual(self.titles("quo"), ["Quote handling"])
+
+    def test_rebuild_command(self):
+        Issue.objects.create(project=self.project, title="Rebuilt")
+        SearchDocument.objects.all().delete()
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.titles("rebuilt"), ["Rebuilt"])
+
+    def test_admin_search_lists_every_match(self):
+        issues = Issue.objects.bulk_create(
+            Issue(project=self.project, title=f"Bulk issue {n}") for n in range(1200)
+        )
+        index_issues(issues)
+        Issue.objects.create(project=self.project, title="Unrelated")
+        Epic.objects.create(project=self.project, title="Bulk epic")
+        admin = User.objects.create_superuser("admin", password="password")
+        self.client.force_login(admin)
+        url = reverse("admin:project_issue_changelist")
+        response = self.client.get(url, {"q": "bulk"})
+        self.assertEqual(response.context["cl"].result_count, 1200)
+        self.assertContains(response, "Every match is listed")
+        response = self.client.get(url, {"q": "!!"})
+        self.assertEqual(response.context["cl"].result_count, 0)
+
+    def test_search_view(self):
+        Issue.objects.create(project=self.project, title="Sidebar result")
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("project_search"), {"search": "sidebar"})
+        self.assertContains(response, "Sidebar result")
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class QueryInstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password", is_staff=True)
+        cls.project = create_project("Instrumented", lead=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        request_stats.reset()
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(
+            reverse("project_issues_list", args=[self.project.pk])
+        )
+        timing = response["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        render_ms = float(timing.split("render;dur=")[1].split(",")[0])
+        self.assertGreater(render_ms, 0)
+        # Timed by the template backend, not by patching Template for
+        # every render in the process
+        self.assertFalse(hasattr(BaseTemplate.render, "__wrapped__"))
+
+    def test_list_views_stay_within_budget(self):
+        Epic.objects.bulk_create(
+            Epic(project=self.project, title=f"Epic {i}") for i in range(30)
+        )
+        for name in (
+            "project_detail",
+            "project_epics_list",
+            "project_issues_list",
+            "project_user_stories_list",
+            "project_sprints_list",
+        ):
+            self.client.get(reverse(name, args=[self.project.pk]))
+
+    def test_repeated_queries_exceed_budget(self):
+        @query_budget(max_queries=10)
+        def view(request):
+            for project in Project.objects.all():
+                list(Issue.objects.filter(project=project))
+            return HttpResponse()
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        for i in range(3):
+            create_project(f"Other {i}")
+        middleware = QueryInstrumentationMiddleware(get_response)
+        request = RequestFactory().get("/")
+        request.user = self.user
+        with self.assertRaisesMessage(QueryBudgetExceeded, "repeated queries"):
+            middleware(request)
+
+    async def test_concurrent_async_requests_count_their_own_queries(self):
+        async def get_response(request):
+            view = f"view{request.GET['queries']}"
+            request._query_view = (view, None)
+            for _ in range(int(request.GET["queries"])):
+                await Project.objects.acount()
+                # Let the other request run a query in between
+                await asyncio.sleep(0.01)
+            return HttpResponse()
+
+        middleware = QueryInstrumentationMiddleware(get_response)
+        factory = AsyncRequestFactory()
+        await asyncio.gather(
+            middleware(factory.get("/", {"queries": 2})),
+            middleware(factory.get("/", {"queries": 5})),
+        )
+        stats = request_stats.snapshot()
+        self.assertEqual(stats["view2"]["queries"], 2)
+        self.assertEqual(stats["view5"]["queries"], 5)
+
+    def test_stats_endpoint(self):
+        self.client.get(reverse("project_list"))
+        response = self.client.get(reverse("request_stats_data"))
+        stats = response.json()["views"]["apps.project.views.project_list"]
+        self.assertEqual(stats["requests"], 1)
+
+
+class BenchmarkTests(TestCase):
+    def test_generated_data_is_deterministic(self):
+        call_command(
+            "generate_data", "--scale", "tiny", "--seed", "1", stdout=StringIO()
+        )
+        first = list(Issue.objects.order_by("pk").values_list("title", "status"))
+        Project.objects.all().delete()
+        User.objects.all().delete()
+        call_command(
+            "generate_data", "--scale", "tiny", "--seed", "1", stdout=StringIO()
+        )
+        second = list(Issue.objects.order_by("pk").values_list("title", "status"))
+        self.assertEqual(len(first), 200)
+        self.assertEqual(first, second)
+
+    def test_benchmarks_run(self):
+        call_command("generate_data", "--scale", "tiny", stdout=StringIO())
+        out = StringIO()
+        call_command("run_benchmarks", "--repeat", "1", "--warmup", "0", stdout=out)
+        self.assertIn("admin_issue_changelist", out.getvalue())
+        self.assertIn("sidebar_uncached", out.getvalue())
+
+
+class LoadTestTests(LiveServerTestCase):
+    def test_load_test_runs_against_a_server(self):
+        call_command("generate_data", "--scale", "tiny", stdout=StringIO())
+        out = StringIO()
+        call_command(
+            "load_test",
+            self.live_server_url,
+            "--concurrency",
+            "2",
+            "--requests",
+            "4",
+            stdout=out,
+        )
+        self.assertIn("project_epics_list", out.getvalue())
+        self.assertEqual(out.getvalue().count(" 0 errors"), 8)
+
+    def test_unreachable_pages_stop_the_run(self):
+        call_command("generate_data", "--scale", "tiny", stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "did not answer"):
+            call_command(
+                "load_test", f"{self.live_server_url}/missing", stdout=StringIO()
+            )
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class ProjectMembersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password")
+        cls.project = create_project("Roster", lead=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def add_members(self, start, count):
+        users = User.objects.bulk_create(
+            User(username=f"member{i}", email=f"member{i}@example.com")
+            for i in range(start, start + count)
+        )
+        ProjectMember.objects.bulk_create(
+            ProjectMember(
+                project=self.project,
+                user=user,
+                role=Roles.values[i % len(Roles.values)],
+            )
+            for i, user in enumerate(users)
+        )
+
+    def test_query_count_is_independent_of_roster_size(self):
+        url = reverse("project_members_list", args=[self.project.pk])
+        self.client.get(url)
+        # session, user, access, memberships with role counts, lead
+        for start, count in ((0, 5), (5, 300)):
+            self.add_members(start, count)
+            with self.assertNumQueries(5):
+                response = self.client.get(url)
+        self.assertContains(response, "member304@example.com")
+        self.assertEqual(
+            [role["count"] for role in response.context["role_counts"]],
+            [102, 102, 101],
+        )
+
+    def test_roster_is_keyset_paginated(self):
+        self.add_members(0, 120)
+        url = reverse("project_members_list", args=[self.project.pk])
+        seen, query = [], ""
+        while True:
+            response = self.client.get(f"{url}?{query}")
+            seen += [member.pk for member in response.context["members"]]
+            if not response.context["page"].has_next:
+                break
+            query = response.context["page"].next_query
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(len(set(seen)), 120)
+
+
+class AdminPerformanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = datetime.now(timezone.utc)
+        cls.admin = User.objects.create_superuser("admin", password="password")
+        cls.projects = [create_project(f"Admin {i}") for i in range(3)]
+        cls.sprint = Sprint.objects.create(
+            project=cls.projects[0], name="Sprint 1", start_date=now, end_date=now
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def create_issues(self, count):
+        users = User.objects.bulk_create(
+            User(username=f"assignee{Issue.objects.count()}-{i}") for i in range(count)
+        )
+        Issue.objects.bulk_create(
+            Issue(
+                project=self.projects[i % 3],
+                title=f"Issue {i}",
+                assignee=users[i],
+                sprint=self.sprint,
+            )
+            for i in range(count)
+        )
+
+    def test_issue_changelist_query_count_is_constant(self):
+        url = reverse("admin:project_issue_changelist")
+        counts = []
+        for count in (5, 50):
+            self.create_issues(count)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_foreign_key_filters_use_autocomplete(self):
+        self.create_issues(6)
+        project = self.projects[1]
+        response = self.client.get(
+            reverse("admin:project_issue_changelist"),
+            {"project__id__exact": project.pk},
+        )
+        self.assertEqual(response.context["cl"].result_count, 2)
+        self.assertContains(response, 'id="autocomplete_filter_project"')
+        self.assertContains(response, f'<option value="{project.pk}" selected>')
+        self.assertNotContains(response, self.projects[2].name)
+
+    def test_sprint_str_is_joined(self):
+        admin_class = site._registry[UserStory]
+        request = RequestFactory().get("/")
+        self.assertEqual(
+            admin_class.get_list_select_related(request), ["sprint", "sprint__project"]
+        )
+
+    def test_paginator_reads_sqlite_statistics(self):
+        self.create_issues(20)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        paginator = EstimatedCountPaginator(Issue.objects.all(), 10)
+        self.assertEqual(paginator.estimate(), 20)
+        self.assertIsNone(
+            EstimatedCountPaginator(Issue.objects.filter(status="x"), 10).estimate()
+        )
+
+
+class AcceptanceCriteriaMarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lead", password="password")
+        cls.project = create_project("Review", lead=cls.user)
+        cls.epic = Epic.objects.create(project=cls.project, title="Epic")
+        cls.story = UserStory.objects.create(
+            title="Story", epic=cls.epic, status=Status.IN_REVIEW
+        )
+        cls.criteria = [
+            AcceptanceCriteria.objects.create(user_story=cls.story, description=str(i))
+            for i in range(30)
+        ]
+
+    def test_save_sets_and_clears_met_date(self):
+        criteria = self.criteria[0]
+        self.assertIsNone(criteria.is_met_date)
+        criteria.is_met = True
+        criteria.save()
+        criteria.refresh_from_db()
+        self.assertIsNotNone(criteria.is_met_date)
+        criteria.is_met = False
+        criteria.save()
+        criteria.refresh_from_db()
+        self.assertIsNone(criteria.is_met_date)
+
+    def test_bulk_mark_completes_and_reopens_story(self):
+        received = []
+        criteria_marked.connect(
+            lambda **kwargs: received.append(kwargs), weak=False, dispatch_uid="test"
+        )
+        self.addCleanup(criteria_marked.disconnect, dispatch_uid="test")
+        ids = [criteria.pk for criteria in self.criteria]
+        # savepoint, criteria select and update, story states, story update,
+        # dashboard invalidation lookup, epic rollup update, change stream
+        # read, release
+        with self.assertNumQueries(9):
+            result = mark_criteria(ids, True)
+        self.assertEqual(result.updated, 30)
+        self.assertEqual(result.completed, [self.story.pk])
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.status, Status.COMPLETED)
+        self.assertFalse(
+            AcceptanceCriteria.objects.filter(is_met_date__isnull=True).exists()
+        )
+
+        result = mark_criteria(ids[:1], False)
+        self.assertEqual(result.reopened, [self.story.pk])
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.status, Status.IN_PROGRESS)
+        self.assertEqual(len(received), 2)
+
+    def test_endpoint_is_limited_to_project(self):
+        other = create_project("Other")
+        story = UserStory.objects.create(
+            title="Elsewhere", epic=Epic.objects.create(project=other, title="E")
+        )
+        foreign = AcceptanceCriteria.objects.create(user_story=story)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("acceptance_criteria_mark", args=[self.project.pk]),
+            {"ids": [self.criteria[0].pk, foreign.pk], "is_met": "1"},
+        )
+        self.assertEqual(response.json()["updated"], 1)
+        foreign.refresh_from_db()
+        self.assertFalse(foreign.is_met)
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("async", password="password")
+        cls.outsider = User.objects.create_user("outsider", password="password")
+        cls.project = create_project("Async project", lead=cls.user)
+        ProjectMember.objects.create(
+            project=cls.project, user=cls.outsider, role=Roles.values[0]
+        )
+        Epic.objects.create(project=cls.project, title="Async epic", status="TD")
+        Issue.objects.create(project=cls.project, title="Async issue", _type="BG")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    async def test_async_views_render_the_same_page(self):
+        await self.async_client.aforce_login(self.user)
+        pages = (
+            ("project_list", [], "Async project"),
+            ("project_detail", [self.project.pk], "Async project"),
+            ("project_members_list", [self.project.pk], "outsider"),
+            ("project_epics_list", [self.project.pk], "Async epic"),
+        )
+        for name, args, text in pages:
+            with self.subTest(name):
+                response = await self.async_client.get(reverse(f"a{name}", args=args))
+                self.assertContains(response, text)
+                self.assertContains(response, "Async project")
+
+    async def test_async_views_check_project_access(self):
+        other = await User.objects.acreate(username="stranger")
+        await self.async_client.aforce_login(other)
+        response = await self.async_client.get(
+            reverse("aproject_detail", args=[self.project.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    CHANGE_STREAM_POLL_INTERVAL=0.01,
+    CHANGE_STREAM_COALESCE=0,
+    CHANGE_STREAM_TIMEOUT=0.1,
+)
+class ChangeStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("watcher", password="password")
+        cls.project = create_project("Board", lead=cls.user)
+
+    def test_changes_are_logged_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            issue = Issue.objects.create(project=self.project, title="Live", _type="BG")
+            self.assertFalse(ChangeLog.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            issue.status = Status.IN_PROGRESS
+            issue.save()
+            Sprint.objects.create(
+                project=self.project,
+                name="S1",
+                start_date=self.project.start_date,
+                end_date=self.project.end_date,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            issue.delete()
+        self.assertEqual(
+            list(
+                ChangeLog.objects.order_by("pk").values_list(
+                    "kind", "action", "data__status"
+                )
+            ),
+            [
+                ("issue", "created", Status.TO_DO),
+                ("issue", "updated", Status.IN_PROGRESS),
+                ("sprint", "created", Sprint.SprintStatuses.NOT_STARTED),
+                ("issue", "deleted", Status.IN_PROGRESS),
+            ],
+        )
+
+    def test_marked_criteria_log_user_story_changes(self):
+        epic = Epic.objects.create(project=self.project, title="Epic")
+        story = UserStory.objects.create(title="Story", epic=epic)
+        criteria = AcceptanceCriteria.objects.create(
+            user_story=story, description="Works"
+        )
+        ChangeLog.objects.all().delete()
+        for is_met, status in ((True, Status.COMPLETED), (False, Status.IN_PROGRESS)):
+            with self.captureOnCommitCallbacks(execute=True):
+                mark_criteria([criteria.pk], is_met)
+            change = ChangeLog.objects.filter(kind="user_story").latest("pk")
+            self.assertEqual(
+                (change.project_id, change.object_id, change.action),
+                (self.project.pk, story.pk, "updated"),
+            )
+            self.assertEqual(change.data["status"], status)
+        self.assertEqual(ChangeLog.objects.filter(kind="user_story").count(), 2)
+
+    def test_recent_changes_wait_for_slower_commits_outside_sqlite(self):
+        old, new = [
+            ChangeLog.objects.create(
+                project=self.project, kind="issue", object_id=i, action="updated"
+            )
+            for i in range(2)
+        ]
+        ChangeLog.objects.filter(pk=old.pk).update(
+            created_at=timezone_now() - timedelta(seconds=5)
+        )
+        self.assertEqual(len(_settled(ChangeLog.objects.all())), 2)
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            self.assertEqual(list(_settled(ChangeLog.objects.all())), [old])
+
+    def test_live_updates_need_asgi(self):
+        self.client.force_login(self.user)
+        url = reverse("project_issues_list", args=[self.project.pk])
+        self.assertNotContains(self.client.get(url), "EventSource")
+        stream = reverse("project_changes_stream", args=[self.project.pk])
+        self.assertEqual(self.client.get(stream).status_code, 204)
+
+    async def test_live_updates_are_included_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse("project_issues_list", args=[self.project.pk])
+        response = await self.async_client.get(url)
+        self.assertContains(response, "EventSource")
+
+    def test_bursts_are_coalesced_per_object(self):
+        def change(object_id, action, title):
+            return ChangeLog(
+                kind="issue", object_id=object_id, action=action, data={"title": title}
+            )
+
+        changes = coalesce(
+            [
+                change(1, "created", "a"),
+                change(2, "updated", "b"),
+                change(1, "updated", "a2"),
+                change(3, "created", "c"),
+                change(3, "deleted", "c"),
+            ]
+        )
+        self.assertEqual(
+            [(c["id"], c["action"], c["title"]) for c in changes],
+            [(2, "updated", "b"), (1, "created", "a2")],
+        )
+
+    async def test_stream_resumes_from_last_event_id(self):
+        await self.async_client.aforce_login(self.user)
+        first, second, third = [
+            await ChangeLog.objects.acreate(
+                project=self.project,
+                kind="issue",
+                object_id=i,
+                action="updated",
+                data={"title": f"Issue {i}"},
+            )
+            for i in range(3)
+        ]
+        response = await self.async_client.get(
+            reverse("project_changes_stream", args=[self.project.pk]),
+            headers={"Last-Event-ID": str(first.pk)},
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        events = [block for block in body.split("\n\n") if "event:" in block]
+        self.assertEqual(len(events), 1)
+        self.assertIn(f"id: {third.pk}\n", events[0])
+        self.assertNotIn("Issue 0", events[0])
+        self.assertIn("Issue 1", events[0])
+        self.assertIn("Issue 2", events[0])
+
+    async def test_stream_requires_project_access(self):
+        other = await User.objects.acreate(username="passerby")
+        await self.async_client.aforce_login(other)
+        response = await self.async_client.get(
+            reverse("project_changes_stream", args=[self.project.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class DependencyGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = create_project("Plan", methodology="CPM")
+        cls.design, cls.build, cls.test, cls.docs = [
+            Issue.objects.create(
+                project=cls.project, title=title, effort_estimate=effort
+            )
+            for title, effort in (("design", 3), ("build", 8), ("test", 2), ("docs", 1))
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cycles_are_rejected(self):
+        add_dependency(self.build, self.design)
+        add_dependency(self.test, self.build)
+        with self.assertRaises(DependencyCycleError):
+            add_dependency(self.design, self.test)
+        with self.assertRaises(ValidationError):
+            add_dependency(self.design, self.design)
+        self.assertEqual(IssueDependency.objects.count(), 2)
+
+    def test_dependencies_stay_within_a_project(self):
+        other = create_project("Other")
+        stranger = Issue.objects.create(project=other, title="elsewhere")
+        with self.assertRaises(ValidationError):
+            add_dependency(self.build, stranger)
+
+    def test_schedule_follows_the_longest_path(self):
+        add_dependency(self.build, self.design)
+        add_dependency(self.test, self.build)
+        add_dependency(self.docs, self.design)
+        # edges, efforts
+        with self.assertNumQueries(2):
+            schedule = project_schedule(self.project.pk)
+        order = schedule["order"]
+        self.assertLess(order.index(self.design.pk), order.index(self.build.pk))
+        self.assertLess(order.index(self.build.pk), order.index(self.test.pk))
+        self.assertEqual(
+            schedule["critical_path"], [self.design.pk, self.build.pk, self.test.pk]
+        )
+        self.assertEqual(schedule["length"], 13)
+        self.assertEqual(schedule["earliest_start"][self.test.pk], 11)
+
+    def test_schedule_is_cached_until_the_graph_changes(self):
+        add_dependency(self.build, self.design)
+        self.assertEqual(project_schedule(self.project.pk)["length"], 11)
+        with self.assertNumQueries(0):
+            project_schedule(self.project.pk)
+        self.build.effort_estimate = 20
+        self.build.save()
+        self.assertEqual(project_schedule(self.project.pk)["length"], 23)
+        edge = add_dependency(self.test, self.build)
+        self.assertEqual(project_schedule(self.project.pk)["length"], 25)
+        edge.delete()
+        self.assertEqual(project_schedule(self.project.pk)["length"], 23)
+
+    def test_edges_are_only_written_with_add_dependency(self):
+        # No many-to-many manager to add edges that skip the checks
+        self.assertFalse(hasattr(self.test, "dependencies"))
+        add_dependency(self.test, self.build)
+        self.assertQuerySetEqual(
+            self.test.dependency_edges.values_list("depends_on", flat=True),
+            [self.build.pk],
+        )
+        self.assertQuerySetEqual(
+            self.build.dependent_edges.values_list("issue", flat=True),
+            [self.test.pk],
+        )
+
+    def test_large_graph(self):
+        # A chain of 100k issues, each also depending on the one two back
+        size = 100_000
+        graph = DependencyGraph(
+            weights=dict.fromkeys(range(size), 1),
+            dependents={
+                node: [n for n in (node + 1, node + 2) if n < size]
+                for node in range(size)
+            },
+        )
+        schedule = graph.schedule()
+        self.assertEqual(schedule["length"], size)
+        self.assertEqual(schedule["critical_path"], list(range(size)))
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = create_project("Rollups")
+
+    def setUp(self):
+        self.epic = Epic.objects.create(project=self.project, title="Checkout")
+        self.story = UserStory.objects.create(title="Pay by card", epic=self.epic)
+
+    def counters(self, obj, fields=("issue_count", "issues_done", "effort_total")):
+        obj.refresh_from_db()
+        return tuple(getattr(obj, name) for name in fields)
+
+    def add_issue(self, effort, status=Status.TO_DO, story=None):
+        issue = Issue.objects.create(
+            project=self.project,
+            title=f"Issue {effort}",
+            effort_estimate=effort,
+            status=status,
+            user_story=story or self.story,
+        )
+        self.epic.issues.add(issue)
+        return issue
+
+    def test_counters_predating_their_issues_can_go_below_zero(self):
+        # As on a database upgraded with issues already in place
+        issue = self.add_issue(3, Status.COMPLETED)
+        UserStory.objects.update(issue_count=0, issues_done=0, effort_total=0)
+        issue.delete()
+        self.assertEqual(self.counters(self.story), (-1, -1, -3))
+        call_command("reconcile_rollups", stdout=StringIO())
+        self.assertEqual(self.counters(self.story), (0, 0, 0))
+
+    def test_issue_changes_roll_up(self):
+        first = self.add_issue(3)
+        second = self.add_issue(5, Status.COMPLETED)
+        self.assertEqual(self.counters(self.story), (2, 1, 8))
+        self.assertEqual(self.counters(self.epic), (2, 1, 8))
+        self.assertEqual(self.epic.effort_done, 5)
+        self.assertEqual(self.epic.progress, 62)
+
+        first.status = Status.COMPLETED
+        first.effort_estimate = 4
+        first.save()
+        self.assertEqual(self.counters(self.story), (2, 2, 9))
+        self.assertEqual(self.counters(self.epic), (2, 2, 9))
+
+        other = UserStory.objects.create(title="Pay by invoice", epic=self.epic)
+        second.user_story = other
+        second.save()
+        self.assertEqual(self.counters(self.story), (1, 1, 4))
+        self.assertEqual(self.counters(other), (1, 1, 5))
+
+        self.epic.issues.remove(second, first)
+        self.assertEqual(self.counters(self.epic), (0, 0, 0))
+        self.epic.issues.add(first)
+        first.delete()
+        self.assertEqual(self.counters(self.story), (0, 0, 0))
+        self.assertEqual(self.counters(self.epic), (0, 0, 0))
+
+    def test_epic_links_from_the_issue_side(self):
+        issue = self.add_issue(2)
+        other = Epic.objects.create(project=self.project, title="Refunds")
+        issue.epics.add(other)
+        self.assertEqual(self.counters(other), (1, 0, 2))
+        issue.epics.remove(other, Epic.objects.create(project=self.project, title="x"))
+        self.assertEqual(self.counters(other), (0, 0, 0))
+        issue.epics.clear()
+        self.assertEqual(self.counters(self.epic), (0, 0, 0))
+
+    def test_user_stories_roll_up_to_epics(self):
+        fields = ("story_count", "stories_done")
+        self.assertEqual(self.counters(self.epic, fields), (1, 0))
+        self.story.status = Status.COMPLETED
+        self.story.save()
+        self.assertEqual(self.counters(self.epic, fields), (1, 1))
+        self.story.epic = None
+        self.story.save()
+        self.assertEqual(self.counters(self.epic, fields), (0, 0))
+
+    def test_saving_a_stale_instance_keeps_counters(self):
+        stale = Epic.objects.get(pk=self.epic.pk)
+        self.add_issue(3)
+        stale.title = "Checkout v2"
+        stale.save()
+        self.assertEqual(self.counters(self.epic), (1, 0, 3))
+        self.assertEqual(self.epic.title, "Checkout v2")
+
+    def test_reconcile_fixes_drift(self):
+        self.add_issue(3, Status.COMPLETED)
+        self.add_issue(2)
+        Epic.objects.update(issue_count=0, stories_done=9)
+        UserStory.objects.update(effort_total=0)
+        out = StringIO()
+        call_command("reconcile_rollups", stdout=out)
+        self.assertIn("1 user stories and 1 epics", out.getvalue())
+        self.assertEqual(self.counters(self.story), (2, 1, 5))
+        self.assertEqual(self.counters(self.epic), (2, 1, 5))
+        self.assertEqual(self.epic.stories_done, 0)
+
+
+class AttachmentTests(TestCase):
+    PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("uploader", password="password")
+        cls.project = create_project("Files", lead=cls.user)
+        cls.issue = Issue.objects.create(project=cls.project, title="Crash")
+
+    def setUp(self):
+        self.root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(ATTACHMENT_ROOT=self.root))
+        self.client.force_login(self.user)
+
+    def start(self, content, **data):
+        response = self.client.post(
+            reverse("issue_attachments", args=[self.project.pk, self.issue.pk]),
+            {"filename": "screen.png", "size": len(content), **data},
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put(self, url, chunk, first, size):
+        return self.client.put(
+            url,
+            chunk,
+            content_type="application/octet-stream",
+            headers={"Content-Range": f"bytes {first}-{first + len(chunk) - 1}/{size}"},
+        )
+
+    def upload(self, content, chunk_size=400, **data):
+        upload = self.start(content, **data)
+        for first in range(0, len(content), chunk_size):
+            chunk = content[first : first + chunk_size]
+            self.assertEqual(
+                self.put(upload["url"], chunk, first, len(content)).status_code, 200
+            )
+        response = self.client.post(
+            reverse(
+                "attachment_upload_complete", args=[self.project.pk, upload["upload"]]
+            ),
+            {"sha256": hashlib.sha256(content).hexdigest()},
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["attachment"]
+
+    def test_chunked_upload_resumes_from_the_stored_offset(self):
+        upload = self.start(self.PNG)
+        size = len(self.PNG)
+        self.put(upload["url"], self.PNG[:500], 0, size)
+        response = self.put(upload["url"], self.PNG[600:], 600, size)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 500)
+        self.assertEqual(self.client.get(upload["url"]).json()["offset"], 500)
+        self.put(upload["url"], self.PNG[500:], 500, size)
+        response = self.client.post(
+            reverse(
+                "attachment_upload_complete", args=[self.project.pk, upload["upload"]]
+            )
+        )
+        attachment = response.json()["attachment"]
+        self.assertEqual(attachment["sha256"], hashlib.sha256(self.PNG).hexdigest())
+        path = os.path.join(self.root, blob_name(attachment["sha256"]))
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), self.PNG)
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.root, "uploads")), [])
+
+    def test_identical_files_are_stored_once(self):
+        first = self.upload(self.PNG)
+        second = self.upload(self.PNG, chunk_size=1000)
+        known = self.start(self.PNG, sha256=first["sha256"], filename="again.png")[
+            "attachment"
+        ]
+        self.assertEqual(Blob.objects.count(), 1)
+        self.assertEqual(
+            {first["sha256"], second["sha256"], known["sha256"]},
+            {Blob.objects.get().sha256},
+        )
+        self.assertEqual(self.issue.attachments.count(), 3)
+
+    def test_known_content_is_only_reused_within_the_project(self):
+        sha256 = self.upload(self.PNG)["sha256"]
+        other = create_project("Elsewhere", lead=self.user)
+        issue = Issue.objects.create(project=other, title="Probe")
+        response = self.client.post(
+            reverse("issue_attachments", args=[other.pk, issue.pk]),
+            {"filename": "probe.png", "size": len(self.PNG), "sha256": sha256},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("attachment", response.json())
+        self.assertIn("upload", response.json())
+        self.assertFalse(issue.attachments.exists())
+
+    def test_only_sniffed_images_and_pdfs_are_served_inline(self):
+        for content, filename, content_type in (
+            (b"<html><script>alert(1)</script></html>", "page.html", "text/html"),
+            (b"<svg xmlns='http://www.w3.org/2000/svg'/>", "x.svg", "image/svg+xml"),
+            (b"<script>alert(1)</script>", "fake.png", "image/png"),
+        ):
+            with self.subTest(filename=filename):
+                attachment = self.upload(
+                    content, filename=filename, content_type=content_type
+                )
+                response = self.client.get(attachment["url"], {"inline": "1"})
+                self.assertEqual(response["Content-Type"], "application/octet-stream")
+                self.assertTrue(
+                    response["Content-Disposition"].startswith("attachment")
+                )
+                self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+        for content, content_type in (
+            (self.PNG, "image/png"),
+            (b"%PDF-1.7 body", "application/pdf"),
+        ):
+            with self.subTest(content_type=content_type):
+                attachment = self.upload(content, filename="file")
+                response = self.client.get(attachment["url"], {"inline": "1"})
+                self.assertEqual(response["Content-Type"], content_type)
+                self.assertTrue(response["Content-Disposition"].startswith("inline"))
+
+    def test_checksum_mismatch_discards_the_upload(self):
+        upload = self.start(b"abc")
+        self.put(upload["url"], b"abc", 0, 3)
+        response = self.client.post(
+            reverse(
+                "attachment_upload_complete", args=[self.project.pk, upload["upload"]]
+            ),
+            {"sha256": "0" * 64},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(AttachmentUpload.objects.exists())
+
+    def test_download_ranges(self):
+        attachment = self.upload(self.PNG)
+        url = attachment["url"]
+        response = self.client.get(url)
+        self.assertEqual(b"".join(response.streaming_content), self.PNG)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        response = self.client.get(url, headers={"Range": "bytes=8-15"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 8-15/{len(self.PNG)}")
+        self.assertEqual(b"".join(response.streaming_content), self.PNG[8:16])
+        response = self.client.get(url, headers={"Range": "bytes=-4"})
+        self.assertEqual(b"".join(response.streaming_content), self.PNG[-4:])
+        response = self.client.get(url, headers={"Range": "bytes=99999-"})
+        self.assertEqual(response.status_code, 416)
+        etag = f'"{attachment["sha256"]}"'
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-", 10), (0, 9))
+        self.assertEqual(parse_range("bytes=5-100", 10), (5, 9))
+        self.assertEqual(parse_range("bytes=-3", 10), (7, 9))
+        self.assertIsNone(parse_range("bytes=0-1,4-5", 10))
+        self.assertIsNone(parse_range(None, 10))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=10-", 10)
+
+    @override_settings(ATTACHMENT_SENDFILE="x-accel-redirect")
+    def test_downloads_can_be_offloaded(self):
+        attachment = self.upload(self.PNG)
+        response = self.client.get(attachment["url"])
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected/attachments/" + blob_name(attachment["sha256"]),
+        )
+        self.assertEqual(response.content, b"")
+
+    def test_metadata_is_sniffed_once(self):
+        self.upload(self.PNG)
+        blob = Blob.objects.get()
+        self.assertIsNone(blob.metadata)
+        self.assertEqual(blob_metadata(blob)["content_type"], "image/png")
+        with self.assertNumQueries(0):
+            blob_metadata(blob)
+        blob.refresh_from_db()
+        self.assertTrue(blob.metadata["image"])
+
+    def test_attachments_require_project_access(self):
+        attachment = self.upload(self.PNG)
+        self.client.force_login(User.objects.create_user("passerby"))
+        self.assertEqual(self.client.get(attachment["url"]).status_code, 404)
+
+    def test_prune_drops_stale_uploads_and_unused_blobs(self):
+        self.upload(b"kept")
+        orphan = self.upload(b"orphan")
+        Attachment.objects.filter(pk=orphan["id"]).delete()
+        upload = self.start(b"stale")
+        self.put(upload["url"], b"st", 0, 5)
+        AttachmentUpload.objects.update(
+            updated_at=datetime.now(timezone.utc) - timedelta(days=2)
+        )
+        out = StringIO()
+        call_command("prune_attachments", stdout=out)
+        self.assertIn("1 stale uploads and 1 unused files", out.getvalue())
+        self.assertEqual(list(Blob.objects.values_list("size", flat=True)), [4])
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, blob_name(orphan["sha256"])))
+        )
+        self.assertEqual(os.listdir(os.path.join(self.root, "uploads")), [])
+        self.assertEqual(prune_blobs(), 0)
+
+
+class SidebarCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("navigator", password="password")
+        cls.project = create_project("Roadmap", lead=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        return render_to_string("includes/sidebar.html", request=request)
+
+    def test_sidebar_is_cached_until_the_users_projects_change(self):
+        self.assertIn("Roadmap", self.render())
+        # Written around the signals, so the navigation version stays put
+        Project.objects.filter(pk=self.project.pk).update(name="Sneaky")
+        with self.assertNumQueries(0):
+            self.assertIn("Roadmap", self.render())
+        self.project.name = "Launch"
+        self.project.save()
+        html = self.render()
+        self.assertIn("Launch", html)
+        self.assertNotIn("Roadmap", html)
+
+    def test_search_box_is_not_cached(self):
+        self.render()
+        request = RequestFactory().get("/", {"search": "needle"})
+        request.user = self.user
+        html = render_to_string("includes/sidebar.html", request=request)
+        self.assertIn('value="needle"', html)
+
+
+class SprintPlanningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = datetime.now(timezone.utc)
+        cls.user = User.objects.create_user("planner", password="password")
+        cls.project = create_project("Planning", lead=cls.user)
+        cls.current, cls.next = [
+            Sprint.objects.create(
+                project=cls.project, name=name, start_date=now, end_date=now
+            )
+            for name in ("Current", "Next")
+        ]
+
+    def add_issues(self, count, sprint):
+        issues = Issue.objects.bulk_create(
+            Issue(
+                project=self.project,
+                title=f"Issue {i}",
+                sprint=sprint,
+                effort_estimate=2,
+            )
+            for i in range(count)
+        )
+        if sprint is not None:
+            sprint.issues.add(*issues)
+        return [issue.pk for issue in issues]
+
+    def snapshot(self, sprint):
+        return dict(
+            SprintSnapshot.objects.filter(sprint=sprint).values_list(
+                "status", "issue_count"
+            )
+        )[Status.TO_DO]
+
+    def test_moving_many_issues_takes_a_fixed_number_of_queries(self):
+        ids = self.add_issues(1000, self.current)
+        # savepoint, issue rows, issue update, sprint link delete and insert
+        # (3 batches on SQLite), snapshot totals and upsert, change log read,
+        # release
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(11):
+                result = move_issues(ids, self.next, self.project)
+        self.assertEqual(result.moved, 1000)
+        self.assertEqual(result.from_sprint_ids, [self.current.pk])
+        self.assertEqual(Issue.objects.filter(sprint=self.next).count(), 1000)
+        self.assertEqual(self.next.issues.count(), 1000)
+        self.assertFalse(self.current.issues.exists())
+        self.assertEqual(self.snapshot(self.current), 0)
+        self.assertEqual(self.snapshot(self.next), 1000)
+        self.assertEqual(ChangeLog.objects.filter(kind="issue").count(), 1000)
+        self.assertEqual(
+            set(ActivityLog.objects.values_list("field", "old_value", "new_value")),
+            {("sprint", self.current.pk, self.next.pk)},
+        )
+
+    def test_move_to_backlog_skips_other_projects(self):
+        ids = self.add_issues(3, self.current)
+        other = create_project("Other")
+        stranger = Issue.objects.create(project=other, title="Elsewhere")
+        result = move_issues([*ids, stranger.pk], None, self.project)
+        self.assertEqual(sorted(result.issue_ids), ids)
+        self.assertFalse(Issue.objects.filter(sprint__isnull=False).exists())
+        self.assertFalse(Sprint.issues.through.objects.exists())
+        self.assertEqual(move_issues(ids, None, self.project).moved, 0)
+
+    def test_saving_an_issue_keeps_sprint_links_in_line(self):
+        issue = Issue.objects.create(
+            project=self.project, title="Single", sprint=self.current
+        )
+        self.assertEqual(list(issue.sprints.all()), [self.current])
+        issue.sprint = self.next
+        issue.save()
+        self.assertEqual(list(issue.sprints.all()), [self.next])
+
+    def test_endpoint(self):
+        ids = self.add_issues(2, None)
+        self.client.force_login(self.user)
+        url = reverse("sprint_plan", args=[self.project.pk])
+        response = self.client.post(url, {"ids": ids, "sprint": self.next.pk})
+        self.assertEqual(response.json()["moved"], 2)
+        other = Sprint.objects.create(
+            project=create_project("Other"),
+            name="Foreign",
+            start_date=self.project.start_date,
+            end_date=self.project.end_date,
+        )
+        response = self.client.post(url, {"ids": ids, "sprint": other.pk})
+        self.assertEqual(response.status_code, 404)
+
+
+class ActivityLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = datetime.now(timezone.utc)
+        cls.user = User.objects.create_user("auditor", password="password")
+        cls.project = create_project("Audit", lead=cls.user)
+        cls.sprint = Sprint.objects.create(
+            project=cls.project, name="Audited", start_date=now, end_date=now
+        )
+
+    def setUp(self):
+        self.issue = Issue.objects.create(project=self.project, title="Tracked")
+
+    def test_saves_log_changed_fields_without_reading_the_row(self):
+        issue = Issue.objects.get(pk=self.issue.pk)
+        issue.status = Status.IN_PROGRESS
+        issue.assignee = self.user
+        issue.title = "Not tracked"
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                issue.save()
+        self.assertFalse(
+            [
+                query
+                for query in queries
+                if query["sql"].startswith('SELECT "project_issue"')
+            ]
+        )
+        self.assertEqual(
+            {
+                (entry.field, entry.old_value, entry.new_value)
+                for entry in activity_timeline(Issue, issue.pk)
+            },
+            {
+                ("status", Status.TO_DO, Status.IN_PROGRESS),
+                ("assignee", None, self.user.pk),
+            },
+        )
+        self.assertTrue(callbacks)
+        with self.captureOnCommitCallbacks(execute=True):
+            issue.save()
+        self.assertEqual(len(activity_timeline(Issue, issue.pk)), 2)
+
+    def test_rolled_back_changes_are_not_logged(self):
+        epic = Epic.objects.create(project=self.project, title="Epic")
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    epic.priority = "HIGH"
+                    epic.save()
+                    raise ValidationError("undo")
+            except ValidationError:
+                pass
+            self.sprint.status = Sprint.SprintStatuses.IN_PROGRESS
+            self.sprint.save()
+        self.assertFalse(activity_timeline(Epic, epic.pk))
+        self.assertEqual(
+            [entry.field for entry in activity_timeline(Sprint, self.sprint.pk)],
+            ["status"],
+        )
+
+    def test_changes_are_written_when_the_transaction_commits(self):
+        with activity_actor(self.user):
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for status in (Status.IN_PROGRESS, Status.COMPLETED):
+                        self.issue.status = status
+                        self.issue.priority = "HIGH"
+                        self.issue.save()
+                self.assertFalse(ActivityLog.objects.exists())
+        # Written before the request (or anything else) finishes
+        self.assertEqual(ActivityLog.objects.count(), 3)
+        timeline = list(activity_timeline(Issue, self.issue.pk))
+        self.assertEqual(
+            [(entry.field, entry.new_value) for entry in timeline][:1],
+            [("status", Status.COMPLETED)],
+        )
+        self.assertEqual({entry.actor_id for entry in timeline}, {self.user.pk})
+        with self.assertRaises(ValueError):
+            timeline[0].save()
+
+    def test_marked_criteria_log_user_story_status(self):
+        epic = Epic.objects.create(project=self.project, title="Epic")
+        story = UserStory.objects.create(
+            title="Story", epic=epic, status=Status.IN_REVIEW
+        )
+        criteria = AcceptanceCriteria.objects.create(
+            user_story=story, description="Works"
+        )
+        with activity_actor(self.user):
+            for is_met in (True, False):
+                with self.captureOnCommitCallbacks(execute=True):
+                    mark_criteria([criteria.pk], is_met)
+        self.assertEqual(
+            [
+                (entry.field, entry.old_value, entry.new_value, entry.actor_id)
+                for entry in activity_timeline(UserStory, story.pk)
+            ],
+            [
+                ("status", Status.COMPLETED, Status.IN_PROGRESS, self.user.pk),
+                ("status", Status.IN_REVIEW, Status.COMPLETED, self.user.pk),
+            ],
+        )
+
+    def test_endpoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for status in (Status.IN_PROGRESS, Status.COMPLETED):
+                self.issue.status = status
+                self.issue.save()
+        with activity_actor(self.user):
+            with self.captureOnCommitCallbacks(execute=True):
+                move_issues([self.issue.pk], self.sprint, self.project)
+        self.client.force_login(self.user)
+        url = reverse("issue_activity_data", args=[self.project.pk, self.issue.pk])
+        activity = self.client.get(url).json()["activity"]
+        self.assertEqual(
+            [(entry["field"], entry["actor"]) for entry in activity],
+            [("sprint", self.user.pk), ("status", None), ("status", None)],
+        )
+        older = self.client.get(url, {"before": activity[0]["id"]}).json()
+        self.assertEqual(older["activity"], activity[1:])
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def handle(self, request, view):
+        middleware = PrimaryPinningMiddleware(use_replica(view))
+        return middleware(request)
+
+    def test_settings_from_environment(self):
+        databases, replicas = database_settings(
+            "/srv/tracker",
+            {
+                "DATABASE_URL": "postgres://app:s%3Acret@db:5433/tracker",
+                "DATABASE_REPLICA_URLS": "sqlite:///replica.sqlite3",
+                "DATABASE_POOL_MAX_SIZE": "20",
+                "DATABASE_CONN_MAX_AGE": "60",
+                "DATABASE_REPLICA_CONN_MAX_AGE": "30",
+            },
+        )
+        primary = databases["default"]
+        self.assertEqual(primary["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(primary["PASSWORD"], "s:cret")
+        self.assertEqual(primary["PORT"], "5433")
+        self.assertEqual(primary["OPTIONS"]["pool"]["max_size"], 20)
+        self.assertEqual(primary["CONN_MAX_AGE"], 0)
+        self.assertEqual(replicas, ["replica_1"])
+        replica = databases["replica_1"]
+        self.assertEqual(replica["NAME"], "/srv/tracker/replica.sqlite3")
+        self.assertEqual(replica["CONN_MAX_AGE"], 30)
+        self.assertEqual(replica["TEST"], {"MIRROR": "default"})
+        self.assertEqual(
+            database_settings("/srv/tracker", {})[0]["default"]["NAME"],
+            "/srv/tracker/db.sqlite3",
+        )
+
+    def test_sqlite_production_profile(self):
+        databases, _ = database_settings(
+            "/srv/tracker",
+            {
+                "DATABASE_SQLITE_PROFILE": "production",
+                "DATABASE_SQLITE_BUSY_TIMEOUT": "800",
+            },
+        )
+        options = databases["default"]["OPTIONS"]
+        self.assertEqual(options["transaction_mode"], "IMMEDIATE")
+        self.assertIn("PRAGMA journal_mode=WAL", options["init_command"])
+        self.assertIn("PRAGMA busy_timeout=800", options["init_command"])
+
+    def test_only_replica_views_read_from_replicas(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Issue))
+            return HttpResponse()
+
+        self.assertEqual(self.router.db_for_read(Issue), "default")
+        response = self.handle(self.factory.get("/"), view)
+        self.assertEqual(seen, ["replica_1"])
+        self.assertNotIn("pin_primary", response.cookies)
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Issue))
+            self.router.db_for_write(Issue)
+            seen.append(self.router.db_for_read(Issue))
+            return HttpResponse()
+
+        response = self.handle(self.factory.get("/"), view)
+        self.assertEqual(seen, ["replica_1", "default"])
+        self.assertEqual(response.cookies["pin_primary"]["max-age"], 5)
+
+        # The next request, made with the cookie, is pinned from the start
+        seen.clear()
+        request = self.factory.get("/")
+        request.COOKIES["pin_primary"] = "1"
+        self.handle(request, view)
+        self.assertEqual(seen, ["default", "default"])
+
+    def test_writes_and_migrations_use_the_primary(self):
+        self.assertEqual(self.router.db_for_write(Issue), "default")
+        self.assertTrue(self.router.allow_migrate("default", "project"))
+        self.assertFalse(self.router.allow_migrate("replica_1", "project"))
+
+
+@override_settings(DATABASE_LOCK_RETRIES=3, DATABASE_LOCK_RETRY_DELAY=0)
+class LockRetryTests(TransactionTestCase):
+    def flaky(self, failures, message="database is locked"):
+        calls = []
+
+        def write():
+            calls.append(connection.in_atomic_block)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return len(calls)
+
+        return write, calls
+
+    def test_locked_writes_are_retried_in_a_transaction(self):
+        write, calls = self.flaky(2)
+        self.assertEqual(call_with_retry(write), 3)
+        self.assertEqual(calls, [True, True, True])
+
+    def test_retries_give_up(self):
+        write, calls = self.flaky(5)
+        with self.assertRaises(OperationalError):
+            call_with_retry(write)
+        self.assertEqual(len(calls), 3)
+
+    def test_other_errors_are_not_retried(self):
+        write, calls = self.flaky(1, "no such table: project_issue")
+        with self.assertRaises(OperationalError):
+            call_with_retry(write)
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_DELAY=0)
+class JobTests(TransactionTestCase):
+    def setUp(self):
+        self.lead = User.objects.create_user("lead", password="password")
+        self.other = User.objects.create_user("other", password="password")
+        self.project = create_project("Queued", lead=self.lead)
+        self.runs = []
+
+        @task(name="test_flaky")
+        def flaky(failures):
+            self.runs.append(failures)
+            if len(self.runs) <= failures:
+                raise RuntimeError("flaky")
+            return {"runs": len(self.runs)}
+
+        self.addCleanup(TASKS.pop, "test_flaky")
+
+    def work(self):
+        call_command("run_jobs", "--once", "--processes", "0", stdout=StringIO())
+
+    def test_project_delete_runs_in_the_background(self):
+        Issue.objects.create(project=self.project, title="Goes too")
+        url = reverse("project_delete", args=[self.project.pk])
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.post(url).status_code, 404)
+        self.client.force_login(self.lead)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        response = self.client.post(url)
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse("job_detail", args=[job.pk]))
+        self.assertTrue(Project.objects.exists())
+
+        self.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Statuses.SUCCEEDED)
+        self.assertGreater(job.result["deleted"], 1)
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(Issue.objects.exists())
+        status = self.client.get(reverse("job_status_data", args=[job.pk])).json()
+        self.assertEqual(status["status"], "succeeded")
+        self.assertContains(self.client.get(reverse("job_list")), "delete_project")
+        self.client.force_login(self.other)
+        response = self.client.get(reverse("job_detail", args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_failed_jobs_are_retried_then_given_up(self):
+        recovered = enqueue("test_flaky", failures=2)
+        self.work()
+        recovered.refresh_from_db()
+        self.assertEqual(recovered.status, Job.Statuses.SUCCEEDED)
+        self.assertEqual((recovered.attempts, recovered.result), (3, {"runs": 3}))
+
+        self.runs.clear()
+        failed = enqueue("test_flaky", failures=5)
+        self.work()
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, Job.Statuses.FAILED)
+        self.assertEqual(failed.attempts, 3)
+        self.assertIn("RuntimeError: flaky", failed.error)
+        with self.assertRaises(ValueError):
+            enqueue("no_such_task")
+
+    @override_settings(JOB_RETRY_DELAY=60)
+    def test_jobs_are_claimed_once_and_retried_later(self):
+        job = enqueue("test_flaky", failures=1)
+        self.assertEqual(claim_jobs("first", 5), [job.pk])
+        self.assertEqual(claim_jobs("second", 5), [])
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=datetime.now(timezone.utc) - timedelta(days=1)
+        )
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Statuses.QUEUED)
+        self.assertGreater(job.run_at, datetime.now(timezone.utc))
+        self.assertEqual(claim_jobs("second", 5), [])
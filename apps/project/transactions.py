@@ -0,0 +1,59 @@
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def is_locked_error(error) -> bool:
+    message = str(error)
+    return "database is locked" in message or "database table is locked" in message
+
+
+def call_with_retry(func, *args, attempts=None, delay=None, using=None, **kwargs):
+    """Call ``func`` in a transaction, again while the database is locked.
+
+    Retrying is only safe for all-or-nothing work, so nothing is retried
+    inside an outer transaction, or once the transaction has committed (an
+    ``on_commit`` callback failing). Waits grow exponentially from ``delay``,
+    with jitter so the losers don't collide again.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    if connections[using].in_atomic_block:
+        return func(*args, **kwargs)
+    attempts = attempts or settings.DATABASE_LOCK_RETRIES
+    delay = settings.DATABASE_LOCK_RETRY_DELAY if delay is None else delay
+    for attempt in range(attempts):
+        committed = False
+
+        def mark_committed():
+            nonlocal committed
+            committed = True
+
+        try:
+            with transaction.atomic(using=using):
+                transaction.on_commit(mark_committed, using=using)
+                return func(*args, **kwargs)
+        except OperationalError as error:
+            if committed or attempt + 1 == attempts or not is_locked_error(error):
+                raise
+        time.sleep(delay * 2**attempt * random.uniform(1, 2))
+
+
+def retry_on_locked(view_func):
+    """Retry a view's writes while the database is locked.
+
+    GET, HEAD and OPTIONS requests run as they are, others go through
+    ``call_with_retry``.
+    """
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view_func(request, *args, **kwargs)
+        return call_with_retry(view_func, request, *args, **kwargs)
+
+    return _wrapped_view
@@ -4,8 +4,25 @@ from . import views
 urlpatterns: list = [
     path("create/", views.project_create, name="project_create"),
     path("list/", views.project_list, name="project_list"),
+    path("search/", views.project_search, name="project_search"),
+    path("stats/", views.request_stats_data, name="request_stats_data"),
     path("detail/<int:pk>", views.project_detail, name="project_detail"),
     path("delete/<int:pk>", views.project_delete, name="project_delete"),
+    path("jobs/", views.job_list, name="job_list"),
+    path("jobs/<int:pk>/", views.job_detail, name="job_detail"),
+    path("jobs/<int:pk>/status/", views.job_status_data, name="job_status_data"),
+    path("async/list/", views.aproject_list, name="aproject_list"),
+    path("async/detail/<int:pk>", views.aproject_detail, name="aproject_detail"),
+    path(
+        "async/members/<int:project_id>/",
+        views.aproject_members_list,
+        name="aproject_members_list",
+    ),
+    path(
+        "async/epics/<int:project_id>/",
+        views.aproject_epics_list,
+        name="aproject_epics_list",
+    ),
     path(
         "members/<int:project_id>/",
         views.project_members_list,
@@ -16,4 +33,84 @@ urlpatterns: list = [
         views.project_epics_list,
         name="project_epics_list",
     ),
+    path(
+        "issues/<int:project_id>/",
+        views.project_issues_list,
+        name="project_issues_list",
+    ),
+    path(
+        "changes/<int:project_id>/",
+        views.project_changes_stream,
+        name="project_changes_stream",
+    ),
+    path(
+        "issues/<int:project_id>/export/",
+        views.project_issues_export,
+        name="project_issues_export",
+    ),
+    path(
+        "user-stories/<int:project_id>/",
+        views.project_user_stories_list,
+        name="project_user_stories_list",
+    ),
+    path(
+        "sprints/<int:project_id>/",
+        views.project_sprints_list,
+        name="project_sprints_list",
+    ),
+    path(
+        "sprints/<int:project_id>/plan/",
+        views.sprint_plan,
+        name="sprint_plan",
+    ),
+    path(
+        "sprints/<int:project_id>/<int:sprint_id>/burndown/",
+        views.sprint_burndown_data,
+        name="sprint_burndown_data",
+    ),
+    path(
+        "criteria/<int:project_id>/mark/",
+        views.acceptance_criteria_mark,
+        name="acceptance_criteria_mark",
+    ),
+    path(
+        "velocity/<int:project_id>/",
+        views.project_velocity_data,
+        name="project_velocity_data",
+    ),
+    path(
+        "attachments/<int:project_id>/issues/<int:issue_id>/",
+        views.issue_attachments,
+        name="issue_attachments",
+    ),
+    path(
+        "attachments/<int:project_id>/uploads/<uuid:upload_id>/",
+        views.attachment_upload,
+        name="attachment_upload",
+    ),
+    path(
+        "attachments/<int:project_id>/uploads/<uuid:upload_id>/complete/",
+        views.attachment_upload_complete,
+        name="attachment_upload_complete",
+    ),
+    path(
+        "attachments/<int:project_id>/<int:attachment_id>/",
+        views.attachment_download,
+        name="attachment_download",
+    ),
+    path(
+        "attachments/<int:project_id>/<int:attachment_id>/thumbnail/",
+        views.attachment_thumbnail,
+        name="attachment_thumbnail",
+    ),
+    path(
+        "activity/<int:project_id>/issues/<int:issue_id>/",
+        views.issue_activity_data,
+        name="issue_activity_data",
+    ),
+    path(
+        "schedule/<int:project_id>/",
+        views.project_schedule_data,
+        name="project_schedule_data",
+    ),
 ]
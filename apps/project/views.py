@@ -1,11 +1,53 @@
-from django.db.models import Q
+import json
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
 from django.http import (
+    FileResponse,
+    Http404,
     HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
 )
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
 
-from .models import Project, Issue, Sprint, Epic, UserStory, AcceptanceCriteria
+from .access import aget_request_user, project_access_required
+from .activity import activity_timeline
+from .attachments import (
+    CONTENT_RANGE_RE,
+    UploadOffsetError,
+    attach_existing,
+    attachment_data,
+    blob_thumbnail,
+    finish_upload,
+    serve_blob,
+    start_upload,
+    storage,
+    write_chunk,
+)
+from .models import (
+    AccessRoles,
+    Attachment,
+    AttachmentUpload,
+    Project,
+    ProjectAccess,
+    Issue,
+    Job,
+    Sprint,
+    Epic,
+    UserStory,
+    AcceptanceCriteria,
+    Priority,
+    SearchDocument,
+    Status,
+)
 from .forms import (
     ProjectForm,
     IssueForm,
@@ -14,22 +56,134 @@ from .forms import (
     UserStoryForm,
     AcceptanceCriteriaForm,
 )
+from .changes import alatest_change_id, change_stream
+from .context_processors import apreload_user_projects
+from .criteria import mark_criteria
+from .dashboard import aproject_dashboard, project_dashboard
+from .graph import project_schedule
+from .importexport import FORMATS, export_response
+from .jobs import enqueue
+from .members import amembers_page, members_page
+from .middleware import query_budget, request_stats
+from .pagination import apaginate_request, paginate_request
+from .planning import move_issues
+from .routers import use_replica
+from .search import search_documents
+from .snapshots import project_velocity, sprint_burndown
+from .transactions import retry_on_locked
+
+# Query parameter -> model field for the list filters
+ISSUE_FILTERS: dict[str, str] = {
+    "status": "status",
+    "priority": "priority",
+    "type": "_type",
+}
+EPIC_FILTERS: dict[str, str] = {"status": "status", "priority": "priority"}
+USER_STORY_FILTERS: dict[str, str] = {"status": "status", "priority": "priority"}
+SPRINT_FILTERS: dict[str, str] = {"status": "status"}
+
+# Issue list rows never need the long per-type text fields
+ISSUE_LIST_FIELDS: tuple[str, ...] = (
+    "title",
+    "_type",
+    "status",
+    "priority",
+    "due_date",
+    "created_at",
+    "assignee",
+    "assignee__username",
+)
+
+
+def _apply_filters(request, queryset, filters):
+    for param, field in filters.items():
+        value = request.GET.get(param)
+        if value:
+            queryset = queryset.filter(**{field: value})
+    return queryset
+
+
+# Project list totals, by the user's effective role
+ACCESS_COUNTS = {
+    "lead": Count("pk", filter=Q(effective_role=AccessRoles.LEAD)),
+    "member": Count("pk", filter=~Q(effective_role=AccessRoles.LEAD)),
+}
+
+
+def _user_projects(user_id):
+    return (
+        Project.objects.filter(access__user_id=user_id)
+        .annotate(role=F("access__effective_role"))
+        .select_related("lead")
+        .defer("description")
+    )
+
+
+def _project_epics(request, project):
+    return _apply_filters(
+        request,
+        Epic.objects.filter(project=project).defer("description"),
+        EPIC_FILTERS,
+    )
 
 
 # Project Views
+@use_replica
+@query_budget(max_queries=8)
 def project_list(request) -> HttpResponse:
-    user = request.user
-    # projects = Project.objects.all()
-    projects = Project.objects.filter(Q(lead=user) | Q(members=user)).distinct()
-    return render(request, "project/list.html")
+    user_id = request.user.pk
+    projects = _user_projects(user_id)
+    counts = ProjectAccess.objects.filter(user_id=user_id).aggregate(**ACCESS_COUNTS)
+    page = paginate_request(request, projects)
+    context = {"projects": page, "page": page, "counts": counts}
+    return render(request, "project/list.html", context)
+
+
+@staff_member_required
+def request_stats_data(request) -> JsonResponse:
+    if request.method == "POST":
+        request_stats.reset()
+    return JsonResponse({"views": request_stats.snapshot()})
 
 
+@use_replica
+@query_budget(max_queries=8)
+def project_search(request) -> HttpResponse:
+    query = request.GET.get("search", "").strip()
+    kind = request.GET.get("kind")
+    if kind not in SearchDocument.Kinds.values:
+        kind = None
+    try:
+        number = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        number = 1
+    results, has_next = [], False
+    if query and request.user.is_authenticated:
+        results, has_next = search_documents(
+            query, user=request.user, kind=kind, page=number
+        )
+    params = request.GET.copy()
+    params["page"] = number + 1
+    context = {
+        "query": query,
+        "kind": kind,
+        "kinds": SearchDocument.Kinds.choices,
+        "results": results,
+        "page": {"has_next": has_next, "next_query": params.urlencode()},
+    }
+    return render(request, "project/search.html", context)
+
+
+@use_replica
+@query_budget(max_queries=10)
+@project_access_required("pk")
 def project_detail(request, pk) -> HttpResponse:
-    user = request.user
-    project = get_object_or_404(Project, Q(pk=pk) & (Q(lead=user) | Q(members=user)))
-    return render(request, "project/detail.html", {"project": project})
+    project = request.project
+    context = {"project": project, "dashboard": project_dashboard(project)}
+    return render(request, "project/detail.html", context)
 
 
+@retry_on_locked
 def project_create(
     request,
 ) -> HttpResponse:
@@ -55,13 +209,16 @@ def project_update(request, pk) -> HttpResponse:
     return render(request, "project/update.html", {"form": form})
 
 
+@require_POST
+@project_access_required("pk", roles=(AccessRoles.LEAD,))
 def project_delete(request, pk) -> HttpResponse:
-    project = get_object_or_404(Project, pk=pk)
-    project.delete()
-    return redirect("project_list")
+    # Cascades through the whole project, so it runs in the background
+    job = enqueue("delete_project", created_by=request.user, project_id=pk)
+    return redirect("job_detail", pk=job.pk)
 
 
 # Issue Views
+@retry_on_locked
 def issue_create(request, project_pk):
     project = get_object_or_404(Project, pk=project_pk)
     if request.method == "POST":
@@ -79,6 +236,7 @@ def issue_create(request, project_pk):
 
 
 # Sprint Views
+@retry_on_locked
 def sprint_create(request, project_pk):
     project = get_object_or_404(Project, pk=project_pk)
     if request.method == "POST":
@@ -96,6 +254,7 @@ def sprint_create(request, project_pk):
 
 
 # Epic Views
+@retry_on_locked
 def epic_create(request, project_pk):
     project = get_object_or_404(Project, pk=project_pk)
     if request.method == "POST":
@@ -113,6 +272,7 @@ def epic_create(request, project_pk):
 
 
 # User Story Views
+@retry_on_locked
 def user_story_create(request, project_pk):
     project = get_object_or_404(Project, pk=project_pk)
     if request.method == "POST":
@@ -132,6 +292,7 @@ def user_story_create(request, project_pk):
 
 
 # Acceptance Criteria Views
+@retry_on_locked
 def acceptance_criteria_create(request, user_story_pk):
     user_story = get_object_or_404(UserStory, pk=user_story_pk)
     if request.method == "POST":
@@ -150,20 +311,413 @@ def acceptance_criteria_create(request, user_story_pk):
     )
 
 
+@use_replica
+@query_budget(max_queries=8)
+@project_access_required("project_id")
 def project_members_list(request, project_id) -> HttpResponse:
-    user = request.user
-    project = get_object_or_404(
-        Project, Q(pk=project_id) & (Q(lead=user) | Q(members=user))
-    )
-    context = {"project": project}
+    project = request.project
+    context = {"project": project, **members_page(request, project)}
     return render(request, "project/members_list.html", context)
 
 
+@use_replica
+@query_budget(max_queries=8)
+@project_access_required("project_id")
 def project_epics_list(request, project_id) -> HttpResponse:
-    user = request.user
-    project = get_object_or_404(
-        Project, Q(pk=project_id) & (Q(lead=user) | Q(members=user))
+    project = request.project
+    page = paginate_request(request, _project_epics(request, project))
+    context = {"project": project, "epics": page, "page": page}
+    return render(request, "project/epic_list.html", context)
+
+
+@query_budget(max_queries=8)
+@project_access_required("project_id")
+def project_issues_list(request, project_id) -> HttpResponse:
+    project = request.project
+    issues = _apply_filters(
+        request,
+        Issue.objects.filter(project=project)
+        .select_related("assignee")
+        .only(*ISSUE_LIST_FIELDS),
+        ISSUE_FILTERS,
+    )
+    page = paginate_request(request, issues)
+    context = {
+        "project": project,
+        "issues": page,
+        "page": page,
+        "statuses": Status.choices,
+        "priorities": Priority.choices,
+        "types": Issue.IssueType.choices,
+    }
+    return render(request, "project/issue/list.html", context)
+
+
+@query_budget(max_queries=8)
+@project_access_required("project_id")
+def project_user_stories_list(request, project_id) -> HttpResponse:
+    project = request.project
+    user_stories = _apply_filters(
+        request,
+        UserStory.objects.filter(
+            Q(epic__project=project) | Q(sprint__project=project)
+        ).defer("description"),
+        USER_STORY_FILTERS,
+    )
+    page = paginate_request(request, user_stories)
+    context = {"project": project, "user_stories": page, "page": page}
+    return render(request, "project/user_story/list.html", context)
+
+
+@query_budget(max_queries=8)
+@project_access_required("project_id")
+def project_sprints_list(request, project_id) -> HttpResponse:
+    project = request.project
+    sprints = _apply_filters(
+        request,
+        Sprint.objects.filter(project=project).defer("goal"),
+        SPRINT_FILTERS,
+    )
+    page = paginate_request(request, sprints)
+    context = {"project": project, "sprints": page, "page": page}
+    return render(request, "project/sprint/list.html", context)
+
+
+@project_access_required("project_id")
+def project_issues_export(request, project_id):
+    fmt = request.GET.get("format", "csv")
+    if fmt not in FORMATS:
+        fmt = "csv"
+    return export_response(request.project, fmt)
+
+
+@use_replica
+@project_access_required("project_id")
+def sprint_burndown_data(request, project_id, sprint_id) -> JsonResponse:
+    sprint = get_object_or_404(Sprint, pk=sprint_id, project_id=project_id)
+    return JsonResponse({"sprint": sprint.pk, "days": sprint_burndown(sprint)})
+
+
+@use_replica
+@project_access_required("project_id")
+def project_velocity_data(request, project_id) -> JsonResponse:
+    return JsonResponse({"sprints": project_velocity(request.project)})
+
+
+@project_access_required("project_id")
+def project_schedule_data(request, project_id) -> JsonResponse:
+    return JsonResponse(project_schedule(request.project.pk))
+
+
+@require_GET
+@use_replica
+@project_access_required("project_id")
+def issue_activity_data(request, project_id, issue_id) -> JsonResponse:
+    """An issue's field changes, newest first; ``?before=<id>`` pages back."""
+    issue = get_object_or_404(Issue, pk=issue_id, project_id=project_id)
+    before = request.GET.get("before")
+    entries = activity_timeline(
+        Issue, issue.pk, before=int(before) if before and before.isdigit() else None
+    )
+    return JsonResponse(
+        {
+            "issue": issue.pk,
+            "activity": [
+                {
+                    "id": entry.pk,
+                    "field": entry.field,
+                    "old": entry.old_value,
+                    "new": entry.new_value,
+                    "actor": entry.actor_id,
+                    "at": entry.created_at,
+                }
+                for entry in entries
+            ],
+        }
+    )
+
+
+@require_POST
+@project_access_required("project_id", roles=(AccessRoles.LEAD, AccessRoles.REVIEWER))
+def acceptance_criteria_mark(request, project_id) -> JsonResponse:
+    ids = [pk for pk in request.POST.getlist("ids") if pk.isdigit()]
+    is_met = request.POST.get("is_met", "1") not in ("0", "false", "")
+    result = mark_criteria(ids, is_met, project=request.project)
+    return JsonResponse(
+        {
+            "updated": result.updated,
+            "is_met": is_met,
+            "completed_user_stories": result.completed,
+            "reopened_user_stories": result.reopened,
+        }
     )
-    epics = Epic.objects.filter(project=project)
-    context = {"epics": epics}
+
+
+@require_POST
+@project_access_required(
+    "project_id", roles=(AccessRoles.LEAD, AccessRoles.REVIEWER, AccessRoles.MEMBER)
+)
+def sprint_plan(request, project_id) -> JsonResponse:
+    """Move the issues in ``ids`` to ``sprint``, or to the backlog when empty."""
+    ids = [pk for pk in request.POST.getlist("ids") if pk.isdigit()]
+    sprint_id = request.POST.get("sprint", "")
+    sprint = None
+    if sprint_id:
+        if not sprint_id.isdigit():
+            return HttpResponseBadRequest("Invalid sprint.")
+        sprint = get_object_or_404(Sprint, pk=sprint_id, project_id=project_id)
+    result = move_issues(ids, sprint, request.project)
+    return JsonResponse(
+        {
+            "moved": result.moved,
+            "sprint": sprint.pk if sprint else None,
+            "issue_ids": result.issue_ids,
+            "from_sprints": result.from_sprint_ids,
+        }
+    )
+
+
+# Job Views
+def _user_jobs(request):
+    jobs = Job.objects.select_related("created_by")
+    if request.user.is_staff:
+        return jobs
+    return jobs.filter(created_by=request.user)
+
+
+def _job_json(job) -> dict:
+    return {
+        "id": job.pk,
+        "task": job.task,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_at": job.run_at,
+        "finished_at": job.finished_at,
+        "result": job.result,
+        "error": job.error,
+    }
+
+
+@login_required
+def job_list(request) -> HttpResponse:
+    page = paginate_request(request, _user_jobs(request))
+    return render(request, "project/job/list.html", {"jobs": page, "page": page})
+
+
+@login_required
+def job_detail(request, pk) -> HttpResponse:
+    job = get_object_or_404(_user_jobs(request), pk=pk)
+    context = {"job": job, "result": json.dumps(job.result, indent=2, default=str)}
+    return render(request, "project/job/detail.html", context)
+
+
+@login_required
+def job_status_data(request, pk) -> JsonResponse:
+    return JsonResponse(_job_json(get_object_or_404(_user_jobs(request), pk=pk)))
+
+
+# Attachment Views
+def _attachment_json(attachment, project_id) -> dict:
+    data = attachment_data(attachment)
+    args = [project_id, attachment.pk]
+    data["url"] = reverse("attachment_download", args=args)
+    data["thumbnail_url"] = reverse("attachment_thumbnail", args=args)
+    return data
+
+
+def _upload_json(upload, project_id) -> dict:
+    return {
+        "upload": str(upload.pk),
+        "offset": upload.received,
+        "size": upload.size,
+        "chunk_size": settings.ATTACHMENT_CHUNK_SIZE,
+        "url": reverse("attachment_upload", args=[project_id, upload.pk]),
+    }
+
+
+def _error_json(error, status=400) -> JsonResponse:
+    return JsonResponse({"errors": error.messages}, status=status)
+
+
+@require_http_methods(["GET", "POST"])
+@project_access_required("project_id")
+def issue_attachments(request, project_id, issue_id) -> JsonResponse:
+    """List an issue's attachments (GET) or start uploading one (POST).
+
+    A POST with the ``sha256`` of content already attached in the project
+    attaches it straight away; otherwise it opens an upload to send the file
+    to.
+    """
+    issue = get_object_or_404(Issue, pk=issue_id, project_id=project_id)
+    if request.method == "GET":
+        attachments = issue.attachments.select_related("blob").order_by("pk")
+        return JsonResponse(
+            {"attachments": [_attachment_json(a, project_id) for a in attachments]}
+        )
+    filename = request.POST.get("filename", "")
+    try:
+        sha256 = request.POST.get("sha256")
+        if sha256:
+            attachment = attach_existing(issue, sha256, filename, request.user)
+            if attachment is not None:
+                return JsonResponse(
+                    {"attachment": _attachment_json(attachment, project_id)},
+                    status=201,
+                )
+        size = request.POST.get("size", "")
+        if not size.isdigit():
+            return HttpResponseBadRequest("Invalid size.")
+        upload = start_upload(
+            issue,
+            filename,
+            int(size),
+            request.POST.get("content_type", ""),
+            request.user,
+        )
+    except ValidationError as error:
+        return _error_json(error)
+    return JsonResponse(_upload_json(upload, project_id), status=201)
+
+
+@require_http_methods(["GET", "PUT"])
+@project_access_required("project_id")
+def attachment_upload(request, project_id, upload_id) -> JsonResponse:
+    """Where an upload stands (GET), or its next chunk (PUT).
+
+    A chunk is the raw request body, placed by ``Content-Range: bytes
+    first-last/size``; a 409 carries the offset to resume from.
+    """
+    upload = get_object_or_404(
+        AttachmentUpload,
+        pk=upload_id,
+        issue__project_id=project_id,
+        created_by=request.user,
+    )
+    if request.method == "PUT":
+        match = CONTENT_RANGE_RE.match(request.headers.get("Content-Range", ""))
+        length = request.META.get("CONTENT_LENGTH") or "0"
+        if not match or not length.isdigit():
+            return HttpResponseBadRequest("Invalid Content-Range.")
+        try:
+            write_chunk(upload, int(match[1]), request, int(length))
+        except UploadOffsetError as error:
+            return JsonResponse(
+                {"errors": error.messages, "offset": upload.received}, status=409
+            )
+        except ValidationError as error:
+            return _error_json(error)
+    return JsonResponse(_upload_json(upload, project_id))
+
+
+@require_POST
+@project_access_required("project_id")
+def attachment_upload_complete(request, project_id, upload_id) -> JsonResponse:
+    upload = get_object_or_404(
+        AttachmentUpload,
+        pk=upload_id,
+        issue__project_id=project_id,
+        created_by=request.user,
+    )
+    try:
+        attachment = finish_upload(upload, request.POST.get("sha256", ""))
+    except ValidationError as error:
+        return _error_json(error)
+    return JsonResponse(
+        {"attachment": _attachment_json(attachment, project_id)}, status=201
+    )
+
+
+def _project_attachment(project_id, attachment_id):
+    return get_object_or_404(
+        Attachment.objects.select_related("blob"),
+        pk=attachment_id,
+        issue__project_id=project_id,
+    )
+
+
+@require_GET
+@project_access_required("project_id")
+def attachment_download(request, project_id, attachment_id):
+    attachment = _project_attachment(project_id, attachment_id)
+    inline = request.GET.get("inline") == "1"
+    return serve_blob(request, attachment.blob, attachment.filename, not inline)
+
+
+@require_GET
+@project_access_required("project_id")
+def attachment_thumbnail(request, project_id, attachment_id):
+    attachment = _project_attachment(project_id, attachment_id)
+    name = blob_thumbnail(attachment.blob)
+    if name is None:
+        raise Http404("No thumbnail for this attachment.")
+    response = FileResponse(storage().open(name, "rb"), content_type="image/png")
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
+# Async Views
+# The read-only pages again, on the async ORM. Under ASGI they don't hold a
+# worker thread while waiting on the database.
+@use_replica
+@query_budget(max_queries=8)
+async def aproject_list(request) -> HttpResponse:
+    user = await aget_request_user(request)
+    await apreload_user_projects(request, user)
+    counts = await ProjectAccess.objects.filter(user_id=user.pk).aaggregate(
+        **ACCESS_COUNTS
+    )
+    page = await apaginate_request(request, _user_projects(user.pk))
+    context = {"projects": page, "page": page, "counts": counts}
+    return render(request, "project/list.html", context)
+
+
+@use_replica
+@query_budget(max_queries=10)
+@project_access_required("pk")
+async def aproject_detail(request, pk) -> HttpResponse:
+    project = request.project
+    await apreload_user_projects(request, request.user)
+    context = {"project": project, "dashboard": await aproject_dashboard(project)}
+    return render(request, "project/detail.html", context)
+
+
+@use_replica
+@query_budget(max_queries=8)
+@project_access_required("project_id")
+async def aproject_members_list(request, project_id) -> HttpResponse:
+    project = request.project
+    await apreload_user_projects(request, request.user)
+    context = {"project": project, **await amembers_page(request, project)}
+    return render(request, "project/members_list.html", context)
+
+
+@use_replica
+@query_budget(max_queries=8)
+@project_access_required("project_id")
+async def aproject_epics_list(request, project_id) -> HttpResponse:
+    project = request.project
+    await apreload_user_projects(request, request.user)
+    page = await apaginate_request(request, _project_epics(request, project))
+    context = {"project": project, "epics": page, "page": page}
     return render(request, "project/epic_list.html", context)
+
+
+@project_access_required("project_id")
+async def project_changes_stream(request, project_id) -> HttpResponse:
+    if not isinstance(request, ASGIRequest):
+        # A stream would hold a WSGI worker for CHANGE_STREAM_TIMEOUT seconds.
+        # 204 tells EventSource to stop reconnecting.
+        return HttpResponse(status=204)
+    cursor = request.headers.get("Last-Event-ID") or request.GET.get("cursor")
+    if cursor is None:
+        cursor = await alatest_change_id(project_id)
+    elif not cursor.isdigit():
+        return HttpResponseBadRequest("Invalid cursor.")
+    response = StreamingHttpResponse(
+        change_stream(project_id, int(cursor)), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Don't let a reverse proxy hold the events back
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 
+from config.database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,28 +49,59 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "apps.project.routers.PrimaryPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "apps.project.activity.ActivityLogMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "apps.project.middleware.QueryInstrumentationMiddleware",
 ]
 
+# Log views that exceed their @query_budget; raise instead when True.
+QUERY_BUDGET_RAISE = False
+
+# Live change stream (apps.project.changes): seconds between polls, how long
+# to gather a burst of changes into one event, between keepalives, and before
+# the stream closes and the browser reconnects.
+CHANGE_STREAM_POLL_INTERVAL = 1.0
+CHANGE_STREAM_COALESCE = 0.25
+CHANGE_STREAM_HEARTBEAT = 15
+CHANGE_STREAM_TIMEOUT = 300
+# Outside SQLite, changes younger than this many seconds are held back so one
+# that commits after a row with a higher id isn't skipped.
+CHANGE_STREAM_COMMIT_LAG = 1.0
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates, timing renders for QueryInstrumentationMiddleware
+        "BACKEND": "apps.project.middleware.TimedDjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Compiled templates (cotton components included) are kept in
+            # memory; in development the autoreloader resets them on change.
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django_cotton.cotton_loader.Loader",
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
+            ],
+            "builtins": ["django_cotton.templatetags.cotton"],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "apps.project.context_processors.user_projects",
+                "apps.project.context_processors.live_updates",
             ],
         },
     },
@@ -80,12 +113,20 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
-}
+# Configured from the environment, see config/database.py. Without any
+# DATABASE_* variables this is the db.sqlite3 file next to manage.py.
+DATABASES, DATABASE_REPLICAS = database_settings(BASE_DIR)
+DATABASE_ROUTERS = ["apps.project.routers.ReplicaRouter"]
+
+# How long a client that wrote keeps reading from the primary, so it sees
+# its own changes while the replicas catch up.
+REPLICA_PIN_SECONDS = 5
+
+# Write views decorated with apps.project.transactions.retry_on_locked try
+# this many times, waiting about DELAY, 2 * DELAY... seconds in between,
+# while SQLite reports "database is locked".
+DATABASE_LOCK_RETRIES = 5
+DATABASE_LOCK_RETRY_DELAY = 0.05
 
 
 # Password validation
@@ -133,6 +174,31 @@ STATICFILES_FINDERS = (
     "compressor.finders.CompressorFinder",
 )
 
+MEDIA_URL = "media/"
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# Issue attachments (apps.project.attachments) are kept out of MEDIA_URL and
+# only served through views that check project access. Downloads stream from
+# Django unless ATTACHMENT_SENDFILE hands them to the web server:
+# "x-sendfile" (Apache, lighttpd) sends the file path, "x-accel-redirect"
+# (nginx) sends ATTACHMENT_ACCEL_PREFIX plus the path inside ATTACHMENT_ROOT,
+# which needs an internal location aliased to ATTACHMENT_ROOT.
+ATTACHMENT_ROOT = os.path.join(MEDIA_ROOT, "attachments")
+ATTACHMENT_CHUNK_SIZE = 8 * 1024 * 1024
+ATTACHMENT_MAX_SIZE = 2 * 1024 * 1024 * 1024
+ATTACHMENT_SENDFILE = None
+ATTACHMENT_ACCEL_PREFIX = "/protected/attachments/"
+ATTACHMENT_THUMBNAIL_SIZE = (320, 320)
+
+# Background jobs (apps.project.jobs), run by ``manage.py run_jobs``: runs a
+# job gets unless its task says otherwise, seconds before the first retry
+# (doubling after each), seconds before a running job counts as lost, and
+# seconds between polls of an empty queue.
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 30
+JOB_TIMEOUT = 60 * 60
+JOB_POLL_INTERVAL = 1.0
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 